@@ -2,30 +2,370 @@
 Flask API server for Block Blast Solver
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g, send_file
 from flask_cors import CORS
-from solver import BlockBlastSolver
+from solver import BlockBlastSolver, DEFAULT_TOP_K
+from parallel import SolverPool
+from lookahead import LookaheadPlanner
+from pieces import STANDARD_PIECES, to_grid
+from cache import ResultCache, DEFAULT_MAX_ENTRIES, key_hash
+from evaluators import EVALUATORS
+from store import SolutionStore
+from serving import SolveGate, Overloaded, DEFAULT_MAX_WAIT_MS
+from metrics import Metrics, PREFIX
+from sessions import SessionManager, SessionError, DEFAULT_TTL_S
+from profiling import Profiler, DEFAULT_MODE as DEFAULT_PROFILE_MODE
+from jobs import (JobManager, DONE, DEFAULT_ABANDON_AFTER_S, DEFAULT_MAX_QUEUE as DEFAULT_JOB_QUEUE,
+                  DEFAULT_WORKERS as DEFAULT_JOB_WORKERS)
+import logs
+import wire
+from typing import Optional
+import atexit
+import functools
+import hmac
 import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize the solver
-solver = BlockBlastSolver()
+# JSON log lines written from a background thread; SOLVER_LOG_LEVEL=DEBUG
+# adds full board dumps
+logger = logs.configure(os.environ.get('SOLVER_LOG_LEVEL', 'INFO'))
+
+# Initialize the solver once so its per-shape placement tables are reused
+# across requests. SOLVER_ENGINE picks the search engine: 'bitboard' (the
+# default) prunes and splits large searches across SOLVER_WORKERS, 'jit'
+# runs small ones on the unpruned compiled kernel instead and falls back
+# to 'bitboard' when Numba is not installed. Neither wins everywhere, see
+# benchmark.py. SOLVER_BOARD_SIZE sets the board every request of this
+# deployment uses (8x8 by default).
+solver = BlockBlastSolver(board_size=int(os.environ.get('SOLVER_BOARD_SIZE', 8)),
+                          engine=os.environ.get('SOLVER_ENGINE', 'bitboard'))
+
+# Compile the JIT kernel now so the first request doesn't pay for it
+if solver.jit_kernel is not None:
+    solver.jit_kernel.warm_up()
+
+# Worker processes for large searches, shared by all requests.
+# SOLVER_WORKERS=1 disables parallel solving; unset uses every core.
+solver_pool = SolverPool(solver, workers=int(os.environ['SOLVER_WORKERS']) if os.environ.get('SOLVER_WORKERS') else None)
+atexit.register(solver_pool.shutdown)
+
+# Solve results shared by all requests, keyed on the request up to board
+# symmetry. SOLVER_CACHE_SIZE=0 disables the memory tier; SOLVER_STORE
+# names a SQLite file that keeps results across restarts (see store.py to
+# pre-populate it).
+solution_store = SolutionStore(os.environ['SOLVER_STORE'], solver.board_size) if os.environ.get('SOLVER_STORE') else None
+result_cache = ResultCache(solver, max_entries=int(os.environ.get('SOLVER_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+                           store=solution_store)
+
+# Bounds concurrent solves (SOLVER_MAX_CONCURRENT, default one per core)
+# and how many requests may wait for a slot (SOLVER_MAX_QUEUE) and for how
+# long (SOLVER_MAX_WAIT_MS); anything beyond that gets a 429
+solve_gate = SolveGate(
+    max_concurrent=int(os.environ['SOLVER_MAX_CONCURRENT']) if os.environ.get('SOLVER_MAX_CONCURRENT') else None,
+    max_queue=int(os.environ['SOLVER_MAX_QUEUE']) if os.environ.get('SOLVER_MAX_QUEUE') else None,
+    max_wait_ms=float(os.environ.get('SOLVER_MAX_WAIT_MS', DEFAULT_MAX_WAIT_MS)))
+
+# Games whose board is kept on the server; idle ones expire after
+# SOLVER_SESSION_TTL_S seconds
+sessions = SessionManager(solver.board_size, ttl=float(os.environ.get('SOLVER_SESSION_TTL_S', DEFAULT_TTL_S)))
+
+# Profiles of live solves (see profiling.py), off unless SOLVER_PROFILE_DIR
+# names a directory for them. SOLVER_PROFILE_RATE profiles that fraction
+# of solves from the start. Requests carrying SOLVER_ADMIN_TOKEN as a
+# bearer token may also change it through /api/profiles/config, read the
+# profiles and ask for one with X-Solver-Profile; without a token set,
+# only the sample rate profiles anything.
+ADMIN_TOKEN = os.environ.get('SOLVER_ADMIN_TOKEN')
+profiler = Profiler(os.environ['SOLVER_PROFILE_DIR'], sample_rate=float(os.environ.get('SOLVER_PROFILE_RATE', 0)),
+                    mode=os.environ.get('SOLVER_PROFILE_MODE', DEFAULT_PROFILE_MODE)) \
+    if os.environ.get('SOLVER_PROFILE_DIR') else None
+
+# Request latencies and search counters, exported on /api/metrics
+metrics = Metrics()
+
+def job_finished(job) -> None:
+    if job.status == DONE:
+        metrics.record_solve(dict(job.stats, cached=False))
+    logger.info('solve job', extra={
+        'job_id': job.id, 'status': job.status, 'duration_ms': job.state()['elapsed_ms'],
+        'solutions': len(job.solutions or ()), 'complete': job.stats.get('complete', True)})
+
+# Asynchronous solves on their own worker processes (SOLVER_JOB_WORKERS,
+# default 2, which run beside the solves solve_gate admits) with up to
+# SOLVER_JOB_QUEUE waiting. Jobs nobody polls for SOLVER_JOB_ABANDON_S
+# seconds are cancelled.
+job_manager = JobManager(solver.board_size,
+                         workers=int(os.environ.get('SOLVER_JOB_WORKERS', DEFAULT_JOB_WORKERS)),
+                         max_queue=int(os.environ.get('SOLVER_JOB_QUEUE', DEFAULT_JOB_QUEUE)),
+                         abandon_after=float(os.environ.get('SOLVER_JOB_ABANDON_S', DEFAULT_ABANDON_AFTER_S)),
+                         on_finish=job_finished)
+atexit.register(job_manager.shutdown)
+
+metrics.gauge(f'{PREFIX}_solves_active', lambda: {(): solve_gate.stats()['active']},
+              text='Solves holding a solver slot')
+metrics.gauge(f'{PREFIX}_solves_waiting', lambda: {(): solve_gate.stats()['waiting']},
+              text='Solves waiting for a solver slot')
+metrics.gauge(f'{PREFIX}_result_cache_entries', lambda: {(): result_cache.stats()['entries']},
+              text='Entries in the in-memory result cache')
+metrics.gauge(f'{PREFIX}_sessions_active', lambda: {(): sessions.stats()['active']},
+              text='Live game sessions')
+metrics.gauge(f'{PREFIX}_jobs_running', lambda: {(): job_manager.stats()['running']},
+              text='Solve jobs holding a job worker')
+metrics.gauge(f'{PREFIX}_jobs_queued', lambda: {(): job_manager.stats()['queued']},
+              text='Solve jobs waiting for a job worker')
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+    # Clients may pass their own id to correlate logs across services
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16]
+
+@app.after_request
+def record_request(response):
+    # Streaming responses are timed up to their first byte
+    if request.endpoint and request.endpoint != 'prometheus_metrics' and 'started' in g:
+        metrics.record_request(request.endpoint, response.status_code, time.perf_counter() - g.started)
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    if 'profile' in g:
+        response.headers['X-Solver-Profile'] = f'/api/profiles/{g.profile}'
+    return response
+
+def log_board(data) -> None:
+    """
+    Dump the raw board and blocks of a request, DEBUG level only.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('request payload', extra={'request_id': g.request_id,
+                                               'board': data.get('board'), 'blocks': data.get('blocks')})
+
+# Upper bound on the number of solutions a client may ask for
+MAX_TOP_K = 50
+
+# Upper bound on the blocks of one request; the search grows as K! times
+# the placements of each block
+MAX_BLOCKS = 5
+
+# Block grids are square canvases of at most this size (5x5 in the game)
+MAX_BLOCK_CANVAS = max(5, solver.board_size)
+
+# Upper bound on the time budget of an anytime solve
+MAX_TIME_BUDGET_MS = 60000
+
+# Upper bound on the number of items in one /api/solve-batch request
+MAX_BATCH_ITEMS = 10000
+
+# Longest a GET /api/jobs/<id>?wait= long-poll is held, in seconds
+MAX_JOB_WAIT_S = 30
+
+# Limits on lookahead options; the cost grows as samples ** depth
+MAX_LOOKAHEAD_DEPTH = 3
+MAX_LOOKAHEAD_SAMPLES = 32
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def validate_lookahead_options(options) -> Optional[str]:
+    """
+    Check the optional "lookahead" object of a solve payload.
+    """
+    if not isinstance(options, dict):
+        return 'lookahead must be an object'
+    
+    depth = options.get('depth', 1)
+    if not _is_int(depth) or not 1 <= depth <= MAX_LOOKAHEAD_DEPTH:
+        return f'lookahead.depth must be an integer between 1 and {MAX_LOOKAHEAD_DEPTH}'
+    
+    samples = options.get('samples', 8)
+    if not _is_int(samples) or not 1 <= samples <= MAX_LOOKAHEAD_SAMPLES:
+        return f'lookahead.samples must be an integer between 1 and {MAX_LOOKAHEAD_SAMPLES}'
+    
+    candidates = options.get('candidates', 10)
+    if not _is_int(candidates) or not 1 <= candidates <= MAX_TOP_K:
+        return f'lookahead.candidates must be an integer between 1 and {MAX_TOP_K}'
+    
+    if not _is_int(options.get('seed', 0)):
+        return 'lookahead.seed must be an integer'
+    
+    pieces = options.get('pieces')
+    if pieces is not None and (not isinstance(pieces, list) or not pieces
+                               or any(name not in STANDARD_PIECES for name in pieces)):
+        return f'lookahead.pieces must be a non-empty list of: {", ".join(sorted(STANDARD_PIECES))}'
+    
+    weights = options.get('weights')
+    if weights is not None and (not isinstance(weights, dict)
+                                or any(name not in STANDARD_PIECES or not isinstance(weight, (int, float))
+                                       or weight < 0 for name, weight in weights.items())):
+        return 'lookahead.weights must map catalog piece names to non-negative numbers'
+    
+    node_budget = options.get('node_budget')
+    if node_budget is not None and (not _is_int(node_budget) or node_budget < 1):
+        return 'lookahead.node_budget must be a positive integer'
+    
+    time_budget_ms = options.get('time_budget_ms')
+    if time_budget_ms is not None and (not isinstance(time_budget_ms, (int, float)) or isinstance(time_budget_ms, bool)
+                                       or not 0 < time_budget_ms <= MAX_TIME_BUDGET_MS):
+        return f'lookahead.time_budget_ms must be a number between 0 and {MAX_TIME_BUDGET_MS}'
+    
+    return None
+
+def overloaded_response(error: Overloaded):
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def board_hash(board, blocks) -> Optional[str]:
+    """
+    Canonical hash of a request for logs, the same one the result cache uses.
+    """
+    canonical = result_cache.canonicalize(board, blocks)
+    return key_hash(canonical.key) if canonical is not None else None
+
+def profiled(mode: Optional[str], solve, *args, **kwargs):
+    """
+    Call solve, under the profiler when mode is set. The profile's URL is
+    returned in the X-Solver-Profile response header.
+    """
+    if mode is None:
+        return solve(*args, **kwargs)
+    result, g.profile = profiler.run(mode, g.request_id, solve, *args, **kwargs)
+    return result
+
+def read_payload():
+    """
+    The request body as a dict, or None if there is none. MessagePack or
+    JSON by content type, with bitmask boards and blocks unpacked (see
+    wire.py). Raises ValueError for a malformed body or bitmask and
+    LookupError when MessagePack is not installed.
+    """
+    if wire.binary_mimetype(request.mimetype):
+        data = wire.loads(request.get_data(), request.mimetype)
+    else:
+        data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return None
+    return wire.decode_request(data, solver.board_size)
+
+def payload_error(error: Exception):
+    return jsonify({'error': str(error)}), 415 if isinstance(error, LookupError) else 400
+
+def response_mimetype() -> str:
+    return wire.response_mimetype(request.accept_mimetypes)
+
+def encode_solutions(data, board, blocks, solutions, binary: bool = False):
+    """
+    Solutions as the request asked for them: unchanged, or in the compact
+    format with bitmask boards and per-step boards.
+    """
+    if data.get('format') != wire.COMPACT:
+        return solutions
+    return wire.compact_solutions(solver, board, blocks, solutions, binary)
+
+def respond(data, payload, status: int = 200):
+    """
+    jsonify a response, or serialize it with wire.py when the request
+    asked for the compact format or MessagePack.
+    """
+    mimetype = response_mimetype()
+    binary = wire.binary_mimetype(mimetype)
+    if not binary and data.get('format') != wire.COMPACT:
+        return jsonify(payload), status
+    return Response(wire.dumps(payload, binary), status=status, mimetype=mimetype)
+
+def validate_solve_request(data) -> Optional[str]:
+    """
+    Check a solve payload. Returns an error message, or None if it is valid.
+    """
+    board = data.get('board')
+    blocks = data.get('blocks')
+    
+    if not board or not blocks:
+        return 'Missing board or blocks data'
+    
+    n = solver.board_size
+    if not isinstance(board, list) or len(board) != n or any(not isinstance(row, list) or len(row) != n
+                                                             for row in board):
+        return f'Board must be {n}x{n}'
+    if any(cell not in (0, 1) for row in board for cell in row):
+        return 'Board cells must be 0 or 1'
+    
+    if not isinstance(blocks, list) or not 1 <= len(blocks) <= MAX_BLOCKS:
+        return f'Must provide between 1 and {MAX_BLOCKS} blocks'
+    
+    for i, block in enumerate(blocks):
+        # Blocks unpacked from bitmasks are shared tuples (see wire.mask_to_grid)
+        if (not isinstance(block, (list, tuple)) or not 1 <= len(block) <= MAX_BLOCK_CANVAS
+                or any(not isinstance(row, (list, tuple)) or len(row) != len(block) for row in block)):
+            return f'Block {i+1} must be a square grid of at most {MAX_BLOCK_CANVAS}x{MAX_BLOCK_CANVAS}'
+        if any(cell not in (0, 1) for row in block for cell in row):
+            return f'Block {i+1} cells must be 0 or 1'
+    
+    top_k = data.get('top_k', DEFAULT_TOP_K)
+    if not isinstance(top_k, int) or isinstance(top_k, bool) or not 1 <= top_k <= MAX_TOP_K:
+        return f'top_k must be an integer between 1 and {MAX_TOP_K}'
+    
+    time_budget_ms = data.get('time_budget_ms')
+    if time_budget_ms is not None and (not isinstance(time_budget_ms, (int, float)) or isinstance(time_budget_ms, bool)
+                                       or not 0 < time_budget_ms <= MAX_TIME_BUDGET_MS):
+        return f'time_budget_ms must be a number between 0 and {MAX_TIME_BUDGET_MS}'
+    
+    if not isinstance(data.get('debug_stats', False), bool):
+        return 'debug_stats must be a boolean'
+    
+    evaluator = data.get('evaluator')
+    if evaluator is not None and evaluator not in EVALUATORS:
+        return f"evaluator must be one of {', '.join(EVALUATORS)}"
+    
+    if data.get('format', wire.NESTED) not in wire.FORMATS:
+        return f"format must be one of {', '.join(wire.FORMATS)}"
+    
+    if data.get('lookahead') is not None:
+        return validate_lookahead_options(data['lookahead'])
+    
+    return None
 
 @app.route('/api/solve', methods=['POST'])
 def solve():
     """
     Solve a Block Blast iteration.
     
-    Expected JSON payload:
+    Expected JSON (or MessagePack, see wire.py) payload:
     {
-        "board": [[0,1,0,...], ...],  // 8x8 grid
-        "blocks": [
+        "board": [[0,1,0,...], ...],  // board_size x board_size grid (8x8 by default)
+                                      // or a bitmask, e.g. "81ff000000000000"
+        "blocks": [                   // 1 to MAX_BLOCKS square grids, usually three 5x5
             [[0,1,0,...], ...],       // First 5x5 block
             [[1,1,0,...], ...],       // Second 5x5 block  
-            [[0,0,1,...], ...]        // Third 5x5 block
-        ]
+            [[0,0,1,...], ...]        // Third 5x5 block, or a bitmask on a
+        ],                            // board-sized canvas
+        "format": "compact",          // Optional, see below
+        "top_k": 3,                   // Optional, number of solutions to return
+        "time_budget_ms": 200,        // Optional, return the best found within this time
+        "evaluator": "quality",       // Optional, how final boards are valued:
+                                      // "cells" (default) or "quality", which
+                                      // also penalizes holes, fragmentation
+                                      // and pieces that no longer fit
+                                      // (lookahead always ranks by cells)
+        "lookahead": {                // Optional, re-rank by sampled future deals
+            "depth": 1,               // Turns to look ahead (1-3)
+            "samples": 8,             // Deals sampled per turn (1-32)
+            "candidates": 10,         // Current-turn solutions to re-rank
+            "seed": 0,
+            "pieces": ["single", ...],   // Catalog pieces to draw from, default all
+            "weights": {"single": 2},    // Relative draw weights, default 1
+            "node_budget": 1000000,   // Optional search budget
+            "time_budget_ms": 500     // Optional time budget
+        },
+        "debug_stats": false          // Optional, include search counters
     }
     
     Returns:
@@ -34,66 +374,491 @@ def solve():
             {
                 "block_order": [0, 1, 2],
                 "placements": [
-                    {"block_index": 0, "center_row": 3, "center_col": 4},
-                    {"block_index": 1, "center_row": 2, "center_col": 1},
-                    {"block_index": 2, "center_row": 5, "center_col": 6}
+                    {"block_index": 0, "top_left_row": 3, "top_left_col": 4},
+                    {"block_index": 1, "top_left_row": 2, "top_left_col": 1},
+                    {"block_index": 2, "top_left_row": 5, "top_left_col": 6}
                 ],
                 "final_board": [[0,0,0,...], ...],
                 "lines_cleared": 2,
                 "score": 25
             },
             ...
-        ]
+        ],
+        "total_solutions": 3,
+        "complete": true,             // false if the time budget ran out first
+        "cached": false,              // true if served from the result cache (not with lookahead)
+        "partial_solutions": [...],   // Only when no ordering fits every block
+                                      // blocks: the best sequences placing
+                                      // two (or one) of them, each with an
+                                      // "unplaced" list of block indices
+        "lookahead_stats": {...},     // Only with lookahead; solutions then
+                                      // carry a "lookahead" object each
+        "debug_stats": {...}          // Only with debug_stats: nodes per level,
+                                      // rejected placements, line clears,
+                                      // cache and table hits, phase timings
     }
+    
+    With "format": "compact" each solution instead has
+    
+        "placements": [[0, 3, 4], [1, 2, 1], [2, 5, 6]],
+        "final_board": "305808021292fa",
+        "boards": ["1315909021093fb", ...],   // After each placement's line clears
+        "placed": ["303", ...],               // Cells each placement filled
+    
+    and Accept: application/msgpack gets a MessagePack body.
+    
+    When every solver slot is busy and the wait queue is full, responds
+    429 with a Retry-After header (seconds) instead of queueing.
+    
+    When profiling is enabled (see profiling.py), an X-Solver-Profile
+    header ("sample", "cprofile" or "1") on a request with the admin token
+    or the configured sample rate profiles the solve; without the token
+    the header is ignored. Profiled solves skip the result cache and the
+    worker pool, so the profile shows the search itself, and the response
+    links the profile in its own X-Solver-Profile header.
     """
     try:
-        data = request.get_json()
-        
+        data = read_payload()
+        requested_profile = request.headers.get('X-Solver-Profile') if is_admin() else None
+        profile_mode = profiler.choose(requested_profile) if profiler is not None else None
+    except (ValueError, LookupError) as e:
+        return payload_error(e)
+    try:
         if not data:
             return jsonify({'error': 'No JSON data provided'}), 400
         
         board = data.get('board')
         blocks = data.get('blocks')
+        log_board(data)
         
-        # Debug: Print what we received
-        print("=== BACKEND DEBUG ===")
-        print("Received board:")
-        for i, row in enumerate(board):
-            print(f"Row {i}: {row}")
-        print("\nReceived blocks:")
-        for i, block in enumerate(blocks):
-            print(f"Block {i+1}:")
-            for j, row in enumerate(block):
-                print(f"  Row {j}: {row}")
-        print("===================")
+        error = validate_solve_request(data)
+        if error:
+            logger.info('invalid solve request', extra={'request_id': g.request_id, 'error': error})
+            return jsonify({'error': error}), 400
         
-        if not board or not blocks:
-            return jsonify({'error': 'Missing board or blocks data'}), 400
+        top_k = data.get('top_k', DEFAULT_TOP_K)
         
-        if len(board) != 8 or any(len(row) != 8 for row in board):
-            return jsonify({'error': 'Board must be 8x8'}), 400
+        if data.get('lookahead') is not None:
+            options = data['lookahead']
+            planner = LookaheadPlanner(
+                solver, pieces=options.get('pieces'), weights=options.get('weights'),
+                depth=options.get('depth', 1), samples=options.get('samples', 8),
+                candidates=options.get('candidates', 10), seed=options.get('seed', 0),
+                node_budget=options.get('node_budget'), time_budget_ms=options.get('time_budget_ms'),
+                deal_size=len(blocks))
+            solutions, lookahead_stats = solve_gate.run(profiled, profile_mode, planner.plan, board, blocks, top_k)
+            
+            logger.info('solve', extra={
+                'request_id': g.request_id, 'board_hash': board_hash(board, blocks),
+                'duration_ms': logs.elapsed_ms(g.started), 'solutions': len(solutions),
+                'lookahead_samples': lookahead_stats['samples'], 'complete': lookahead_stats['complete']})
+            
+            return respond(data, {
+                'solutions': encode_solutions(data, board, blocks, solutions,
+                                              wire.binary_mimetype(response_mimetype())),
+                'total_solutions': len(solutions),
+                'complete': lookahead_stats['complete'],
+                'lookahead_stats': lookahead_stats
+            })
         
-        if len(blocks) != 3:
-            return jsonify({'error': 'Must provide exactly 3 blocks'}), 400
+        # Solve the iteration, or reuse the result of an equivalent request.
+        # Identical requests in flight share one solve and one gate slot.
+        stats = {}
+        if profile_mode is not None:
+            stats['cached'] = False
+            solutions = solve_gate.run(profiled, profile_mode, solver.solve_iteration, board, blocks, top_k=top_k,
+                                       stats=stats, time_budget_ms=data.get('time_budget_ms'),
+                                       evaluator=data.get('evaluator'))
+        else:
+            solutions = result_cache.solve_iteration(board, blocks, top_k,
+                                                     functools.partial(solve_gate.run, solver_pool.solve_iteration),
+                                                     stats=stats, time_budget_ms=data.get('time_budget_ms'),
+                                                     evaluator=data.get('evaluator'))
+        metrics.record_solve(stats)
         
-        for i, block in enumerate(blocks):
-            if len(block) != 5 or any(len(row) != 5 for row in block):
-                return jsonify({'error': f'Block {i+1} must be 5x5'}), 400
+        logger.info('solve', extra={
+            'request_id': g.request_id, 'board_hash': stats.get('board_hash'),
+            'duration_ms': logs.elapsed_ms(g.started), 'solutions': len(solutions),
+            'cached': stats['cached'], 'complete': stats.get('complete', True)})
         
-        # Solve the iteration
-        solutions = solver.solve_iteration(board, blocks)
+        binary = wire.binary_mimetype(response_mimetype())
+        response = {
+            'solutions': encode_solutions(data, board, blocks, solutions, binary),
+            'total_solutions': len(solutions),
+            'complete': stats.get('complete', True),
+            'cached': stats['cached']
+        }
+        if not solutions and stats.get('complete', True):
+            partial = result_cache.best_partial(board, blocks, top_k, functools.partial(solve_gate.run, solver.best_partial),
+                                                evaluator=data.get('evaluator'))
+            response['partial_solutions'] = encode_solutions(data, board, blocks, partial, binary)
+        if data.get('debug_stats'):
+            response['debug_stats'] = stats
+        return respond(data, response)
         
-        print(f"Found {len(solutions)} solutions")
+    except Overloaded as e:
+        logger.warning('solve rejected', extra={'request_id': g.request_id, 'retry_after': e.retry_after})
+        return overloaded_response(e)
+    except Exception as e:
+        logger.exception('solve failed', extra={'request_id': g.request_id})
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/feasible', methods=['POST'])
+def feasible():
+    """
+    Check whether all blocks can be placed, without ranking solutions.
+    Cheap enough to call on every board edit.
+    
+    Expected payload: "board", "blocks" and "format" as for /api/solve;
+    compact placements are triples.
+    
+    Returns:
+    {
+        "feasible": true,
+        "placements": [...],          // One sequence that places every block,
+                                      // null when infeasible
+        "placeable": [true, true, false]   // Whether each block fits on the
+                                           // board on its own
+    }
+    """
+    try:
+        data = read_payload()
+    except (ValueError, LookupError) as e:
+        return payload_error(e)
+    try:
+        if data is None:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        error = validate_solve_request(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        return jsonify({
-            'solutions': solutions,
-            'total_solutions': len(solutions)
-        })
+        board = data['board']
+        blocks = data['blocks']
+        stats = {}
+        placements = solver.find_sequence(board, blocks, stats)
+        placeable = [True] * len(blocks) if placements is not None else \
+            [solver.find_sequence(board, [block]) is not None for block in blocks]
         
+        logger.debug('feasibility', extra={'request_id': g.request_id, 'feasible': placements is not None,
+                                           'nodes': stats.get('feasibility_nodes'),
+                                           'duration_ms': logs.elapsed_ms(g.started)})
+        if placements is not None and data.get('format') == wire.COMPACT:
+            placements = [[placement['block_index'], placement['top_left_row'], placement['top_left_col']]
+                          for placement in placements]
+        return respond(data, {'feasible': placements is not None, 'placements': placements,
+                              'placeable': placeable})
+    
     except Exception as e:
-        print(f"Error in solve endpoint: {str(e)}")
+        logger.exception('feasibility check failed', extra={'request_id': g.request_id})
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/solve-stream', methods=['POST'])
+def solve_stream():
+    """
+    Solve a Block Blast iteration and stream improving solutions as
+    Server-Sent Events.
+    
+    Takes the same payload as /api/solve, including "format". Events are
+    always JSON. Each time the search finds
+    better solutions it sends:
+    
+        event: solutions
+        data: {"solutions": [...], "total_solutions": 3}
+    
+    and when it stops (finished or out of time budget):
+    
+        event: done
+        data: {"solutions": [...], "total_solutions": 3, "complete": true}
+    """
+    try:
+        data = read_payload()
+    except (ValueError, LookupError) as e:
+        return payload_error(e)
+    
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    error = validate_solve_request(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        token = solve_gate.acquire()
+    except Overloaded as e:
+        return overloaded_response(e)
+    
+    events = queue.Queue()
+    request_id, started = g.request_id, g.started
+    
+    def send(name, payload):
+        events.put(f"event: {name}\ndata: {json.dumps(payload)}\n\n")
+    
+    def encode(solutions):
+        return encode_solutions(data, data['board'], data['blocks'], solutions)
+    
+    def run():
+        try:
+            stats = {}
+            solutions = solver.solve_iteration(
+                data['board'], data['blocks'], top_k=data.get('top_k', DEFAULT_TOP_K), stats=stats,
+                time_budget_ms=data.get('time_budget_ms'), evaluator=data.get('evaluator'),
+                on_improve=lambda found: send('solutions', {'solutions': encode(found),
+                                                            'total_solutions': len(found)}))
+            send('done', {'solutions': encode(solutions), 'total_solutions': len(solutions),
+                          'complete': stats.get('complete', True)})
+            logger.info('solve stream', extra={
+                'request_id': request_id, 'board_hash': board_hash(data['board'], data['blocks']),
+                'duration_ms': logs.elapsed_ms(started), 'solutions': len(solutions),
+                'complete': stats.get('complete', True)})
+        except Exception as e:
+            logger.exception('solve stream failed', extra={'request_id': request_id})
+            send('error', {'error': str(e)})
+        finally:
+            solve_gate.release(token)
+            events.put(None)
+    
+    threading.Thread(target=run, daemon=True).start()
+    
+    def generate():
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield event
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def read_batch_items():
+    """
+    Parse a /api/solve-batch body (JSON, MessagePack or NDJSON) into
+    (id, item or None, error or None) triples. Lines of an NDJSON upload that are not valid JSON become
+    per-item errors instead of failing the batch.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        parsed = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                parsed.append(json.loads(line))
+            except ValueError as e:
+                parsed.append(ValueError(f'Invalid JSON: {e}'))
+        top_k = DEFAULT_TOP_K
+        evaluator = None
+        encoding = wire.NESTED
+    else:
+        if wire.binary_mimetype(request.mimetype):
+            data = wire.loads(request.get_data(), request.mimetype)
+        else:
+            data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+            raise ValueError('Expected {"items": [...]} or an NDJSON upload')
+        parsed = data['items']
+        top_k = data.get('top_k', DEFAULT_TOP_K)
+        evaluator = data.get('evaluator')
+        encoding = data.get('format', wire.NESTED)
+    
+    if len(parsed) > MAX_BATCH_ITEMS:
+        raise ValueError(f'At most {MAX_BATCH_ITEMS} items per batch')
+    
+    items = []
+    for position, item in enumerate(parsed):
+        if isinstance(item, Exception):
+            items.append((position, None, str(item)))
+            continue
+        if not isinstance(item, dict):
+            items.append((position, None, 'Item must be an object'))
+            continue
+        item_id = item.get('id', position)
+        item = dict(item, top_k=item.get('top_k', top_k), evaluator=item.get('evaluator', evaluator),
+                    format=item.get('format', encoding))
+        try:
+            item = wire.decode_request(item, solver.board_size)
+        except ValueError as e:
+            items.append((item_id, None, str(e)))
+            continue
+        items.append((item_id, item, validate_solve_request(item)))
+    return items
+
+@app.route('/api/solve-batch', methods=['POST'])
+def solve_batch():
+    """
+    Solve many positions in one request, streaming results as NDJSON.
+    
+    Accepts either a JSON body:
+    {
+        "items": [
+            {"id": "a1", "board": [...], "blocks": [...], "top_k": 3},
+            ...
+        ],
+        "top_k": 3,                   // Optional default for items without one
+        "evaluator": "cells",         // Optional default, as for "top_k"
+        "format": "compact"           // Optional default, as for "top_k"
+    }
+    the same body in MessagePack, or an NDJSON upload (Content-Type:
+    application/x-ndjson) with one item object per line. Items without an
+    "id" are tagged with their position. Results are always NDJSON.
+    
+    Items are solved on the worker pool and each result is written as soon
+    as it is ready, so lines arrive in completion order:
+    
+        {"id": "a1", "solutions": [...], "total_solutions": 3}
+        {"id": "a2", "error": "Board must be 8x8"}
+    
+    A bad item only produces an error line; the rest of the batch still runs.
+    """
+    try:
+        items = read_batch_items()
+    except (ValueError, LookupError) as e:
+        return payload_error(e)
+    
+    valid = [(item_id, item) for item_id, item, error in items if error is None]
+    
+    def generate():
+        for item_id, _, error in items:
+            if error is not None:
+                yield json.dumps({'id': item_id, 'error': error}) + '\n'
+        
+        results = solver_pool.solve_many((item['board'], item['blocks'], item['top_k'], item['evaluator'])
+                                         for _, item in valid)
+        failed = 0
+        try:
+            for position, solutions, error in results:
+                item_id = valid[position][0]
+                if error is not None:
+                    failed += 1
+                    yield json.dumps({'id': item_id, 'error': error}) + '\n'
+                else:
+                    item = valid[position][1]
+                    solutions = encode_solutions(item, item['board'], item['blocks'], solutions)
+                    yield json.dumps({'id': item_id, 'solutions': solutions,
+                                      'total_solutions': len(solutions)}) + '\n'
+            logger.info('solve batch', extra={
+                'request_id': g.request_id, 'duration_ms': logs.elapsed_ms(g.started), 'items': len(items),
+                'invalid': len(items) - len(valid), 'failed': failed})
+        finally:
+            # Cancel queued work if the client goes away
+            results.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """
+    Start a solve in the background and return its job id at once.
+    
+    Takes the same payload as /api/solve, without "lookahead", plus:
+    {
+        "client_id": "tab-3f2a"       // Optional; a new job with the same
+                                      // client_id cancels this one
+    }
+    
+    Returns 202 with the job state (see get_job) and its URL in Location.
+    Responds 429 with a Retry-After header when the job queue is full.
+    """
+    try:
+        data = read_payload()
+    except (ValueError, LookupError) as e:
+        return payload_error(e)
+    if not data:
+        return jsonify({'error': 'No JSON data provided'}), 400
+    
+    error = validate_solve_request(data)
+    if error is None and data.get('lookahead') is not None:
+        error = 'lookahead is not supported for jobs, use /api/solve'
+    client_id = data.get('client_id')
+    if error is None and client_id is not None and (not isinstance(client_id, str) or not 0 < len(client_id) <= 128):
+        error = 'client_id must be a string of at most 128 characters'
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        job = job_manager.submit(data['board'], data['blocks'], top_k=data.get('top_k', DEFAULT_TOP_K),
+                                 time_budget_ms=data.get('time_budget_ms'), evaluator=data.get('evaluator'),
+                                 client_id=client_id, data=data)
+    except Overloaded as e:
+        logger.warning('job rejected', extra={'request_id': g.request_id, 'retry_after': e.retry_after})
+        return overloaded_response(e)
+    
+    logger.info('job submitted', extra={'request_id': g.request_id, 'job_id': job.id, 'client_id': client_id,
+                                        'board_hash': board_hash(data['board'], data['blocks'])})
+    response = jsonify(job.state())
+    response.status_code = 202
+    response.headers['Location'] = f'/api/jobs/{job.id}'
+    return response
+
+def job_not_found(job_id):
+    return jsonify({'error': f'Unknown or expired job {job_id}'}), 404
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    State of a job, with its solutions once it is done.
+    
+    ?wait=10 holds the request until the job ends or that many seconds
+    pass (at most MAX_JOB_WAIT_S), instead of answering at once.
+    
+    Returns:
+    {
+        "job_id": "3f2a...",
+        "status": "running",          // queued, running, done, failed or cancelled
+        "progress": {"done": 12, "total": 40},   // First-level placements searched
+        "elapsed_ms": 812.4,
+        "reason": "superseded",       // Only when cancelled: cancelled,
+                                      // superseded or abandoned
+        "error": "...",               // Only when failed
+        "solutions": [...],           // Only when done, the rest of the
+        ...                           // /api/solve response as well
+    }
+    
+    Jobs nobody polls for a while are cancelled as abandoned, so clients
+    should keep polling until the job ends.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    
+    wait = request.args.get('wait')
+    if wait is not None:
+        try:
+            wait = float(wait)
+        except ValueError:
+            return jsonify({'error': 'wait must be a number of seconds'}), 400
+        if wait > 0:
+            job_manager.wait(job, min(wait, MAX_JOB_WAIT_S))
+    
+    state = job.state()
+    if job.status != DONE:
+        return jsonify(state)
+    
+    data = job.data
+    binary = wire.binary_mimetype(response_mimetype())
+    state.update({
+        'solutions': encode_solutions(data, job.board, job.blocks, job.solutions, binary),
+        'total_solutions': len(job.solutions),
+        'complete': job.stats.get('complete', True),
+        'cached': False
+    })
+    if job.partial is not None:
+        state['partial_solutions'] = encode_solutions(data, job.board, job.blocks, job.partial, binary)
+    if data.get('debug_stats'):
+        state['debug_stats'] = job.stats
+    return respond(data, state)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Cancel a queued or running job; its search stops at the next
+    placement. Returns the job state. Ended jobs are left as they are.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    logger.info('job cancelled', extra={'request_id': g.request_id, 'job_id': job_id, 'status': job.status})
+    return jsonify(job.state())
+
 @app.route('/api/apply-solution', methods=['POST'])
 def apply_solution():
     """
@@ -101,8 +866,8 @@ def apply_solution():
     
     Expected JSON payload:
     {
-        "board": [[0,1,0,...], ...],  // 8x8 grid
-        "blocks": [
+        "board": [[0,1,0,...], ...],  // board_size x board_size grid (8x8 by default)
+        "blocks": [                   // 1 to MAX_BLOCKS square grids, usually three 5x5
             [[0,1,0,...], ...],       // First 5x5 block
             [[1,1,0,...], ...],       // Second 5x5 block  
             [[0,0,1,...], ...]        // Third 5x5 block
@@ -118,10 +883,16 @@ def apply_solution():
     {
         "final_board": [[0,0,0,...], ...]
     }
+    
+    With "format": "compact" the boards may be bitmasks, as for
+    /api/solve, and the response is the final board as a bitmask plus
+    the solution's per-step "boards" and "placed" cells.
     """
     try:
-        data = request.get_json()
-        
+        data = read_payload()
+    except (ValueError, LookupError) as e:
+        return payload_error(e)
+    try:
         if not data:
             return jsonify({'error': 'No JSON data provided'}), 400
         
@@ -132,6 +903,12 @@ def apply_solution():
         if not all([board, blocks, solution]):
             return jsonify({'error': 'Missing required data'}), 400
         
+        if data.get('format') == wire.COMPACT:
+            binary = wire.binary_mimetype(response_mimetype())
+            replayed = wire.compact_solutions(solver, board, blocks, [solution], binary)[0]
+            return respond(data, {'final_board': replayed['final_board'], 'boards': replayed['boards'],
+                                  'placed': replayed['placed']})
+        
         # Apply the solution
         final_board = solver.apply_solution(board, blocks, solution)
         
@@ -142,13 +919,279 @@ def apply_solution():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def read_deal_blocks(data):
+    """
+    The blocks of a session deal, given either as 5x5 grids in
+    "blocks" or as catalog piece names in "pieces".
+    """
+    if data.get('pieces') is None:
+        return data.get('blocks')
+    pieces = data['pieces']
+    if not isinstance(pieces, list) or any(not isinstance(name, str) or name not in STANDARD_PIECES
+                                           for name in pieces):
+        raise ValueError(f'pieces must be a list of: {", ".join(sorted(STANDARD_PIECES))}')
+    return [to_grid(STANDARD_PIECES[name]) for name in pieces]
+
+def session_not_found(session_id):
+    return jsonify({'error': f'Unknown or expired session {session_id}'}), 404
+
+@app.route('/api/sessions', methods=['POST'])
+def create_session():
+    """
+    Start a game kept on the server.
+    
+    Optional JSON payload:
+    {
+        "board": [[0,1,0,...], ...]   // Starting board, empty by default
+    }
+    
+    Returns the session state:
+    {
+        "session_id": "3f2a...",
+        "board": [[0,0,0,...], ...],
+        "turn": 0,
+        "score": 0,
+        "lines_cleared": 0,
+        "pending_solutions": null,    // Solutions of the unaccepted deal, if any
+        "expires_in": 1800            // Seconds until the session expires if idle
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    board = data.get('board')
+    if board is not None and (not isinstance(board, list) or len(board) != solver.board_size
+                              or any(not isinstance(row, list) or len(row) != solver.board_size
+                                     or any(cell not in (0, 1) for cell in row) for row in board)):
+        return jsonify({'error': f'Board must be {solver.board_size}x{solver.board_size} of 0 and 1'}), 400
+    
+    session = sessions.create(board)
+    logger.info('session created', extra={'request_id': g.request_id, 'session_id': session.id})
+    return jsonify(session.state(sessions.ttl)), 201
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_session(session_id):
+    """Current state of a session"""
+    session = sessions.get(session_id)
+    if session is None:
+        return session_not_found(session_id)
+    with session.lock:
+        return jsonify(session.state(sessions.ttl))
+
+@app.route('/api/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    """End a session"""
+    if not sessions.delete(session_id):
+        return session_not_found(session_id)
+    return '', 204
+
+@app.route('/api/sessions/<session_id>/deal', methods=['POST'])
+def session_deal(session_id):
+    """
+    Solve the next pieces (usually three) on the session's board.
+    
+    Expected JSON payload:
+    {
+        "pieces": ["square2", "l4_0", "single"],   // Catalog piece names, or
+        "blocks": [[[0,1,0,...], ...], ...],       // 5x5 grids or bitmasks
+        "top_k": 3,                   // Optional, as for /api/solve
+        "format": "compact",          // Optional, as for /api/solve
+        "time_budget_ms": 200,        // Optional
+        "evaluator": "cells",         // Optional, as for /api/solve
+        "debug_stats": false          // Optional
+    }
+    
+    Returns the solutions as /api/solve does; they stay on the session
+    until one is accepted or the next deal replaces them. An empty list
+    means the pieces do not fit and the game is over; "partial_solutions"
+    then shows how far the best sequences get.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return session_not_found(session_id)
+    try:
+        try:
+            data = read_payload()
+        except (ValueError, LookupError) as e:
+            return payload_error(e)
+        if data is None:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        try:
+            blocks = read_deal_blocks(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        with session.lock:
+            payload = dict(data, board=session.board, blocks=blocks)
+            payload.pop('lookahead', None)
+            error = validate_solve_request(payload)
+            if error:
+                return jsonify({'error': error}), 400
+            
+            stats = {}
+            solutions = result_cache.solve_iteration(session.board, blocks, payload.get('top_k', DEFAULT_TOP_K),
+                                                     functools.partial(solve_gate.run, solver_pool.solve_iteration),
+                                                     stats=stats, time_budget_ms=data.get('time_budget_ms'),
+                                                     evaluator=data.get('evaluator'))
+            metrics.record_solve(stats)
+            session.deal(blocks, solutions)
+            board = session.board
+            turn = session.turn
+        
+        logger.info('session deal', extra={
+            'request_id': g.request_id, 'session_id': session_id, 'turn': turn,
+            'board_hash': stats.get('board_hash'), 'duration_ms': logs.elapsed_ms(g.started),
+            'solutions': len(solutions), 'cached': stats['cached']})
+        
+        binary = wire.binary_mimetype(response_mimetype())
+        response = {
+            'solutions': encode_solutions(data, board, blocks, solutions, binary),
+            'total_solutions': len(solutions),
+            'complete': stats.get('complete', True),
+            'cached': stats['cached'],
+            'turn': turn
+        }
+        if not solutions and stats.get('complete', True):
+            partial = result_cache.best_partial(board, blocks, payload.get('top_k', DEFAULT_TOP_K),
+                                                functools.partial(solve_gate.run, solver.best_partial),
+                                                evaluator=data.get('evaluator'))
+            response['partial_solutions'] = encode_solutions(data, board, blocks, partial, binary)
+        if data.get('debug_stats'):
+            response['debug_stats'] = stats
+        return respond(data, response)
+    
+    except Overloaded as e:
+        logger.warning('solve rejected', extra={'request_id': g.request_id, 'retry_after': e.retry_after})
+        return overloaded_response(e)
+    except Exception as e:
+        logger.exception('session deal failed', extra={'request_id': g.request_id, 'session_id': session_id})
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/sessions/<session_id>/accept', methods=['POST'])
+def session_accept(session_id):
+    """
+    Play one solution of the current deal and advance the session's board.
+    
+    Expected JSON payload:
+    {
+        "index": 0                    // Optional, position in the deal's solutions
+    }
+    
+    Returns the new session state plus "lines_cleared_turn" and "points",
+    the lines cleared and score of the accepted solution.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return session_not_found(session_id)
+    data = request.get_json(silent=True) or {}
+    index = data.get('index', 0)
+    if not _is_int(index):
+        return jsonify({'error': 'index must be an integer'}), 400
+    
+    with session.lock:
+        try:
+            solution = session.accept(index)
+        except SessionError as e:
+            return jsonify({'error': str(e)}), 409
+        response = dict(session.state(sessions.ttl), lines_cleared_turn=solution['lines_cleared'],
+                        points=solution['score'])
+    return jsonify(response)
+
+def profiling_disabled():
+    return jsonify({'error': 'Profiling is disabled, set SOLVER_PROFILE_DIR to enable it'}), 404
+
+def is_admin() -> bool:
+    """Whether the request carries the SOLVER_ADMIN_TOKEN bearer token"""
+    if not ADMIN_TOKEN:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {ADMIN_TOKEN}')
+
+def admin_required():
+    return jsonify({'error': 'Requires Authorization: Bearer <SOLVER_ADMIN_TOKEN>'}), 403
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """
+    Saved solve profiles, newest first (admin token only):
+    {
+        "config": {"sample_rate": 0.0, "mode": "sample", ...},
+        "profiles": [
+            {
+                "name": "20260101T120000-3f2a....collapsed",
+                "url": "/api/profiles/20260101T120000-3f2a....collapsed",
+                "mode": "sample",     // "sample": collapsed stacks, "cprofile": pstats
+                "bytes": 5120,
+                "duration_ms": 812.4, // null for profiles of an earlier process
+                "samples": 640        // null for cprofile
+            },
+            ...
+        ]
+    }
+    """
+    if profiler is None:
+        return profiling_disabled()
+    if not is_admin():
+        return admin_required()
+    profiles = [dict(profile, url=f"/api/profiles/{profile['name']}") for profile in profiler.profiles()]
+    return jsonify({'config': profiler.stats(), 'profiles': profiles})
+
+@app.route('/api/profiles/<name>', methods=['GET'])
+def get_profile(name):
+    """Download one saved profile (admin token only)"""
+    if profiler is None:
+        return profiling_disabled()
+    if not is_admin():
+        return admin_required()
+    path = profiler.path(name)
+    if path is None:
+        return jsonify({'error': f'Unknown profile {name}'}), 404
+    if name.endswith('.collapsed'):
+        return send_file(path, mimetype='text/plain')
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True, download_name=name)
+
+@app.route('/api/profiles/config', methods=['PUT'])
+def configure_profiles():
+    """
+    Admin toggle for sampled profiling, with the admin token only.
+    
+    Expected JSON payload:
+    {
+        "sample_rate": 0.01,          // Optional, fraction of /api/solve calls to profile
+        "mode": "sample"              // Optional, "sample" or "cprofile"
+    }
+    """
+    if profiler is None:
+        return profiling_disabled()
+    if not is_admin():
+        return admin_required()
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'No JSON data provided'}), 400
+    try:
+        profiler.configure(sample_rate=data.get('sample_rate'), mode=data.get('mode'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    logger.info('profiling configured', extra={'request_id': g.request_id, **profiler.stats()})
+    return jsonify(profiler.stats())
+
+@app.route('/api/cache-stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters and size of the solve result cache and its store"""
+    return jsonify(result_cache.stats())
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Request latency histograms and search counters in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'message': 'Block Blast Solver API is running'})
+    return jsonify({'status': 'healthy', 'message': 'Block Blast Solver API is running',
+                    'board_size': solver.board_size, 'max_blocks': MAX_BLOCKS,
+                    'serving': solve_gate.stats(), 'sessions': sessions.stats(), 'jobs': job_manager.stats()})
 
 if __name__ == '__main__':
-    print("Starting Block Blast Solver API...")
-    print("API will be available at: http://localhost:8000")
-    print("Health check: http://localhost:8000/api/health")
-    app.run(debug=True, host='0.0.0.0', port=8000)
+    logger.info('Starting Block Blast Solver API', extra={'url': 'http://localhost:8000',
+                                                         'health': 'http://localhost:8000/api/health'})
+    # Development server only; see serving.py for running under a WSGI server
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=8000, threaded=True)
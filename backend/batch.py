@@ -0,0 +1,145 @@
+"""
+Vectorized evaluation of the last placement level.
+
+Instead of trying the final block's placements one at a time, LeafKernel
+takes a whole stack of boards and the final shape's placement masks as
+uint64 arrays and, in one NumPy pass, tests every (board, placement) pair,
+places it, clears complete lines and scores the result. Scores use the
+solver's score_from_counts, which works elementwise on arrays.
+
+Boards larger than 64 cells are split into several uint64 words along a
+last array axis (two words for 10x10), so every operation is applied per
+word and reduced across words where a single answer is needed.
+"""
+
+from typing import Dict, List, Tuple, Any
+
+import numpy as np
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(values).astype(np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+    def _popcount(values: np.ndarray) -> np.ndarray:
+        as_bytes = values.view(np.uint8).reshape(values.shape + (8,))
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1)
+
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def supports(board_size: int) -> bool:
+    return board_size > 0
+
+
+def word_count(board_size: int) -> int:
+    return -(-board_size * board_size // WORD_BITS)
+
+
+class LeafKernel:
+    """
+    Batched final-level evaluator bound to one solver.
+    """
+
+    def __init__(self, solver):
+        if not supports(solver.board_size):
+            raise ValueError('Batched evaluation needs a positive board_size')
+        self.solver = solver
+        self.line_value = solver.score_from_counts(0, 0, 1)
+        self.words = word_count(solver.board_size)
+        self.shifts = [word * WORD_BITS for word in range(self.words)]
+        self.line_masks = self.split(solver.all_line_masks)
+        self._masks: Dict[Any, np.ndarray] = {}
+
+    def split(self, values: List[int]) -> np.ndarray:
+        """
+        Integer bitboards as a uint64 array: flat for single-word boards,
+        (len(values), words) otherwise.
+        """
+        if self.words == 1:
+            return np.array(values, dtype=np.uint64)
+        return np.array([[(value >> shift) & WORD_MASK for shift in self.shifts] for value in values],
+                        dtype=np.uint64).reshape(len(values), self.words)
+
+    def shape_masks(self, table) -> np.ndarray:
+        masks = self._masks.get(table.cells)
+        if masks is None:
+            masks = self._masks[table.cells] = self.split(table.masks)
+        return masks
+
+    def evaluate(self, boards: List[int], table) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score every placement of table on every board.
+        Returns (board_positions, placement_indices, values, lines) for the
+        pairs that fit, ordered by board then placement index.
+        """
+        masks = self.shape_masks(table)
+        stacked = self.split(boards)
+        line_masks = self.line_masks
+
+        if self.words == 1:
+            # (boards, placements) grid of candidate placements
+            fits = (stacked[:, None] & masks[None, :]) == 0
+            board_positions, placement_indices = np.nonzero(fits)
+            placed = stacked[board_positions] | masks[placement_indices]
+
+            # (candidates, lines) grid of completed lines
+            full = (placed[:, None] & line_masks[None, :]) == line_masks[None, :]
+            cleared = np.bitwise_or.reduce(np.where(full, line_masks[None, :], np.uint64(0)), axis=1)
+            cells = _popcount(placed & ~cleared)
+        else:
+            # Same steps with a trailing words axis
+            fits = ((stacked[:, None, :] & masks[None, :, :]) == 0).all(axis=2)
+            board_positions, placement_indices = np.nonzero(fits)
+            placed = stacked[board_positions] | masks[placement_indices]
+
+            full = ((placed[:, None, :] & line_masks[None, :, :]) == line_masks[None, :, :]).all(axis=2)
+            cleared = np.bitwise_or.reduce(np.where(full[:, :, None], line_masks[None, :, :], np.uint64(0)), axis=1)
+            cells = _popcount(placed & ~cleared).sum(axis=1)
+
+        lines = full.sum(axis=1)
+        values = lines * self.line_value + self.solver.score_from_counts(0, cells, 0)
+        return board_positions, placement_indices, values, lines
+
+    def best(self, board: int, table, k: int, cutoff: float) -> Tuple[List[Tuple[int, int]], int, int]:
+        """
+        The k best placements of table on board as a TopK-style heap list
+        of (value, -index), ignoring values below cutoff. Also returns the
+        number of placements that fit and the lines they complete in total.
+        """
+        return self.best_many([board], table, k, [cutoff])[0]
+
+    def best_many(self, boards: List[int], table, k: int,
+                  cutoffs: List[float]) -> List[Tuple[List[Tuple[int, int]], int, int]]:
+        """
+        best() for a stack of boards evaluated in a single pass.
+        cutoffs[i] applies to boards[i].
+        """
+        board_positions, indices, values, lines = self.evaluate(boards, table)
+        nodes = np.bincount(board_positions, minlength=len(boards))
+        line_clears = np.bincount(board_positions, weights=lines, minlength=len(boards))
+
+        keep = values >= np.array(cutoffs, dtype=np.float64)[board_positions]
+        board_positions = board_positions[keep]
+        indices = indices[keep]
+        values = values[keep]
+
+        # Group by board, best value first, lower index first on ties
+        order = np.lexsort((indices, -values, board_positions))
+        board_positions = board_positions[order]
+        starts = np.searchsorted(board_positions, np.arange(len(boards)))
+        within = np.arange(len(board_positions)) - starts[board_positions]
+        top = within < k
+
+        results: List[Tuple[List[Tuple[int, int]], int, int]] = [
+            ([], int(count), int(cleared)) for count, cleared in zip(nodes, line_clears)]
+        for position, index, value in zip(board_positions[top].tolist(), indices[order][top].tolist(),
+                                          values[order][top].tolist()):
+            results[position][0].append((int(value), -index))
+        for best, _, _ in results:
+            # Ascending (value, -index) is a valid min-heap
+            best.reverse()
+        return results
@@ -0,0 +1,429 @@
+"""
+Reproducible benchmark suite for BlockBlastSolver.solve_iteration.
+
+Every case in the corpus is built deterministically (fixed boards and
+seeded random fills), so runs on the same machine are comparable. Each
+case reports latency percentiles over several repeats, nodes expanded and
+nodes per second, peak traced memory of one extra run, and a fingerprint
+of the returned scores so a speedup that changes results is caught too.
+
+    python benchmark.py                                  # print results
+    python benchmark.py --save baseline.json             # store a baseline
+    python benchmark.py --baseline baseline.json         # exit 1 on regression
+    python benchmark.py --engine jit --cases empty --repeats 10
+    python benchmark.py --scaling                        # board size / block count grid
+    python benchmark.py --wire                           # nested vs compact wire format
+    python benchmark.py --pruning                        # branch and bound vs exhaustive
+
+A case regresses when its median latency exceeds the baseline's by more
+than --threshold (relative) and --min-delta-ms (absolute), or when its
+scores differ from the baseline's.
+
+The scaling grid solves an empty and a 30% filled board for every board
+size in SCALING_SIZES and block count in SCALING_COUNTS, reporting
+latency, nodes and pruned subtrees, to show how the search grows with N
+and K.
+
+The wire comparison times, for every corpus case with solutions, parsing
+the request and serializing the top-DEFAULT_TOP_K response in the nested
+format (json.loads, then json.dumps with sorted keys as jsonify does)
+against the compact one of wire.py. The compact time includes replaying
+the per-step boards, work that nested clients do themselves; it is also
+reported on its own.
+
+The pruning comparison solves every corpus case with and without branch
+and bound. Pruning must never be a net loss: the pruned search should
+match the exhaustive one's scores and not be slower on any case,
+including the empty board with three large blocks, where few subtrees
+can be cut.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Tuple, Any, Optional
+
+import numpy as np
+
+from pieces import STANDARD_PIECES, to_grid
+from solver import BlockBlastSolver, DEFAULT_TOP_K
+from bitboard import board_to_bits
+import wire
+
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA_MS = 1.0
+
+SCALING_SIZES = (8, 10)
+SCALING_COUNTS = (2, 3, 4)
+SCALING_FILLS = (0.0, 0.3)
+# Blocks of the scaling grid, the first K are used
+SCALING_PIECES = ('square2', 'l4_0', 'line3_h', 't4_1')
+
+Case = Tuple[str, List[List[int]], List[List[List[int]]]]
+
+# 4x6 rectangle from test_backend_case.py and debug_identical_blocks.py
+RECTANGLE_BOARD = [[0] * 8, [0] * 8] + [[0, 1, 1, 1, 1, 1, 1, 0] for _ in range(4)] + [[0] * 8, [0] * 8]
+
+
+def _piece(name: str) -> List[List[int]]:
+    return to_grid(STANDARD_PIECES[name])
+
+
+def _canvas(*rows: str) -> List[List[int]]:
+    grid = [[int(cell == '#') for cell in row.ljust(5, '.')] for row in rows]
+    return grid + [[0] * 5 for _ in range(5 - len(grid))]
+
+
+def _random_board(seed: int, fill: float, board_size: int = 8) -> List[List[int]]:
+    rng = random.Random(seed)
+    return [[int(rng.random() < fill) for _ in range(board_size)] for _ in range(board_size)]
+
+
+def _random_blocks(seed: int) -> List[List[List[int]]]:
+    rng = random.Random(seed)
+    names = sorted(STANDARD_PIECES)
+    return [_piece(rng.choice(names)) for _ in range(3)]
+
+
+def corpus() -> List[Case]:
+    """
+    The fixed benchmark positions: (name, board, blocks).
+    """
+    empty = [[0] * 8 for _ in range(8)]
+    # Every row and column has exactly one gap, and only singles fit
+    near_death = [[int((row * 3 + col) % 8 != 0) for col in range(8)] for row in range(8)]
+    cases: List[Case] = [
+        ('backend_case', RECTANGLE_BOARD,
+         [_canvas('###', '###', '###'), _canvas('#', '#', '#', '#'), _canvas('....#', '....#', '....#', '....#')]),
+        ('identical_blocks', RECTANGLE_BOARD,
+         [_canvas('###', '###', '###'), _canvas('.#', '.#', '.#', '.#'), _canvas('.#', '.#', '.#', '.#')]),
+        ('empty_singles', empty, [_piece('single')] * 3),
+        ('empty_small', empty, [_piece('single'), _piece('line2_h'), _piece('corner3_0')]),
+        ('empty_large', empty, [_piece('square3'), _piece('line5_h'), _piece('corner5_0')]),
+        ('empty_identical', empty, [_piece('t4_0')] * 3),
+        ('near_death_singles', near_death, [_piece('single')] * 3),
+        ('near_death_stuck', near_death, [_piece('single'), _piece('single'), _piece('line2_h')]),
+    ]
+    for seed in range(3):
+        cases.append((f'sparse_{seed}', _random_board(100 + seed, 0.2), _random_blocks(200 + seed)))
+    for seed in range(3):
+        cases.append((f'dense_{seed}', _random_board(300 + seed, 0.6), _random_blocks(400 + seed)))
+    return cases
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _fingerprint(solutions: List[Dict[str, Any]]) -> str:
+    scores = [(solution['score'], solution['lines_cleared']) for solution in solutions]
+    return hashlib.blake2b(json.dumps(scores).encode(), digest_size=8).hexdigest()
+
+
+def run_case(solver: BlockBlastSolver, case: Case, repeats: int = DEFAULT_REPEATS,
+             top_k: int = DEFAULT_TOP_K) -> Dict[str, Any]:
+    """
+    Time one case: a warm-up run, `repeats` timed runs, then one run under
+    tracemalloc for peak memory.
+    """
+    _, board, blocks = case
+    solutions = solver.solve_iteration(board, blocks, top_k=top_k)
+
+    latencies = []
+    stats: Dict[str, Any] = {}
+    for _ in range(repeats):
+        stats = {}
+        started = time.perf_counter()
+        solver.solve_iteration(board, blocks, top_k=top_k, stats=stats)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+
+    tracemalloc.start()
+    try:
+        solver.solve_iteration(board, blocks, top_k=top_k)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    p50 = _percentile(latencies, 0.5)
+    nodes = stats.get('nodes')
+    return {
+        'p50_ms': round(p50, 3),
+        'p90_ms': round(_percentile(latencies, 0.9), 3),
+        'min_ms': round(min(latencies), 3),
+        'max_ms': round(max(latencies), 3),
+        'nodes': nodes,
+        'nodes_per_sec': round(nodes / (p50 / 1000.0)) if nodes and p50 else None,
+        'pruned': stats.get('pruned'),
+        'peak_kb': round(peak / 1024.0, 1),
+        'solutions': len(solutions),
+        'fingerprint': _fingerprint(solutions),
+    }
+
+
+def run(engine: str = 'bitboard', repeats: int = DEFAULT_REPEATS, only: Optional[str] = None,
+        batch_leaves: bool = True) -> Dict[str, Any]:
+    """
+    Run every corpus case whose name contains `only` (all by default).
+    """
+    solver = BlockBlastSolver(engine=engine, batch_leaves=batch_leaves)
+    if solver.jit_kernel is not None:
+        solver.jit_kernel.warm_up()
+    results = {}
+    for case in corpus():
+        if only is None or only in case[0]:
+            results[case[0]] = run_case(solver, case, repeats)
+    return {
+        'meta': {
+            'engine': solver.engine,
+            'batch_leaves': solver.leaf_kernel is not None,
+            'repeats': repeats,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+        },
+        'cases': results,
+    }
+
+
+def scaling(engine: str = 'bitboard', repeats: int = 1, sizes: Tuple[int, ...] = SCALING_SIZES,
+            counts: Tuple[int, ...] = SCALING_COUNTS, batch_leaves: bool = True) -> List[Dict[str, Any]]:
+    """
+    Solve the scaling grid, one row per (board size, block count, fill).
+    """
+    rows = []
+    for board_size in sizes:
+        solver = BlockBlastSolver(board_size=board_size, engine=engine, batch_leaves=batch_leaves)
+        for count in counts:
+            blocks = [_piece(name) for name in SCALING_PIECES[:count]]
+            for fill in SCALING_FILLS:
+                board = _random_board(500 + board_size, fill, board_size)
+                result = run_case(solver, (f'{board_size}x{board_size}_k{count}', board, blocks), repeats)
+                rows.append({
+                    'board_size': board_size,
+                    'blocks': count,
+                    'fill': fill,
+                    'p50_ms': result['p50_ms'],
+                    'nodes': result['nodes'],
+                    'pruned': result['pruned'],
+                    'solutions': result['solutions'],
+                })
+    return rows
+
+
+def _scaling_table(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'board':>6}{'blocks':>8}{'fill':>6}{'p50 ms':>11}{'nodes':>11}{'pruned':>10}"]
+    for row in rows:
+        lines.append(f"{row['board_size']:>6}{row['blocks']:>8}{row['fill']:>6.1f}{row['p50_ms']:>11.2f}"
+                     f"{row['nodes'] if row['nodes'] is not None else '-':>11}"
+                     f"{row['pruned'] if row['pruned'] is not None else '-':>10}")
+    return '\n'.join(lines)
+
+
+def wire_formats(repeats: int = 200) -> List[Dict[str, Any]]:
+    """
+    Request parsing and response serialization cost of the nested and the
+    compact wire format, one row per corpus case with solutions.
+    """
+    solver = BlockBlastSolver()
+    n = solver.board_size
+    rows = []
+    for name, board, blocks in corpus():
+        solutions = solver.solve_iteration(board, blocks, top_k=DEFAULT_TOP_K)
+        if not solutions:
+            continue
+        nested_request = json.dumps({'board': board, 'blocks': blocks})
+        compact_request = json.dumps({'board': format(board_to_bits(board, n), 'x'), 'format': wire.COMPACT,
+                                      'blocks': [format(_block_bits(block, n), 'x') for block in blocks]})
+
+        def nested():
+            json.loads(nested_request)
+            return json.dumps({'solutions': solutions}, sort_keys=True, separators=(',', ':'))
+
+        def compact():
+            data = wire.decode_request(json.loads(compact_request), n)
+            return wire.dumps({'solutions': wire.compact_solutions(solver, data['board'], data['blocks'],
+                                                                   solutions)})
+
+        decoded = wire.decode_request(json.loads(compact_request), n)
+
+        def steps():
+            return wire.compact_solutions(solver, decoded['board'], decoded['blocks'], solutions)
+
+        row = {'case': name}
+        for label, encode in (('nested', nested), ('compact', compact), ('steps', steps)):
+            started = time.perf_counter()
+            for _ in range(repeats):
+                body = encode()
+            row[f'{label}_us'] = (time.perf_counter() - started) / repeats * 1e6
+            if label != 'steps':
+                row[f'{label}_bytes'] = len(body)
+        rows.append(row)
+    return rows
+
+
+def _block_bits(block: List[List[int]], board_size: int) -> int:
+    """
+    A block canvas as a bitmask on a board-sized canvas.
+    """
+    return sum(1 << (row * board_size + col) for row, cells in enumerate(block)
+               for col, cell in enumerate(cells) if cell)
+
+
+def _wire_table(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'case':<22}{'nested us':>11}{'compact us':>12}{'of it steps':>13}"
+             f"{'nested B':>10}{'compact B':>11}"]
+    for row in rows:
+        lines.append(f"{row['case']:<22}{row['nested_us']:>11.1f}{row['compact_us']:>12.1f}"
+                     f"{row['steps_us']:>13.1f}{row['nested_bytes']:>10}{row['compact_bytes']:>11}")
+    return '\n'.join(lines)
+
+
+def pruning(engine: str = 'bitboard', repeats: int = DEFAULT_REPEATS,
+            only: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Branch and bound against the exhaustive search, one row per corpus
+    case: the fastest of `repeats` solves each way and whether both found
+    the same scores.
+    """
+    solver = BlockBlastSolver(engine=engine)
+    if solver.jit_kernel is not None:
+        solver.jit_kernel.warm_up()
+    rows = []
+    for name, board, blocks in corpus():
+        if only is not None and only not in name:
+            continue
+        fingerprints = [_fingerprint(solver.solve_iteration(board, blocks, top_k=DEFAULT_TOP_K, prune=prune))
+                        for prune in (True, False)]
+        # Alternating the two keeps background load from favoring either
+        best = {True: float('inf'), False: float('inf')}
+        for _ in range(repeats):
+            for prune in (True, False):
+                started = time.perf_counter()
+                solver.solve_iteration(board, blocks, top_k=DEFAULT_TOP_K, prune=prune)
+                best[prune] = min(best[prune], time.perf_counter() - started)
+        rows.append({
+            'case': name,
+            'pruned_ms': round(best[True] * 1000.0, 3),
+            'full_ms': round(best[False] * 1000.0, 3),
+            'same_results': fingerprints[0] == fingerprints[1],
+        })
+    return rows
+
+
+def _pruning_table(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'case':<22}{'pruned ms':>11}{'full ms':>10}{'ratio':>8}{'same':>6}"]
+    for row in rows:
+        ratio = row['pruned_ms'] / row['full_ms'] if row['full_ms'] else 1.0
+        lines.append(f"{row['case']:<22}{row['pruned_ms']:>11.2f}{row['full_ms']:>10.2f}{ratio:>8.2f}"
+                     f"{'yes' if row['same_results'] else 'NO':>6}")
+    lines.append(f"{'total':<22}{sum(row['pruned_ms'] for row in rows):>11.2f}"
+                 f"{sum(row['full_ms'] for row in rows):>10.2f}")
+    return '\n'.join(lines)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+            min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[str]:
+    """
+    Regressions of current against baseline, as messages. Cases missing
+    from either side are ignored.
+    """
+    problems = []
+    for name, result in current['cases'].items():
+        before = baseline['cases'].get(name)
+        if before is None:
+            continue
+        if before['fingerprint'] != result['fingerprint']:
+            problems.append(f'{name}: results changed')
+        delta = result['p50_ms'] - before['p50_ms']
+        if delta > min_delta_ms and result['p50_ms'] > before['p50_ms'] * (1 + threshold):
+            problems.append(f"{name}: p50 {result['p50_ms']:.3f} ms vs baseline {before['p50_ms']:.3f} ms "
+                            f"(+{delta / before['p50_ms'] * 100:.0f}%)")
+    return problems
+
+
+def _table(results: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> str:
+    lines = [f"{'case':<22}{'p50 ms':>10}{'p90 ms':>10}{'nodes':>11}{'nodes/s':>12}{'peak KB':>10}"
+             + ('   vs base' if baseline else '')]
+    for name, result in results['cases'].items():
+        line = (f"{name:<22}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+                f"{result['nodes'] if result['nodes'] is not None else '-':>11}"
+                f"{result['nodes_per_sec'] if result['nodes_per_sec'] is not None else '-':>12}"
+                f"{result['peak_kb']:>10.1f}")
+        before = baseline['cases'].get(name) if baseline else None
+        if before and before['p50_ms']:
+            line += f"{(result['p50_ms'] / before['p50_ms'] - 1) * 100:>+9.0f}%"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark BlockBlastSolver.solve_iteration.')
+    parser.add_argument('--engine', default='bitboard', choices=('bitboard', 'numpy', 'jit'))
+    parser.add_argument('--no-batch', action='store_true', help='disable batched leaf scoring')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--cases', help='only run cases whose name contains this')
+    parser.add_argument('--scaling', action='store_true',
+                        help='run the board size / block count grid instead of the corpus')
+    parser.add_argument('--wire', action='store_true',
+                        help='compare the nested and compact wire formats instead of solving the corpus')
+    parser.add_argument('--pruning', action='store_true',
+                        help='compare the pruned search with the exhaustive one instead of solving the corpus')
+    parser.add_argument('--save', help='write the results as JSON to this path')
+    parser.add_argument('--baseline', help='compare against results saved earlier')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed relative p50 slowdown, default %(default)s')
+    parser.add_argument('--min-delta-ms', type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help='ignore slowdowns smaller than this, default %(default)s')
+    args = parser.parse_args(argv)
+
+    if args.scaling:
+        rows = scaling(args.engine, args.repeats, batch_leaves=not args.no_batch)
+        print(_scaling_table(rows))
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(rows, f, indent=2, sort_keys=True)
+        return 0
+
+    if args.wire:
+        print(_wire_table(wire_formats()))
+        return 0
+
+    if args.pruning:
+        rows = pruning(args.engine, args.repeats, args.cases)
+        print(_pruning_table(rows))
+        return 0 if all(row['same_results'] for row in rows) else 1
+
+    results = run(args.engine, args.repeats, args.cases, batch_leaves=not args.no_batch)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print(_table(results, baseline))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        for key in ('engine', 'batch_leaves', 'machine', 'cpus'):
+            if baseline['meta'].get(key) != results['meta'][key]:
+                print(f"note: baseline {key} is {baseline['meta'].get(key)!r}, this run {results['meta'][key]!r}",
+                      file=sys.stderr)
+        problems = compare(baseline, results, args.threshold, args.min_delta_ms)
+        for problem in problems:
+            print(f'REGRESSION {problem}', file=sys.stderr)
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
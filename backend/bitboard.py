@@ -0,0 +1,149 @@
+"""
+Bitboard helpers for the Block Blast solver.
+
+The board is packed into a single integer where cell (row, col) lives at
+bit ``row * board_size + col``. Placing a block becomes an OR with a
+precomputed mask, the placement test is a single AND, and line clears are
+checked against precomputed row and column masks.
+"""
+
+from typing import Dict, List, Tuple, Optional
+
+Shape = Tuple[Tuple[int, int], ...]
+
+
+def board_to_bits(board, board_size: int = 8) -> int:
+    """
+    Pack a board (nested lists or numpy array) into an integer bitboard.
+    Any non-zero cell counts as filled.
+    """
+    bits = 0
+    for row in range(board_size):
+        for col in range(board_size):
+            if board[row][col]:
+                bits |= 1 << (row * board_size + col)
+    return bits
+
+
+# (board_size, row bits) -> the row as a list of 0s and 1s, filled on first use
+_ROW_CELLS: Dict[Tuple[int, int], List[int]] = {}
+
+
+def bits_to_board(bits: int, board_size: int = 8) -> List[List[int]]:
+    """
+    Unpack an integer bitboard into a nested list of 0s and 1s.
+    Rows are copied from a table of unpacked row values.
+    """
+    full_row = (1 << board_size) - 1
+    board = []
+    for row in range(board_size):
+        key = (board_size, (bits >> (row * board_size)) & full_row)
+        cells = _ROW_CELLS.get(key)
+        if cells is None:
+            cells = _ROW_CELLS[key] = [(key[1] >> col) & 1 for col in range(board_size)]
+        board.append(cells[:])
+    return board
+
+
+def line_masks(board_size: int = 8) -> Tuple[List[int], List[int]]:
+    """
+    Build the row and column masks for a board of the given size.
+    Returns (row_masks, col_masks).
+    """
+    full_row = (1 << board_size) - 1
+    row_masks = [full_row << (row * board_size) for row in range(board_size)]
+
+    first_col = 0
+    for row in range(board_size):
+        first_col |= 1 << (row * board_size)
+    col_masks = [first_col << col for col in range(board_size)]
+
+    return row_masks, col_masks
+
+
+def block_mask(block_coords: List[Tuple[int, int]], top_left_row: int, top_left_col: int,
+               board_size: int = 8) -> Optional[int]:
+    """
+    Build the mask of a block placed with its canvas top-left corner at the
+    given position. Returns None if any cell falls outside the board.
+    """
+    mask = 0
+    for block_row, block_col in block_coords:
+        abs_row = top_left_row + block_row
+        abs_col = top_left_col + block_col
+        if abs_row < 0 or abs_row >= board_size or abs_col < 0 or abs_col >= board_size:
+            return None
+        mask |= 1 << (abs_row * board_size + abs_col)
+    return mask
+
+
+def normalize_shape(block_coords: List[Tuple[int, int]]) -> Tuple[Tuple[int, int], Shape]:
+    """
+    Shift block coordinates so the shape's bounding box starts at (0, 0).
+    Returns ((min_row, min_col), cells); the first part is the offset of the
+    bounding box inside the drawing canvas, the second part identifies the
+    shape regardless of where it was drawn.
+    """
+    min_row = min(row for row, _ in block_coords)
+    min_col = min(col for _, col in block_coords)
+    cells = tuple(sorted((row - min_row, col - min_col) for row, col in block_coords))
+    return (min_row, min_col), cells
+
+
+class PlacementTable:
+    """
+    Every in-bounds placement of one normalized shape on the board.
+
+    Entry i is anchored at anchors[i], the board cell that the top-left of
+    the shape's bounding box lands on. Entries are in row-major anchor
+    order, matching the order the original canvas loops visited them.
+    masks[i] holds the cells the placement fills and touched[i] the
+    row/column masks it overlaps - the only lines it can complete.
+    """
+
+    __slots__ = ('cells', 'size', 'height', 'width', 'anchors', 'masks', 'touched', 'entries')
+
+    def __init__(self, cells: Shape, board_size: int, all_line_masks: List[int]):
+        self.cells = cells
+        self.size = len(cells)
+        self.height = max(row for row, _ in cells) + 1
+        self.width = max(col for _, col in cells) + 1
+        self.anchors: List[Tuple[int, int]] = []
+        self.masks: List[int] = []
+        self.touched: List[List[int]] = []
+
+        for anchor_row in range(board_size - self.height + 1):
+            for anchor_col in range(board_size - self.width + 1):
+                mask = block_mask(cells, anchor_row, anchor_col, board_size)
+                self.anchors.append((anchor_row, anchor_col))
+                self.masks.append(mask)
+                self.touched.append([line for line in all_line_masks if line & mask])
+
+        # (index, mask, touched) triples for the search loops
+        self.entries = list(zip(range(len(self.masks)), self.masks, self.touched))
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+
+def clear_lines(bits: int, masks: List[int]) -> Tuple[int, int]:
+    """
+    Clear every complete line among the given masks.
+    All lines are detected before any is cleared, so a row and a column
+    sharing a cell are both counted. Returns (new_bits, lines_cleared).
+    """
+    cleared = 0
+    lines_cleared = 0
+    for mask in masks:
+        if bits & mask == mask:
+            cleared |= mask
+            lines_cleared += 1
+    return bits & ~cleared, lines_cleared
+
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(bits: int) -> int:
+        """Number of filled cells on a bitboard."""
+        return bin(bits).count('1')
@@ -0,0 +1,355 @@
+"""
+In-process LRU cache of solve results.
+
+Clients re-submit the same board and blocks constantly, so /api/solve
+looks results up here before searching. Entries are keyed on a canonical
+form of the request: the board is tried under all 8 symmetries of the
+square (rotations and mirrors), each block shape is transformed the same
+way, and the smallest (board, sorted shapes) encoding wins. Mirrored,
+rotated or transposed inputs, and the same blocks in a different order,
+all share one entry.
+
+The canonical request is what actually gets solved; its solutions are
+mapped back to the caller's orientation and block indices on the way out.
+Scores, line counts and final boards are invariant under the symmetries,
+and solving the canonical form on a miss too means a request always gets
+the same answer whether or not it was cached.
+
+An optional SolutionStore (store.py) adds a persistent tier behind the
+memory entries: it is consulted on a memory miss and complete results are
+written through to it.
+
+Leaf evaluators (evaluators.py) are invariant under the symmetries too;
+results of a non-default evaluator are cached under their own key.
+
+Concurrent misses on the same canonical request are coalesced: the first
+one solves, the others wait for its result instead of searching again.
+
+When no ordering fits every block, the best partial solutions are kept on
+the memory entry next to the empty result, so repeats of a lost position
+do not search every subset of the blocks again.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Any, Optional, Callable
+
+from bitboard import board_to_bits, bits_to_board, normalize_shape, Shape
+from pieces import to_grid
+from evaluators import DEFAULT_EVALUATOR
+
+DEFAULT_MAX_ENTRIES = 1024
+
+# Transform t transposes when t & 4, then flips rows when t & 1 and
+# columns when t & 2
+SYMMETRIES = 8
+
+
+def transform_cell(row: int, col: int, board_size: int, transform: int) -> Tuple[int, int]:
+    if transform & 4:
+        row, col = col, row
+    if transform & 1:
+        row = board_size - 1 - row
+    if transform & 2:
+        col = board_size - 1 - col
+    return row, col
+
+
+def key_hash(key) -> str:
+    """
+    Short stable hash of a canonical key, for logs.
+    """
+    board, shapes = key
+    text = format(board, 'x') + '/' + '|'.join(';'.join(f'{row},{col}' for row, col in shape) for shape in shapes)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+class Canonical:
+    """
+    Canonical form of one solve request and how to map its solutions back.
+    """
+
+    __slots__ = ('key', 'transform', 'order', 'offsets', 'board', 'shapes')
+
+    def __init__(self, key, transform: int, order: List[int], offsets: List[Tuple[int, int]],
+                 board: int, shapes: List[Shape]):
+        self.key = key
+        self.transform = transform
+        # order[j] is the caller's index of canonical block j
+        self.order = order
+        # Canvas offset of each of the caller's blocks
+        self.offsets = offsets
+        self.board = board
+        self.shapes = shapes
+
+
+class Flight:
+    """
+    A solve in progress that identical requests can wait on.
+    """
+
+    __slots__ = ('top_k', 'done', 'solutions', 'complete', 'error')
+
+    def __init__(self, top_k: int):
+        self.top_k = top_k
+        self.done = threading.Event()
+        self.solutions: Optional[List[Dict[str, Any]]] = None
+        self.complete = True
+        self.error: Optional[BaseException] = None
+
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of solve results keyed on canonical requests.
+    """
+
+    def __init__(self, solver, max_entries: int = DEFAULT_MAX_ENTRIES, store=None):
+        self.solver = solver
+        self.max_entries = max_entries
+        self.store = store
+        n = solver.board_size
+        # Bit i of a board moves to bit forward[t][i] under transform t
+        self.forward = [[row * n + col for row, col in
+                         (transform_cell(i // n, i % n, n, t) for i in range(n * n))]
+                        for t in range(SYMMETRIES)]
+        self.inverse = []
+        for t in range(SYMMETRIES):
+            inverse = [0] * (n * n)
+            for i, j in enumerate(self.forward[t]):
+                inverse[j] = i
+            self.inverse.append(inverse)
+
+        self.lock = threading.Lock()
+        # key -> (top_k, canonical solutions, canonical partial solutions or
+        # None until asked for), least recently used first
+        self.entries: 'OrderedDict[Any, Tuple[int, List[Dict[str, Any]], Optional[List[Dict[str, Any]]]]]' = \
+            OrderedDict()
+        # (canonical key, solve options) -> Flight of the solve computing it
+        self.in_flight: Dict[Any, Flight] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def _permute(self, bits: int, table: List[int]) -> int:
+        moved = 0
+        while bits:
+            low = bits & -bits
+            moved |= 1 << table[low.bit_length() - 1]
+            bits ^= low
+        return moved
+
+    def canonicalize(self, board: List[List[int]], blocks: List[List[List[int]]]) -> Optional[Canonical]:
+        """
+        Canonical form of a request, or None if a block is empty.
+        """
+        n = self.solver.board_size
+        offsets = []
+        shapes = []
+        for block in blocks:
+            coords = self.solver.extract_block_coordinates(block)
+            if not coords:
+                return None
+            offset, cells = normalize_shape(coords)
+            offsets.append(offset)
+            shapes.append(cells)
+
+        bits = board_to_bits(board, n)
+        best = None
+        for t in range(SYMMETRIES):
+            moved = [normalize_shape([transform_cell(row, col, n, t) for row, col in cells])[1]
+                     for cells in shapes]
+            order = sorted(range(len(moved)), key=lambda i: moved[i])
+            key = (self._permute(bits, self.forward[t]), tuple(moved[i] for i in order))
+            if best is None or key < best[0]:
+                best = (key, t, order)
+
+        key, t, order = best
+        return Canonical(key, t, order, offsets, key[0], list(key[1]))
+
+    def restore(self, canonical: Canonical, solutions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Map solutions of the canonical request back to the caller's
+        orientation and block indices. Always returns fresh dicts.
+        """
+        n = self.solver.board_size
+        inverse = self.inverse[canonical.transform]
+        restored = []
+        for solution in solutions:
+            placements = []
+            for placement in solution['placements']:
+                block = placement['block_index']
+                cells = [inverse[(placement['top_left_row'] + row) * n + placement['top_left_col'] + col]
+                         for row, col in canonical.shapes[block]]
+                original = canonical.order[block]
+                offset_row, offset_col = canonical.offsets[original]
+                placements.append({
+                    'block_index': original,
+                    'top_left_row': min(cell // n for cell in cells) - offset_row,
+                    'top_left_col': min(cell % n for cell in cells) - offset_col,
+                })
+
+            final = self._permute(board_to_bits(solution['final_board'], n), inverse)
+            restored.append(dict(solution,
+                                 block_order=[canonical.order[block] for block in solution['block_order']],
+                                 placements=placements,
+                                 final_board=bits_to_board(final, n)))
+            if 'unplaced' in solution:
+                restored[-1]['unplaced'] = sorted(canonical.order[block] for block in solution['unplaced'])
+        return restored
+
+    def solve_iteration(self, board: List[List[int]], blocks: List[List[List[int]]], top_k: int,
+                        solve: Callable[..., List[Dict[str, Any]]],
+                        stats: Optional[Dict[str, Any]] = None, **options) -> List[Dict[str, Any]]:
+        """
+        Cached solve. solve(board, blocks, top_k=, stats=, **options) runs on
+        a miss, against the canonical request, unless an identical solve is
+        already running, in which case its result is shared. Only complete
+        results are stored; stats['cached'] says whether this was a hit,
+        stats['coalesced'] whether it waited on another request's solve and
+        stats['board_hash'] identifies the canonical request.
+        """
+        stats = {} if stats is None else stats
+        canonical = self.canonicalize(board, blocks)
+        if canonical is None:
+            stats['cached'] = False
+            return solve(board, blocks, top_k=top_k, stats=stats, **options)
+        stats['board_hash'] = key_hash(canonical.key)
+        key = self._key(canonical, options.get('evaluator'))
+        # Other evaluators score differently, so the store, which holds
+        # default scores only, is skipped for them
+        store = self.store if len(key) == 2 else None
+
+        with self.lock:
+            entry = self.entries.get(key)
+            # An entry for a larger top_k holds every smaller top_k as a prefix
+            if entry is not None and entry[0] >= top_k:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                stats['cached'] = True
+                stats['complete'] = True
+                return self.restore(canonical, entry[1][:top_k])
+            self.misses += 1
+
+        if store is not None:
+            entry = store.get(key)
+            if entry is not None and entry[0] >= top_k:
+                self._remember(key, entry[0], entry[1])
+                stats['cached'] = True
+                stats['complete'] = True
+                return self.restore(canonical, entry[1][:top_k])
+
+        flight_key = (key, tuple(sorted(options.items())))
+        with self.lock:
+            flight = self.in_flight.get(flight_key)
+            shared = flight is not None and flight.top_k >= top_k
+            if shared:
+                self.coalesced += 1
+            else:
+                # A running solve for a smaller top_k is left alone
+                leader = flight is None
+                flight = Flight(top_k)
+                if leader:
+                    self.in_flight[flight_key] = flight
+
+        stats['cached'] = False
+        stats['coalesced'] = shared
+        if shared:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            stats['complete'] = flight.complete
+            return self.restore(canonical, flight.solutions[:top_k])
+
+        try:
+            solutions = solve(bits_to_board(canonical.board, self.solver.board_size),
+                              [to_grid(shape, 1 + max(max(cell) for cell in shape)) for shape in canonical.shapes],
+                              top_k=top_k, stats=stats, **options)
+            flight.solutions = solutions
+            flight.complete = stats.get('complete', True)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            if leader:
+                with self.lock:
+                    del self.in_flight[flight_key]
+            flight.done.set()
+
+        if flight.complete:
+            self._remember(key, top_k, solutions)
+            if store is not None:
+                store.put(key, top_k, solutions)
+
+        return self.restore(canonical, solutions)
+
+    def best_partial(self, board: List[List[int]], blocks: List[List[List[int]]], top_k: int,
+                     solve_partial: Callable[..., List[Dict[str, Any]]],
+                     evaluator: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Best partial solutions of a request whose full solve found none.
+        solve_partial(board, blocks, top_k, evaluator=) runs against the
+        canonical request unless the cache entry of that empty result
+        already holds them; what it returns is kept on the entry.
+        """
+        canonical = self.canonicalize(board, blocks)
+        if canonical is None:
+            return solve_partial(board, blocks, top_k, evaluator=evaluator)
+        key = self._key(canonical, evaluator)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] is not None and entry[0] >= top_k:
+                self.entries.move_to_end(key)
+                return self.restore(canonical, entry[2][:top_k])
+        # Solved for the entry's top_k so it can answer every request it does
+        search_k = max(top_k, entry[0]) if entry is not None else top_k
+
+        partial = solve_partial(bits_to_board(canonical.board, self.solver.board_size),
+                                [to_grid(shape, 1 + max(max(cell) for cell in shape)) for shape in canonical.shapes],
+                                search_k, evaluator=evaluator)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not entry[1] and entry[0] <= search_k:
+                self.entries[key] = (entry[0], entry[1], partial)
+        return self.restore(canonical, partial[:top_k])
+
+    @staticmethod
+    def _key(canonical: Canonical, evaluator: Optional[str]):
+        # Other evaluators score differently, so their results get their own entries
+        evaluator = evaluator or DEFAULT_EVALUATOR
+        return canonical.key if evaluator == DEFAULT_EVALUATOR else canonical.key + (evaluator,)
+
+    def _remember(self, key, top_k: int, solutions: List[Dict[str, Any]]) -> None:
+        with self.lock:
+            if self.max_entries <= 0:
+                return
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < top_k:
+                self.entries[key] = (top_k, solutions, None)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            stats = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self.in_flight),
+            }
+        if self.store is not None:
+            stats['store'] = self.store.stats()
+        return stats
@@ -0,0 +1,216 @@
+"""
+Leaf evaluators: what a final board is worth to the search.
+
+A solution's score is base(initial cells) + line bonus + value(final
+board), and the search only ever asks an evaluator for the last part. The
+default 'cells' evaluator is the filled-cell term of score_from_counts,
+which the JIT kernel and the batched leaf kernel compute natively.
+
+The 'quality' evaluator also penalizes
+
+- holes: empty cells whose four neighbours are filled or off the board,
+- transitions: filled/empty changes between neighbouring cells along rows
+  and columns, a measure of how fragmented the empty space is,
+- misfits: catalog pieces that fit nowhere on the board.
+
+Holes and transitions are a handful of shifts and masks on the bitboard.
+Piece fits are bitwise too, for the whole catalog at once: every piece
+gets its own board-sized segment of one packed integer, and the anchors
+where the pieces fit are the AND of the replicated empty cells shifted by
+each cell offset (segments of pieces without that offset are left
+alone). A SWAR test then counts the segments with an anchor left.
+
+Fits are updated incrementally at the leaves: prepare() packs the fitting
+anchors of the parent board once, and a leaf that clears no line only
+removes the anchors its placement covers, a precomputed packed mask per
+placement. Only leaves that clear lines recompute fits from scratch.
+
+Every penalty is non-negative, so an evaluator's value never exceeds the
+cell term; the search's upper bound relies on that. Features are also
+invariant under rotations and reflections of the board (the catalog holds
+every orientation of each piece), which the result cache relies on.
+"""
+
+from typing import Dict, List, Any, Optional
+
+from bitboard import popcount, Shape
+from pieces import STANDARD_PIECES
+
+DEFAULT_EVALUATOR = 'cells'
+
+HOLE_WEIGHT = 4
+TRANSITION_WEIGHT = 1
+MISFIT_WEIGHT = 5
+
+
+class CellEvaluator:
+    """
+    The solver's own score: the filled-cell term of score_from_counts.
+    """
+
+    name = 'cells'
+    # Leaf values depend on the filled-cell count only, so the JIT and
+    # batched kernels can compute them
+    counts_only = True
+
+    def __init__(self, solver):
+        self.solver = solver
+        self.board_size = solver.board_size
+
+    def value(self, board: int) -> int:
+        """
+        Value of a final board, computed from scratch.
+        """
+        return self.solver.score_from_counts(0, popcount(board), 0)
+
+    def prepare(self, board: int) -> Any:
+        """
+        Per-parent state shared by the leaf_value calls of its children.
+        """
+        return None
+
+    def leaf_value(self, state: Any, final: int, mask: int, lines: int) -> int:
+        """
+        Value of final, reached from the prepared parent board by placing
+        mask and clearing `lines` lines.
+        """
+        return self.value(final)
+
+
+class QualityEvaluator(CellEvaluator):
+    """
+    Cell term minus weighted hole, transition and misfit counts.
+    """
+
+    name = 'quality'
+    counts_only = False
+
+    def __init__(self, solver, pieces: Optional[List[Shape]] = None, hole_weight: int = HOLE_WEIGHT,
+                 transition_weight: int = TRANSITION_WEIGHT, misfit_weight: int = MISFIT_WEIGHT):
+        super().__init__(solver)
+        if min(hole_weight, transition_weight, misfit_weight) < 0:
+            raise ValueError('Evaluator weights must be non-negative')
+        self.hole_weight = hole_weight
+        self.transition_weight = transition_weight
+        self.misfit_weight = misfit_weight
+
+        n = self.board_size
+        self.full = (1 << (n * n)) - 1
+        first_col = sum(1 << (row * n) for row in range(n))
+        last_col = first_col << (n - 1)
+        self.not_first_col = self.full & ~first_col
+        self.not_last_col = self.full & ~last_col
+        # Cells with a neighbour below
+        self.above_last_row = (1 << (n * (n - 1))) - 1
+
+        shapes = [cells for cells in (pieces if pieces is not None else STANDARD_PIECES.values())
+                  if max(row for row, _ in cells) < n and max(col for _, col in cells) < n]
+        # Piece p owns bits [p * stride, (p + 1) * stride) of a packed integer
+        stride = n * n
+        self.piece_count = len(shapes)
+        self.replicate = sum(1 << (piece * stride) for piece in range(len(shapes)))
+        self.segment_low = ((1 << (stride - 1)) - 1) * self.replicate
+        self.segment_high = (1 << (stride - 1)) * self.replicate
+        # Anchors that keep each piece on the board
+        self.valid = 0
+        # Cell offset -> segments of the pieces that have it
+        users: Dict[int, int] = {}
+        for piece, cells in enumerate(shapes):
+            height = max(row for row, _ in cells) + 1
+            width = max(col for _, col in cells) + 1
+            anchors = sum(1 << (row * n + col) for row in range(n - height + 1) for col in range(n - width + 1))
+            self.valid |= anchors << (piece * stride)
+            for row, col in cells:
+                users[row * n + col] = users.get(row * n + col, 0) | (self.full << (piece * stride))
+        # (offset, segments of the pieces that have it, segments of the others)
+        self.offsets = [(offset, segments, self.full * self.replicate & ~segments)
+                        for offset, segments in sorted(users.items())]
+        # Placement mask -> packed anchors it blocks, shared by every search
+        self.blocked: Dict[int, int] = {}
+
+    def holes(self, board: int) -> int:
+        empty = self.full & ~board
+        n = self.board_size
+        open_neighbour = (((empty >> 1) & self.not_last_col) | ((empty << 1) & self.not_first_col)
+                          | (empty >> n) | ((empty << n) & self.full))
+        return popcount(empty & ~open_neighbour)
+
+    def transitions(self, board: int) -> int:
+        n = self.board_size
+        return (popcount((board ^ (board >> 1)) & self.not_last_col)
+                + popcount((board ^ (board >> n)) & self.above_last_row))
+
+    def fitting(self, empty: int) -> int:
+        """
+        Packed anchors where each catalog piece fits into the empty cells.
+        Shifting right pulls the next segment's bits only into anchors that
+        would put the piece off the board, which are not valid anyway.
+        """
+        replicated = empty * self.replicate
+        anchors = self.valid
+        for offset, _, others in self.offsets:
+            anchors &= (replicated >> offset) | others
+        return anchors
+
+    def fit_count(self, anchors: int) -> int:
+        """
+        Number of pieces with at least one anchor in a packed anchor set.
+        """
+        low = self.segment_low
+        return popcount((((anchors & low) + low) | anchors) & self.segment_high)
+
+    def misfits(self, board: int) -> int:
+        return self.piece_count - self.fit_count(self.fitting(self.full & ~board))
+
+    def value(self, board: int) -> int:
+        return (self.solver.score_from_counts(0, popcount(board), 0)
+                - self.hole_weight * self.holes(board)
+                - self.transition_weight * self.transitions(board)
+                - self.misfit_weight * self.misfits(board))
+
+    def prepare(self, board: int) -> int:
+        """
+        Packed anchors where each piece fits on the parent board.
+        """
+        return self.fitting(self.full & ~board)
+
+    def _blocked(self, mask: int) -> int:
+        """
+        Packed anchors whose placement overlaps mask.
+        """
+        blocked = self.blocked.get(mask)
+        if blocked is None:
+            replicated = mask * self.replicate
+            blocked = 0
+            for offset, segments, _ in self.offsets:
+                blocked |= (replicated >> offset) & segments
+            blocked = self.blocked[mask] = blocked & self.valid
+        return blocked
+
+    def leaf_value(self, state: int, final: int, mask: int, lines: int) -> int:
+        if lines:
+            # Cleared cells can make room for pieces that did not fit before
+            anchors = self.fitting(self.full & ~final)
+        else:
+            blocked = self.blocked.get(mask)
+            anchors = state & ~(blocked if blocked is not None else self._blocked(mask))
+        # holes(), transitions() and fit_count() inlined, this runs once per leaf
+        n = self.board_size
+        empty = self.full & ~final
+        open_neighbour = (((empty >> 1) & self.not_last_col) | ((empty << 1) & self.not_first_col)
+                          | (empty >> n) | ((empty << n) & self.full))
+        holes = popcount(empty & ~open_neighbour)
+        transitions = (popcount((final ^ (final >> 1)) & self.not_last_col)
+                       + popcount((final ^ (final >> n)) & self.above_last_row))
+        low = self.segment_low
+        fits = popcount((((anchors & low) + low) | anchors) & self.segment_high)
+        return (self.solver.score_from_counts(0, popcount(final), 0)
+                - self.hole_weight * holes
+                - self.transition_weight * transitions
+                - self.misfit_weight * (self.piece_count - fits))
+
+
+EVALUATORS: Dict[str, type] = {
+    CellEvaluator.name: CellEvaluator,
+    QualityEvaluator.name: QualityEvaluator,
+}
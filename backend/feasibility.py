@@ -0,0 +1,75 @@
+"""
+Feasibility check: can every block be placed, in some order?
+
+A depth-first search over bitboards that stops at the first complete
+placement sequence instead of ranking them all. Blocks with the same
+shape are only tried once per level, and states that are known dead ends
+(board, remaining shapes) are remembered, so an infeasible position costs
+at most one pass over its distinct states and a feasible one usually
+returns after a handful of placements.
+
+Larger shapes are tried first: they are the ones that stop fitting as the
+board fills up, so a dead end shows up early.
+"""
+
+from typing import Dict, List, Tuple, Any, Optional, Set
+
+from bitboard import PlacementTable, clear_lines
+
+
+def find_sequence(board: int, tables: List[PlacementTable], all_line_masks: List[int],
+                  stats: Optional[Dict[str, Any]] = None) -> Optional[List[Tuple[int, int]]]:
+    """
+    First sequence that places every table's shape on board, as
+    (position in tables, placement index) pairs in play order, or None.
+    """
+    # Identical shapes share a table, so the table identifies the shape
+    shape_ids: Dict[int, int] = {}
+    block_shapes = [shape_ids.setdefault(id(table), len(shape_ids)) for table in tables]
+    shape_tables = {shape: tables[block_shapes.index(shape)] for shape in set(block_shapes)}
+    # Blocks still to place for each shape, largest shapes first
+    order = sorted(shape_tables, key=lambda shape: -shape_tables[shape].size)
+
+    _, preexisting_lines = clear_lines(board, all_line_masks)
+    dead: Set[Tuple[int, Tuple[int, ...]]] = set()
+    nodes = 0
+
+    def place(current: int, remaining: Tuple[int, ...], first: bool) -> Optional[List[Tuple[int, int]]]:
+        nonlocal nodes
+        if not remaining:
+            return []
+        key = (current, remaining)
+        if key in dead:
+            return None
+        for shape in order:
+            if shape not in remaining:
+                continue
+            position = remaining.index(shape)
+            rest = remaining[:position] + remaining[position + 1:]
+            for index, mask, touched in shape_tables[shape].entries:
+                if current & mask:
+                    continue
+                nodes += 1
+                lines = all_line_masks if first and preexisting_lines else touched
+                after, _ = clear_lines(current | mask, lines)
+                found = place(after, rest, False)
+                if found is not None:
+                    return [(shape, index)] + found
+        dead.add(key)
+        return None
+
+    shape_sequence = place(board, tuple(sorted(block_shapes)), True)
+    if stats is not None:
+        stats['feasibility_nodes'] = nodes
+        stats['dead_states'] = len(dead)
+    if shape_sequence is None:
+        return None
+
+    # Hand each shape's placements to the blocks of that shape in index order
+    unused = list(range(len(tables)))
+    sequence = []
+    for shape, index in shape_sequence:
+        block = next(block for block in unused if block_shapes[block] == shape)
+        unused.remove(block)
+        sequence.append((block, index))
+    return sequence
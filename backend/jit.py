@@ -0,0 +1,168 @@
+"""
+Optional JIT-compiled search kernel.
+
+When Numba is installed, the whole three-level search (placement test,
+place, line clears, scoring and top-k collection) is compiled to machine
+code. BlockBlastSolver uses it for engine='jit' and falls back to the
+Python bitboard search when Numba is missing.
+
+The kernel scores leaves with the coefficients of score_from_counts, which
+is linear in its three arguments, and produces the same (score, rank)
+leaves as the Python search, so results are identical.
+"""
+
+from itertools import permutations
+from typing import Dict, List, Tuple, Any, Optional
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - depends on the environment
+    numba = None
+
+
+def available() -> bool:
+    return numba is not None
+
+
+def supports(board_size: int) -> bool:
+    return board_size * board_size <= 64
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _popcount(bits):
+        bits = bits - ((bits >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        bits = (bits & np.uint64(0x3333333333333333)) + ((bits >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        bits = (bits + (bits >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return np.int64((bits * np.uint64(0x0101010101010101)) >> np.uint64(56))
+
+    @numba.njit(cache=True)
+    def _clear(bits, line_masks):
+        cleared = np.uint64(0)
+        lines = 0
+        for i in range(line_masks.shape[0]):
+            mask = line_masks[i]
+            if bits & mask == mask:
+                cleared |= mask
+                lines += 1
+        return bits & ~cleared, lines
+
+    @numba.njit(cache=True)
+    def _push(scores, ranks, count, score, rank):
+        # scores/ranks are kept sorted best first: score desc, rank asc
+        k = scores.shape[0]
+        if count == k:
+            if score < scores[k - 1] or (score == scores[k - 1] and rank > ranks[k - 1]):
+                return count
+            position = k - 1
+        else:
+            position = count
+            count += 1
+        while position > 0 and (scores[position - 1] < score
+                                or (scores[position - 1] == score and ranks[position - 1] > rank)):
+            scores[position] = scores[position - 1]
+            ranks[position] = ranks[position - 1]
+            position -= 1
+        scores[position] = score
+        ranks[position] = rank
+        return count
+
+    @numba.njit(cache=True)
+    def _search(board, masks, counts, orders, line_masks, base, k,
+                line_value, initial_value, final_value):
+        scores = np.empty(k, dtype=np.int64)
+        ranks = np.empty(k, dtype=np.int64)
+        count = 0
+        # Nodes at levels 1-3, rejected placements, lines completed
+        counters = np.zeros(5, dtype=np.int64)
+        base_score = initial_value * _popcount(board)
+
+        for order_index in range(orders.shape[0]):
+            first = orders[order_index, 0]
+            second = orders[order_index, 1]
+            third = orders[order_index, 2]
+            for i1 in range(counts[first]):
+                mask1 = masks[first, i1]
+                if board & mask1:
+                    counters[3] += 1
+                    continue
+                counters[0] += 1
+                board1, lines1 = _clear(board | mask1, line_masks)
+                counters[4] += lines1
+                rank1 = (order_index * base + i1) * base
+                for i2 in range(counts[second]):
+                    mask2 = masks[second, i2]
+                    if board1 & mask2:
+                        counters[3] += 1
+                        continue
+                    counters[1] += 1
+                    board2, lines2 = _clear(board1 | mask2, line_masks)
+                    counters[4] += lines2
+                    rank2 = (rank1 + i2) * base
+                    for i3 in range(counts[third]):
+                        mask3 = masks[third, i3]
+                        if board2 & mask3:
+                            counters[3] += 1
+                            continue
+                        counters[2] += 1
+                        board3, lines3 = _clear(board2 | mask3, line_masks)
+                        counters[4] += lines3
+                        score = (base_score + line_value * (lines1 + lines2 + lines3)
+                                 + final_value * _popcount(board3))
+                        count = _push(scores, ranks, count, score, rank2 + i3)
+
+        return scores[:count], ranks[:count], counters
+
+
+class JitKernel:
+    """
+    Compiled three-block search bound to one solver.
+    """
+
+    def __init__(self, solver):
+        if numba is None:
+            raise RuntimeError('Numba is not installed')
+        if not supports(solver.board_size):
+            raise ValueError('The JIT kernel needs board_size <= 8')
+        self.solver = solver
+        # score_from_counts(initial, final, lines) is linear, so these three
+        # coefficients reproduce it inside compiled code
+        self.line_value = solver.score_from_counts(0, 0, 1)
+        self.initial_value = solver.score_from_counts(1, 0, 0)
+        self.final_value = solver.score_from_counts(0, 1, 0)
+        self.line_masks = np.array(solver.all_line_masks, dtype=np.uint64)
+        self.orders = np.array(list(permutations(range(3))), dtype=np.int64)
+
+    def search(self, board: int, tables: List[Any], k: int,
+               stats: Optional[Dict[str, Any]] = None) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Run the full search for three placement tables (in block order).
+        Returns ((score, rank) pairs best first, nodes expanded). Per-level
+        counters go into stats if given.
+        """
+        counts = np.array([len(table) for table in tables], dtype=np.int64)
+        masks = np.zeros((3, int(counts.max())), dtype=np.uint64)
+        for row, table in enumerate(tables):
+            masks[row, :len(table)] = table.masks
+
+        scores, ranks, counters = _search(np.uint64(board), masks, counts, self.orders, self.line_masks,
+                                          self.solver.rank_base, k, self.line_value,
+                                          self.initial_value, self.final_value)
+        level_nodes = counters[:3].tolist()
+        if stats is not None:
+            stats.update({
+                'level_nodes': level_nodes,
+                'leaves': level_nodes[-1],
+                'rejected': int(counters[3]),
+                'line_clears': int(counters[4]),
+            })
+        return list(zip(scores.tolist(), ranks.tolist())), sum(level_nodes)
+
+    def warm_up(self) -> None:
+        """
+        Compile the kernel (or load it from Numba's cache) ahead of the first request.
+        """
+        single = self.solver.placement_table(((0, 0),))
+        self.search(0, [single, single, single], 1)
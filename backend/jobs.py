@@ -0,0 +1,343 @@
+"""
+Asynchronous solve jobs.
+
+A job is a solve that is submitted once and collected later: submitting
+returns a job id right away, and the client polls (or long-polls) for the
+result. Jobs run on their own bounded pool of worker processes, one job
+per worker at a time; the rest wait in a FIFO queue of bounded length.
+
+A job can stop before its search finishes. It is cancelled when its
+client asks for it, when a newer job from the same client (client_id)
+supersedes it, or when nobody has polled it for abandon_after seconds,
+which is how an edited board or a closed tab shows up on the server. A
+queued job is simply dropped. A running one is told through a flag in
+shared memory that the search checks between placements, as it checks a
+deadline (see BitboardSearch), so its worker is free for the next job
+within milliseconds. Workers also publish their progress in shared
+memory: first-level placements searched out of the total.
+
+Finished jobs are kept for ttl seconds after they end, then dropped.
+"""
+
+import math
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Tuple
+
+from serving import Overloaded, DURATION_SMOOTHING
+from solver import BlockBlastSolver, DEFAULT_TOP_K
+
+DEFAULT_TTL_S = 300
+DEFAULT_ABANDON_AFTER_S = 30
+DEFAULT_MAX_QUEUE = 64
+# Jobs run beside the synchronous solves SolveGate already sizes to the
+# cores, so by default they only get a couple of processes of their own
+DEFAULT_WORKERS = 2
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+_worker_solver: Optional[BlockBlastSolver] = None
+# One cancel flag and one (done, total) progress pair per job slot
+_worker_cancel = None
+_worker_progress = None
+
+
+def _init_worker(board_size: int, cancel, progress) -> None:
+    global _worker_solver, _worker_cancel, _worker_progress
+    _worker_solver = BlockBlastSolver(board_size)
+    _worker_cancel = cancel
+    _worker_progress = progress
+
+
+def _run_job(slot: int, board: List[List[int]], blocks: List[List[List[int]]], top_k: int,
+             time_budget_ms: Optional[float], evaluator: Optional[str]
+             ) -> Tuple[List[Dict[str, Any]], Optional[List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Worker entry point: solve one job in the given slot. Returns
+    (solutions, partial solutions or None, stats).
+    """
+    solver = _worker_solver
+    cancel = _worker_cancel
+    progress = _worker_progress
+
+    def report(done: int, total: int) -> None:
+        progress[2 * slot] = done
+        progress[2 * slot + 1] = total
+
+    stats: Dict[str, Any] = {}
+    solutions = solver.solve_iteration(board, blocks, top_k=top_k, stats=stats, time_budget_ms=time_budget_ms,
+                                       evaluator=evaluator, cancel=lambda: cancel[slot] != 0, on_progress=report)
+    partial = None
+    if not solutions and stats.get('complete', True):
+        partial = solver.best_partial(board, blocks, top_k, evaluator=evaluator)
+    return solutions, partial, stats
+
+
+class Job:
+    """
+    One submitted solve: its request, where it runs and how it ended.
+    """
+
+    def __init__(self, job_id: str, board: List[List[int]], blocks: List[List[List[int]]], top_k: int,
+                 time_budget_ms: Optional[float], evaluator: Optional[str], client_id: Optional[str],
+                 data: Dict[str, Any]):
+        self.id = job_id
+        self.board = board
+        self.blocks = blocks
+        self.top_k = top_k
+        self.time_budget_ms = time_budget_ms
+        self.evaluator = evaluator
+        self.client_id = client_id
+        # The request payload, for formatting the result the way it asked
+        self.data = data
+        self.status = QUEUED
+        # Why a cancelled job stopped: 'cancelled', 'superseded' or 'abandoned'
+        self.reason: Optional[str] = None
+        self.error: Optional[str] = None
+        self.solutions: Optional[List[Dict[str, Any]]] = None
+        self.partial: Optional[List[Dict[str, Any]]] = None
+        self.stats: Dict[str, Any] = {}
+        self.slot: Optional[int] = None
+        # Last (done, total) read from the slot, kept once the job ends
+        self.progress = (0, 0)
+        self.created = time.monotonic()
+        self.started: Optional[float] = None
+        self.ended: Optional[float] = None
+        self.last_polled = self.created
+        # Long-polls waiting on the job; a job being waited on is not abandoned
+        self.waiters = 0
+        self.finished = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    def state(self) -> Dict[str, Any]:
+        done, total = self.progress
+        state = {
+            'job_id': self.id,
+            'status': self.status,
+            'progress': {'done': done, 'total': total},
+            'elapsed_ms': round(((self.ended or time.monotonic()) - self.created) * 1000.0, 3),
+        }
+        if self.reason is not None:
+            state['reason'] = self.reason
+        if self.error is not None:
+            state['error'] = self.error
+        return state
+
+
+class JobManager:
+    """
+    Job queue and worker processes, with cancellation and expiry.
+    """
+
+    def __init__(self, board_size: int = 8, workers: int = DEFAULT_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 ttl: float = DEFAULT_TTL_S, abandon_after: Optional[float] = DEFAULT_ABANDON_AFTER_S,
+                 on_finish: Optional[Callable[[Job], None]] = None):
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self.abandon_after = abandon_after
+        # Called with each job that ran to the end (done or failed)
+        self.on_finish = on_finish
+        self.cancel_flags = multiprocessing.RawArray('b', self.workers)
+        self.progress = multiprocessing.RawArray('q', 2 * self.workers)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(board_size, self.cancel_flags, self.progress))
+        # Reentrant, since a future that is already done runs its callback at once
+        self.lock = threading.RLock()
+        # job id -> job, oldest first
+        self.jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self.queue: deque = deque()
+        self.free_slots = list(range(self.workers))
+        # client id -> its newest job
+        self.latest: Dict[str, Job] = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled: Dict[str, int] = {'cancelled': 0, 'superseded': 0, 'abandoned': 0}
+        self.rejected = 0
+        # Running average of how long a job holds a worker
+        self.average_run_ms = 0.0
+        self.stopped = threading.Event()
+        self.reaper = threading.Thread(target=self._reap, daemon=True)
+        self.reaper.start()
+
+    def shutdown(self) -> None:
+        self.stopped.set()
+        with self.lock:
+            for job in list(self.jobs.values()):
+                if job.active:
+                    self._cancel(job, 'cancelled')
+        self.executor.shutdown(cancel_futures=True)
+
+    def submit(self, board: List[List[int]], blocks: List[List[List[int]]], top_k: int = DEFAULT_TOP_K,
+               time_budget_ms: Optional[float] = None, evaluator: Optional[str] = None,
+               client_id: Optional[str] = None, data: Optional[Dict[str, Any]] = None) -> Job:
+        """
+        Queue a solve and return its job. An unfinished job of the same
+        client_id is cancelled as superseded. Raises Overloaded when the
+        queue is full.
+        """
+        with self.lock:
+            previous = self.latest.get(client_id) if client_id is not None else None
+            if previous is not None and previous.active:
+                self._cancel(previous, 'superseded')
+            if len(self.queue) >= self.max_queue:
+                self.rejected += 1
+                raise Overloaded('Job queue is full, try again later', self._retry_after())
+            job = Job(uuid.uuid4().hex, board, blocks, top_k, time_budget_ms, evaluator, client_id, data or {})
+            self.jobs[job.id] = job
+            if client_id is not None:
+                self.latest[client_id] = job
+            self.queue.append(job)
+            self.submitted += 1
+            self._dispatch()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        The job with this id, marked as polled, or None.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None:
+                job.last_polled = time.monotonic()
+                self._read_progress(job)
+            return job
+
+    def wait(self, job: Job, timeout: float) -> Job:
+        """
+        Block until the job ends or timeout seconds pass (long-poll).
+        """
+        with self.lock:
+            job.waiters += 1
+        try:
+            job.finished.wait(timeout)
+        finally:
+            with self.lock:
+                job.waiters -= 1
+                job.last_polled = time.monotonic()
+                self._read_progress(job)
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Cancel a queued or running job at its client's request. Ended jobs
+        are returned unchanged; unknown ids give None.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job.active:
+                self._cancel(job, 'cancelled')
+            return job
+
+    def _cancel(self, job: Job, reason: str) -> None:
+        if job.status == QUEUED:
+            self.queue.remove(job)
+        elif job.slot is not None:
+            # The worker sees the flag at its next placement; the slot is
+            # freed when it returns
+            self.cancel_flags[job.slot] = 1
+            self._read_progress(job)
+        job.status = CANCELLED
+        job.reason = reason
+        job.ended = time.monotonic()
+        self.cancelled[reason] += 1
+        job.finished.set()
+
+    def _dispatch(self) -> None:
+        """
+        Start queued jobs while a worker slot is free.
+        """
+        while self.queue and self.free_slots:
+            job = self.queue.popleft()
+            slot = self.free_slots.pop()
+            self.cancel_flags[slot] = 0
+            self.progress[2 * slot] = self.progress[2 * slot + 1] = 0
+            job.slot = slot
+            job.status = RUNNING
+            job.started = time.monotonic()
+            future = self.executor.submit(_run_job, slot, job.board, job.blocks, job.top_k,
+                                          job.time_budget_ms, job.evaluator)
+            future.add_done_callback(lambda future, job=job: self._finished(job, future))
+
+    def _finished(self, job: Job, future) -> None:
+        with self.lock:
+            run_ms = (time.monotonic() - job.started) * 1000.0
+            if self.average_run_ms:
+                self.average_run_ms += DURATION_SMOOTHING * (run_ms - self.average_run_ms)
+            else:
+                self.average_run_ms = run_ms
+            if job.status == RUNNING:
+                self._read_progress(job)
+                error = future.exception() if not future.cancelled() else None
+                if future.cancelled() or error is not None:
+                    job.status = FAILED
+                    job.error = 'Job pool shut down' if future.cancelled() else str(error)
+                    self.failed += 1
+                else:
+                    job.solutions, job.partial, job.stats = future.result()
+                    job.status = DONE
+                    self.completed += 1
+                job.ended = time.monotonic()
+                job.finished.set()
+                ran_to_end = True
+            else:
+                ran_to_end = False
+            self.free_slots.append(job.slot)
+            job.slot = None
+            self._dispatch()
+        if ran_to_end and self.on_finish is not None:
+            self.on_finish(job)
+
+    def _read_progress(self, job: Job) -> None:
+        if job.slot is not None and job.status == RUNNING:
+            job.progress = (self.progress[2 * job.slot], self.progress[2 * job.slot + 1])
+
+    def _retry_after(self) -> int:
+        backlog = (len(self.queue) + 1) / self.workers
+        return max(1, math.ceil(backlog * self.average_run_ms / 1000.0))
+
+    def _reap(self) -> None:
+        """
+        Cancel jobs nobody polls any more and drop ended jobs past their ttl.
+        """
+        interval = min(1.0, self.abandon_after / 4) if self.abandon_after else 1.0
+        while not self.stopped.wait(interval):
+            now = time.monotonic()
+            with self.lock:
+                for job in list(self.jobs.values()):
+                    if job.active:
+                        if (self.abandon_after is not None and not job.waiters
+                                and now - job.last_polled >= self.abandon_after):
+                            self._cancel(job, 'abandoned')
+                    elif now - job.ended >= self.ttl:
+                        del self.jobs[job.id]
+                        if self.latest.get(job.client_id) is job:
+                            del self.latest[job.client_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'running': self.workers - len(self.free_slots),
+                'queued': len(self.queue),
+                'max_queue': self.max_queue,
+                'jobs': len(self.jobs),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'cancelled': dict(self.cancelled),
+                'rejected': self.rejected,
+                'average_run_ms': round(self.average_run_ms, 3),
+            }
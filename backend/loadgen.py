@@ -0,0 +1,120 @@
+"""
+Local load generator for the solve API.
+
+Fires concurrent /api/solve requests at a running server and reports
+throughput, latency percentiles and how many requests were shed with 429:
+
+    python loadgen.py --url http://localhost:8000 --clients 32 --requests 500
+
+By default each request uses a random board, so the result cache does not
+hide the solver; --repeat sends one fixed position to exercise coalescing.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from typing import List, Dict, Any, Optional
+
+from pieces import STANDARD_PIECES, to_grid
+
+
+def random_position(rng: random.Random, fill: float = 0.4) -> Dict[str, Any]:
+    names = sorted(STANDARD_PIECES)
+    return {
+        'board': [[int(rng.random() < fill) for _ in range(8)] for _ in range(8)],
+        'blocks': [to_grid(STANDARD_PIECES[rng.choice(names)]) for _ in range(3)],
+    }
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(url: str, clients: int, requests: int, repeat: bool = False, fill: float = 0.4,
+        seed: int = 0, timeout: float = 60.0) -> Dict[str, Any]:
+    """
+    Send `requests` solve requests from `clients` threads and summarize them.
+    """
+    rng = random.Random(seed)
+    fixed = random_position(rng, fill)
+    payloads = [fixed if repeat else random_position(rng, fill) for _ in range(requests)]
+
+    lock = threading.Lock()
+    statuses: Counter = Counter()
+    latencies: List[float] = []
+    retry_after: List[int] = []
+    next_request = iter(range(requests))
+
+    def client():
+        while True:
+            with lock:
+                index = next(next_request, None)
+            if index is None:
+                return
+            body = json.dumps(payloads[index]).encode()
+            request = urllib.request.Request(url.rstrip('/') + '/api/solve', data=body,
+                                             headers={'Content-Type': 'application/json'})
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as e:
+                status = e.code
+                if e.code == 429 and e.headers.get('Retry-After'):
+                    with lock:
+                        retry_after.append(int(e.headers['Retry-After']))
+            except (urllib.error.URLError, OSError):
+                status = 'connection error'
+            elapsed = (time.perf_counter() - started) * 1000.0
+            with lock:
+                statuses[status] += 1
+                if status == 200:
+                    latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    return {
+        'requests': requests,
+        'seconds': round(duration, 3),
+        'ok_per_second': round(statuses[200] / duration, 2) if duration else 0.0,
+        'statuses': {str(status): count for status, count in statuses.items()},
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.5), 1),
+            'p90': round(percentile(latencies, 0.9), 1),
+            'p99': round(percentile(latencies, 0.99), 1),
+            'max': round(max(latencies), 1) if latencies else 0.0,
+        },
+        'max_retry_after': max(retry_after) if retry_after else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Load test a running Block Blast Solver API.')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--repeat', action='store_true', help='send one position over and over')
+    parser.add_argument('--fill', type=float, default=0.4, help='fraction of filled board cells')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.url, args.clients, args.requests, repeat=args.repeat,
+                         fill=args.fill, seed=args.seed), indent=2))
+
+
+if __name__ == '__main__':
+    main()
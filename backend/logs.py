@@ -0,0 +1,89 @@
+"""
+Structured, non-blocking logging for the API.
+
+Records are formatted as one JSON object per line. Request handlers only
+put records on an in-memory queue (QueueHandler); a background
+QueueListener thread formats them and does the actual I/O, so a slow log
+sink never adds to request latency.
+
+SOLVER_LOG_LEVEL sets the level (default INFO). Full board and block
+dumps are only logged at DEBUG.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import time
+from typing import Any, Dict, Optional
+
+LOGGER_NAME = 'blockblast'
+
+# LogRecord attributes that are not user-supplied extra fields
+_STANDARD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One compact JSON object per record: time, level, message and any
+    fields passed through extra=.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'msg': record.getMessage(),
+        }
+        for name, value in vars(record).items():
+            if name not in _STANDARD_ATTRIBUTES and not name.startswith('_'):
+                entry[name] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(',', ':'), default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure(level: str = 'INFO', handler: Optional[logging.Handler] = None) -> logging.Logger:
+    """
+    Route the 'blockblast' logger through a queue to handler (stderr by
+    default). Calling it again replaces the previous setup.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    logger.propagate = False
+
+    if _listener is not None:
+        _listener.stop()
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+
+    if handler is None:
+        handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def shutdown() -> None:
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
+
+
+def elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000.0, 3)
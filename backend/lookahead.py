@@ -0,0 +1,217 @@
+"""
+Multi-turn lookahead planner.
+
+solve_iteration only optimizes the current pieces. The planner takes its
+best few candidates and scores each candidate's final board by what
+happens next: it draws future deals (three pieces by default) from a
+piece distribution, plays the best move for each deal (recursively up to
+a configurable depth) and reports the expected score and the probability
+of surviving every sampled turn. Candidates are then re-ranked by
+immediate score plus discounted expected future score.
+
+To keep this affordable:
+
+- Every candidate is evaluated against the same sampled deals (common
+  random numbers), so differences come from the boards, not the draws.
+- Best moves are cached per (board, deal) for the whole plan, so shared
+  positions across candidates and samples are only searched once.
+- Inner searches use the solver's fastest path (JIT kernel or batched
+  bitboard search with pruning) with k = 1. The JIT kernel cannot stop
+  early, so plans with a time budget always use the bitboard search.
+- Samples are evaluated round by round across all candidates. The node
+  and time budgets are checked before every inner search, and the time
+  budget's deadline is passed into it. A round they cut short is dropped,
+  so every candidate always has the same number of samples.
+"""
+
+import random
+import time
+from itertools import permutations
+from typing import Dict, List, Tuple, Any, Optional
+
+from bitboard import board_to_bits, clear_lines, Shape
+from pieces import STANDARD_PIECES, piece_weights
+from search import BitboardSearch
+from topk import TopK, decode_rank
+
+DEFAULT_DEPTH = 1
+DEFAULT_SAMPLES = 8
+DEFAULT_CANDIDATES = 10
+DEFAULT_DEAL_SIZE = 3
+DEFAULT_DISCOUNT = 0.9
+# Future value of a deal that cannot be fully placed
+DEFAULT_DEATH_PENALTY = -200
+
+
+class LookaheadPlanner:
+    """
+    Re-ranks solve_iteration candidates by sampled future deals.
+    """
+
+    def __init__(self, solver, pieces: Optional[List[str]] = None,
+                 weights: Optional[Dict[str, float]] = None,
+                 depth: int = DEFAULT_DEPTH, samples: int = DEFAULT_SAMPLES,
+                 candidates: int = DEFAULT_CANDIDATES, discount: float = DEFAULT_DISCOUNT,
+                 death_penalty: float = DEFAULT_DEATH_PENALTY, seed: int = 0,
+                 node_budget: Optional[int] = None, time_budget_ms: Optional[float] = None,
+                 deal_size: int = DEFAULT_DEAL_SIZE):
+        self.solver = solver
+        distribution = piece_weights(pieces or sorted(STANDARD_PIECES), weights)
+        self.shapes = [shape for shape, _ in distribution]
+        self.weights = [weight for _, weight in distribution]
+        self.depth = depth
+        self.samples = samples
+        self.candidates = candidates
+        self.discount = discount
+        self.death_penalty = death_penalty
+        self.deal_size = deal_size
+        self.rng = random.Random(seed)
+        self.node_budget = node_budget
+        # Counted from the start of plan(), not from construction
+        self.time_budget_ms = time_budget_ms
+        self.deadline: Optional[float] = None
+        # Set once a budget stopped a search before it finished
+        self.interrupted = False
+
+        # (board, sorted deal) -> (score, final board) of the best move, or None
+        self.best_moves: Dict[Tuple[int, Tuple[Shape, ...]], Optional[Tuple[int, int]]] = {}
+        self.nodes = 0
+        self.cache_hits = 0
+        # Sampled deals per depth level, shared by all candidates
+        self.deals: List[List[Tuple[Shape, ...]]] = [
+            [self._draw() for _ in range(samples)] for _ in range(depth)
+        ]
+
+    def plan(self, initial_board: List[List[int]], blocks: List[List[List[int]]],
+             top_k: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Solve the current iteration, then re-rank its best candidates by
+        lookahead. Returns (top_k solutions, planner stats). Each solution
+        gains a 'lookahead' dict with its expected future score, survival
+        probability and combined score.
+        """
+        if self.time_budget_ms is not None:
+            self.deadline = time.monotonic() + self.time_budget_ms / 1000.0
+        solve_stats: Dict[str, Any] = {}
+        solutions = self.solver.solve_iteration(initial_board, blocks, top_k=max(top_k, self.candidates),
+                                                stats=solve_stats, time_budget_ms=self.time_budget_ms)
+        finals = [board_to_bits(solution['final_board'], self.solver.board_size) for solution in solutions]
+
+        totals = [0.0] * len(solutions)
+        survived = [0] * len(solutions)
+        rounds = 0
+        for sample in range(self.samples):
+            if self._exhausted():
+                break
+            outcomes = []
+            for final in finals:
+                outcomes.append(self._evaluate(final, 0, sample))
+                if self.interrupted:
+                    break
+            # Only whole rounds count, so every candidate has the same samples
+            if self.interrupted:
+                break
+            for position, (value, alive) in enumerate(outcomes):
+                totals[position] += value
+                survived[position] += alive
+            rounds += 1
+
+        for position, solution in enumerate(solutions):
+            expected = totals[position] / rounds if rounds else 0.0
+            solution['lookahead'] = {
+                'expected_score': round(expected, 3),
+                'survival': survived[position] / rounds if rounds else None,
+                'combined_score': round(solution['score'] + self.discount * expected, 3),
+            }
+
+        # Stable sort keeps solve_iteration's order on equal combined scores
+        solutions.sort(key=lambda solution: solution['lookahead']['combined_score'], reverse=True)
+        stats = {
+            'samples': rounds,
+            'complete': rounds == self.samples and solve_stats.get('complete', True),
+            'nodes': self.nodes,
+            'cache_entries': len(self.best_moves),
+            'cache_hits': self.cache_hits,
+        }
+        return solutions[:top_k], stats
+
+    def _draw(self) -> Tuple[Shape, ...]:
+        return tuple(self.rng.choices(self.shapes, weights=self.weights, k=self.deal_size))
+
+    def _exhausted(self) -> bool:
+        if self.node_budget is not None and self.nodes >= self.node_budget:
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def _evaluate(self, board: int, level: int, sample: int) -> Tuple[float, int]:
+        """
+        Future value of board under sampled deal `sample` at this level and
+        its follow-ups. Returns (value, 1 if every turn could be played else 0),
+        meaningless once self.interrupted is set.
+        """
+        best = self._best_move(board, self.deals[level][sample])
+        if self.interrupted:
+            return 0.0, 0
+        if best is None:
+            return self.death_penalty, 0
+
+        score, final = best
+        if level + 1 == self.depth:
+            return score, 1
+
+        # Deeper levels average over all of their samples
+        total = 0.0
+        alive = 0
+        for next_sample in range(self.samples):
+            value, survived = self._evaluate(final, level + 1, next_sample)
+            if self.interrupted:
+                return 0.0, 0
+            total += value
+            alive += survived
+        return score + self.discount * total / self.samples, int(alive == self.samples)
+
+    def _best_move(self, board: int, deal: Tuple[Shape, ...]) -> Optional[Tuple[int, int]]:
+        """
+        (score, final board) of the best way to place a deal, or None if it
+        cannot be fully placed. Cached for the lifetime of the planner.
+        Sets self.interrupted instead when the budget is spent before or
+        during the search.
+        """
+        key = (board, tuple(sorted(deal)))
+        if key in self.best_moves:
+            self.cache_hits += 1
+            return self.best_moves[key]
+        if self._exhausted():
+            self.interrupted = True
+            return None
+
+        solver = self.solver
+        tables = [solver.placement_table(shape) for shape in key[1]]
+        top = TopK(1)
+        if solver.jit_kernel is not None and len(tables) == 3 and self.deadline is None:
+            leaves, nodes = solver.jit_kernel.search(board, tables, 1)
+            for score, rank in leaves:
+                top.push(score, rank)
+        else:
+            prepared = [((0, 0), table) for table in tables]
+            search = BitboardSearch(solver, prepared, 1, kernel=solver.leaf_kernel, deadline=self.deadline)
+            search.run(board, top)
+            nodes = search.nodes
+            if search.timed_out:
+                # The best move found so far may not be the best one
+                self.nodes += nodes
+                self.interrupted = True
+                return None
+        self.nodes += nodes
+
+        best = None
+        if len(top):
+            score, rank = top.results()[0]
+            order_index, indices = decode_rank(rank, len(tables), solver.rank_base)
+            final = board
+            for block_index, index in zip(list(permutations(range(len(tables))))[order_index], indices):
+                final, _ = clear_lines(final | tables[block_index].masks[index], solver.all_line_masks)
+            best = (score, final)
+
+        self.best_moves[key] = best
+        return best
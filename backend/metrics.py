@@ -0,0 +1,171 @@
+"""
+Request metrics in Prometheus text format.
+
+Solves already fill a stats dict with their search counters and phase
+timings (see BlockBlastSolver.solve_iteration), so recording a request is
+a handful of dict updates after it finishes; nothing is added to the
+search loops. Metrics.render() produces the text served by /api/metrics.
+"""
+
+import bisect
+import threading
+from typing import Dict, List, Tuple, Any, Callable
+
+# Latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = 'blockblast'
+
+# Search counters copied from solve stats: stats key -> (metric, help)
+SEARCH_COUNTERS = {
+    'leaves': ('leaves_scored_total', 'Final placements scored'),
+    'rejected': ('placements_rejected_total', 'Placements that overlapped filled cells'),
+    'line_clears': ('line_clears_total', 'Lines completed by the placements tried'),
+    'pruned': ('pruned_total', 'Placements skipped by the score upper bound'),
+    'table_hits': ('transposition_hits_total', 'Search states served from the transposition table'),
+    'tables_built': ('placement_tables_built_total', 'Placement tables built for new shapes'),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        position = bisect.bisect_left(self.buckets, value)
+        if position < len(self.counts):
+            self.counts[position] += 1
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """
+    Thread-safe counters and latency histograms for the API.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        # (name, labels) -> value
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.help: Dict[str, Tuple[str, str]] = {}
+        # name -> callable returning {labels: value}, read at render time
+        self.gauges: Dict[str, Callable[[], Dict[Labels, float]]] = {}
+
+    def _describe(self, name: str, kind: str, text: str) -> None:
+        if name not in self.help:
+            self.help[name] = (kind, text)
+
+    def inc(self, name: str, value: float = 1, labels: Labels = (), text: str = '') -> None:
+        with self.lock:
+            self._describe(name, 'counter', text)
+            key = (name, labels)
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, labels: Labels = (), text: str = '') -> None:
+        with self.lock:
+            self._describe(name, 'histogram', text)
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def gauge(self, name: str, read: Callable[[], Dict[Labels, float]], text: str = '') -> None:
+        with self.lock:
+            self._describe(name, 'gauge', text)
+            self.gauges[name] = read
+
+    def record_request(self, endpoint: str, status: int, seconds: float) -> None:
+        labels = (('endpoint', endpoint),)
+        self.inc(f'{PREFIX}_requests_total', labels=labels + (('status', str(status)),),
+                 text='API requests by endpoint and status')
+        self.observe(f'{PREFIX}_request_duration_seconds', seconds, labels=labels,
+                     text='API request latency')
+
+    def record_solve(self, stats: Dict[str, Any]) -> None:
+        """
+        Add the counters of one solve's stats dict.
+        """
+        if stats.get('cached'):
+            result = 'hit'
+        elif stats.get('coalesced'):
+            result = 'coalesced'
+        else:
+            result = 'miss'
+        self.inc(f'{PREFIX}_result_cache_total', labels=(('result', result),),
+                 text='Solve requests by result cache outcome')
+        if result != 'miss':
+            return
+
+        self.observe(f'{PREFIX}_solve_duration_seconds',
+                     sum(stats.get('phase_ms', {}).values()) / 1000.0,
+                     text='Time spent solving, excluding cache hits and queueing')
+        for level, nodes in enumerate(stats.get('level_nodes', ()), start=1):
+            self.inc(f'{PREFIX}_search_nodes_total', nodes, labels=(('level', str(level)),),
+                     text='Placements expanded, by search level')
+        for key, (name, text) in SEARCH_COUNTERS.items():
+            if stats.get(key):
+                self.inc(f'{PREFIX}_{name}', stats[key], text=text)
+        for phase, ms in stats.get('phase_ms', {}).items():
+            self.inc(f'{PREFIX}_phase_seconds_total', ms / 1000.0, labels=(('phase', phase),),
+                     text='Time spent in each solve phase')
+        if stats.get('feasible') is False:
+            self.inc(f'{PREFIX}_infeasible_solves_total', text='Solves where the blocks cannot all be placed')
+        if stats.get('complete') is False:
+            self.inc(f'{PREFIX}_incomplete_solves_total', text='Solves cut short by their time budget')
+
+    def render(self) -> str:
+        """
+        Everything recorded so far in Prometheus text exposition format.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {key: (list(h.counts), h.total, h.count) for key, h in self.histograms.items()}
+            gauges = dict(self.gauges)
+            described = dict(self.help)
+
+        samples: Dict[str, List[str]] = {}
+        for (name, labels), value in sorted(counters.items()):
+            samples.setdefault(name, []).append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), (counts, total, count) in sorted(histograms.items()):
+            lines = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels + (("le", f"{bound:g}"),))} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels + (("le", "+Inf"),))} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        for name, read in sorted(gauges.items()):
+            samples[name] = [f'{name}{_format_labels(labels)} {_format_value(value)}'
+                             for labels, value in read().items()]
+
+        output = []
+        for name in sorted(samples):
+            kind, text = described.get(name, ('untyped', ''))
+            if text:
+                output.append(f'# HELP {name} {text}')
+            output.append(f'# TYPE {name} {kind}')
+            output.extend(samples[name])
+        return '\n'.join(output) + '\n'
@@ -0,0 +1,214 @@
+"""
+Process-pool parallel solving for BlockBlastSolver.
+
+The first-level placements of the bitboard search are independent, so a
+solve is split into chunks of (shape, placement index) moves that worker
+processes search on their own. Each worker returns its local top-k leaves,
+which carry global ranks, and the parent merges them and builds the
+solution dicts as a serial solve would. Results are identical to
+BlockBlastSolver.solve_iteration.
+
+Batches of independent positions go the other way: solve_many hands each
+whole position to a worker and yields results as they complete.
+
+The pool is meant to be created once and kept for the lifetime of the
+app; each worker keeps its own solver, so placement tables are cached per
+worker across requests.
+"""
+
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Iterator
+
+from bitboard import board_to_bits
+from feasibility import find_sequence
+from search import BitboardSearch
+from solver import BlockBlastSolver, DEFAULT_TOP_K
+from topk import TopK
+
+# Below this many estimated leaves a solve runs serially, the dispatch
+# overhead would outweigh the gain
+DEFAULT_MIN_PARALLEL_LEAVES = 50000
+
+# Chunks submitted per worker, so uneven subtrees still balance out
+CHUNKS_PER_WORKER = 4
+
+_worker_solver: Optional[BlockBlastSolver] = None
+
+
+def _init_worker(board_size: int, batch_leaves: bool) -> None:
+    global _worker_solver
+    _worker_solver = BlockBlastSolver(board_size, batch_leaves=batch_leaves)
+
+
+def _search_chunk(initial_board: List[List[int]], blocks: List[List[List[int]]], top_k: int,
+                  prune: bool, moves: List[Tuple[int, int]],
+                  evaluator: Optional[str] = None) -> Tuple[List[Tuple[int, int]], Dict[str, int]]:
+    """
+    Worker entry point: search the given first-level moves and return the
+    local top-k as (score, rank) pairs along with the search counters.
+    """
+    solver = _worker_solver
+    prepared = solver.prepare_blocks(blocks)
+    top = TopK(top_k)
+    search = BitboardSearch(solver, prepared, top_k, prune=prune, kernel=solver.leaf_kernel,
+                            evaluator=solver.evaluator(evaluator))
+    search.run(board_to_bits(initial_board, solver.board_size), top, only=set(moves))
+    return top.results(), search.stats()
+
+
+def _solve_item(initial_board: List[List[int]], blocks: List[List[List[int]]], top_k: int,
+                evaluator: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Worker entry point for batches: solve one whole position serially.
+    """
+    return _solve_with(_worker_solver, initial_board, blocks, top_k, evaluator)
+
+
+def _solve_with(solver: BlockBlastSolver, initial_board: List[List[int]], blocks: List[List[List[int]]],
+                top_k: int, evaluator: Optional[str] = None) -> List[Dict[str, Any]]:
+    return solver.solve_iteration(initial_board, blocks, top_k=top_k, evaluator=evaluator)
+
+
+class SolverPool:
+    """
+    Long-lived process pool that solves iterations in parallel, falling
+    back to the serial solver for small searches.
+    """
+
+    def __init__(self, solver: BlockBlastSolver, workers: Optional[int] = None,
+                 min_parallel_leaves: int = DEFAULT_MIN_PARALLEL_LEAVES):
+        self.solver = solver
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.min_parallel_leaves = min_parallel_leaves
+        self.executor: Optional[ProcessPoolExecutor] = None
+        if self.workers > 1:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                initargs=(solver.board_size, solver.leaf_kernel is not None))
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def estimate_leaves(self, board: int, prepared) -> int:
+        """
+        Rough size of the search: product of each block's fitting placements
+        on the initial board, times the number of block orderings.
+        """
+        estimate = math.factorial(len(prepared))
+        for _, table in prepared:
+            estimate *= sum(1 for mask in table.masks if not board & mask)
+        return estimate
+
+    def solve_iteration(self, initial_board: List[List[int]], blocks: List[List[List[int]]],
+                        top_k: int = DEFAULT_TOP_K, stats: Optional[Dict[str, Any]] = None,
+                        prune: bool = True, time_budget_ms: Optional[float] = None,
+                        on_improve: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                        evaluator: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Same contract as BlockBlastSolver.solve_iteration. Deadline-bounded
+        and progressive solves run serially, since their partial results
+        come from the order first-level moves are visited in. With the JIT
+        engine, searches big enough to split run on the workers' bitboard
+        search like any other; the rest use the compiled kernel.
+        """
+        solver = self.solver
+        if (solver.engine == 'numpy' or self.executor is None
+                or time_budget_ms is not None or on_improve is not None):
+            return solver.solve_iteration(initial_board, blocks, top_k=top_k, stats=stats, prune=prune,
+                                          time_budget_ms=time_budget_ms, on_improve=on_improve,
+                                          evaluator=evaluator)
+
+        prepared = solver.prepare_blocks(blocks)
+        if prepared is None:
+            return []
+
+        board = board_to_bits(initial_board, solver.board_size)
+        # Infeasible positions are answered by the serial solver's fast path
+        if (self.estimate_leaves(board, prepared) < self.min_parallel_leaves
+                or find_sequence(board, [table for _, table in prepared], solver.all_line_masks) is None):
+            return solver.solve_iteration(initial_board, blocks, top_k=top_k, stats=stats, prune=prune,
+                                          evaluator=evaluator)
+
+        started = time.perf_counter()
+        moves = BitboardSearch(solver, prepared, top_k).root_moves(board)
+        chunk_count = max(1, min(len(moves), self.workers * CHUNKS_PER_WORKER))
+        # Round-robin so each chunk mixes moves from every shape
+        chunks = [moves[i::chunk_count] for i in range(chunk_count)]
+
+        board_list = [[int(cell) for cell in row] for row in initial_board]
+        block_lists = [[[int(cell) for cell in row] for row in block] for block in blocks]
+        futures = [self.executor.submit(_search_chunk, board_list, block_lists, top_k, prune, chunk, evaluator)
+                   for chunk in chunks]
+
+        top = TopK(top_k)
+        totals: Dict[str, Any] = {}
+        for future in futures:
+            results, chunk_stats = future.result()
+            for score, rank in results:
+                top.push(score, rank)
+            for name, value in chunk_stats.items():
+                if isinstance(value, list):
+                    totals[name] = [a + b for a, b in zip(totals.get(name, [0] * len(value)), value)]
+                elif isinstance(value, bool):
+                    totals[name] = totals.get(name, True) and value
+                else:
+                    totals[name] = totals.get(name, 0) + value
+            # Skipped orderings are a property of the blocks, not of a chunk
+            totals['duplicate_orders'] = chunk_stats['duplicate_orders']
+
+        if stats is not None:
+            stats.update(totals)
+            stats['parallel_chunks'] = len(chunks)
+        searched_at = time.perf_counter()
+        solutions = solver.build_solutions(initial_board, prepared, top)
+        if stats is not None:
+            stats['phase_ms'] = {
+                'search': round((searched_at - started) * 1000.0, 3),
+                'build': round((time.perf_counter() - searched_at) * 1000.0, 3),
+            }
+        return solutions
+
+    def solve_many(self, items: Iterable[Tuple[Any, ...]]
+                   ) -> Iterator[Tuple[int, Optional[List[Dict[str, Any]]], Optional[str]]]:
+        """
+        Solve independent (board, blocks, top_k[, evaluator]) items, one
+        worker task per item, yielding (position, solutions, error) in
+        completion order.
+        An item that raises yields its error message instead of solutions.
+        At most CHUNKS_PER_WORKER tasks per worker are in flight, so closing
+        the iterator early leaves little work behind.
+        """
+        if self.executor is None:
+            for position, item in enumerate(items):
+                try:
+                    yield position, _solve_with(self.solver, *item), None
+                except Exception as e:
+                    yield position, None, str(e)
+            return
+
+        pending = {}
+        items = iter(enumerate(items))
+        limit = self.workers * CHUNKS_PER_WORKER
+        try:
+            while True:
+                for position, item in items:
+                    pending[self.executor.submit(_solve_item, *item)] = position
+                    if len(pending) >= limit:
+                        break
+                if not pending:
+                    return
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    position = pending.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        yield position, future.result(), None
+                    else:
+                        yield position, None, str(error)
+        finally:
+            for future in pending:
+                future.cancel()
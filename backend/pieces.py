@@ -0,0 +1,77 @@
+"""
+Catalog of the standard Block Blast pieces.
+
+Each piece is a normalized shape (cells relative to its bounding box's
+top-left corner), the same form normalize_shape produces, so catalog
+pieces share placement tables with user-drawn blocks.
+"""
+
+from typing import Dict, List, Tuple
+
+from bitboard import Shape
+
+
+def _shape(*rows: str) -> Shape:
+    return tuple(sorted((r, c) for r, row in enumerate(rows) for c, cell in enumerate(row) if cell == '#'))
+
+
+def _rotations(shape: Shape) -> List[Shape]:
+    """All distinct 90-degree rotations of a shape, normalized."""
+    found = []
+    cells = shape
+    for _ in range(4):
+        height = max(r for r, _ in cells) + 1
+        cells = tuple(sorted((c, height - 1 - r) for r, c in cells))
+        if cells not in found:
+            found.append(cells)
+    return found
+
+
+def _catalog() -> Dict[str, Shape]:
+    pieces: Dict[str, Shape] = {'single': _shape('#')}
+
+    for length in (2, 3, 4, 5):
+        pieces[f'line{length}_h'] = _shape('#' * length)
+        pieces[f'line{length}_v'] = _shape(*(['#'] * length))
+
+    pieces['square2'] = _shape('##', '##')
+    pieces['square3'] = _shape('###', '###', '###')
+    pieces['rect2x3'] = _shape('###', '###')
+    pieces['rect3x2'] = _shape('##', '##', '##')
+
+    families = {
+        'corner3': _shape('#.', '##'),
+        'corner5': _shape('#..', '#..', '###'),
+        'l4': _shape('#.', '#.', '##'),
+        'j4': _shape('.#', '.#', '##'),
+        't4': _shape('###', '.#.'),
+        's4': _shape('.##', '##.'),
+        'z4': _shape('##.', '.##'),
+    }
+    for name, base in families.items():
+        for turn, rotated in enumerate(_rotations(base)):
+            pieces[f'{name}_{turn}'] = rotated
+
+    return pieces
+
+
+STANDARD_PIECES: Dict[str, Shape] = _catalog()
+
+
+def to_grid(cells: Shape, canvas: int = 5) -> List[List[int]]:
+    """
+    Draw a normalized shape at the top-left of a canvas x canvas block grid.
+    """
+    grid = [[0] * canvas for _ in range(canvas)]
+    for row, col in cells:
+        grid[row][col] = 1
+    return grid
+
+
+def piece_weights(names: List[str], weights: Dict[str, float] = None) -> List[Tuple[Shape, float]]:
+    """
+    (shape, weight) pairs for the named catalog pieces. Missing weights
+    default to 1, so no weights means a uniform distribution.
+    """
+    weights = weights or {}
+    return [(STANDARD_PIECES[name], float(weights.get(name, 1.0))) for name in names]
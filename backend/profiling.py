@@ -0,0 +1,242 @@
+"""
+On-demand profiles of live solves.
+
+Profiling is off unless the deployment names a directory for the
+profiles (SOLVER_PROFILE_DIR). When it is on, a solve is profiled if an
+admin request (one with SOLVER_ADMIN_TOKEN) carries an X-Solver-Profile
+header or if it is picked by the sample rate set through the admin
+endpoint; every other request pays for one attribute check and nothing
+else.
+
+Two profilers are offered:
+
+- 'sample' (the default) runs a background thread that reads the solving
+  thread's stack every interval_ms and writes the counts as collapsed
+  stacks ("a;b;c 12" lines, the input of flamegraph.pl and speedscope).
+  Its cost does not depend on how many functions the search calls, so
+  the many tiny calls of the search loops (can_place_block, place_block
+  and clear_complete_lines on the numpy engine) keep their real share of
+  the time. While a sampler runs, the interpreter's switch interval is
+  lowered to the sampling interval, or the solving thread would hold the
+  GIL for 5 ms between samples.
+- 'cprofile' records every call with cProfile and writes a pstats file
+  (python -m pstats, snakeviz). Exact call counts, but its per-call hook
+  inflates functions that do almost nothing per call.
+
+Profiles live in the directory as <time>-<request id>.<mode extension>;
+the oldest ones are deleted beyond max_profiles.
+"""
+
+import cProfile
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple, Any, Optional, Callable
+
+PROFILE_MODES = ('sample', 'cprofile')
+DEFAULT_MODE = 'sample'
+DEFAULT_INTERVAL_MS = 1.0
+DEFAULT_MAX_PROFILES = 200
+EXTENSIONS = {'sample': '.collapsed', 'cprofile': '.prof'}
+
+# Profile names are generated here; anything else is not served
+NAME_PATTERN = re.compile(r'^[0-9]{8}T[0-9]{6}-[0-9a-zA-Z_-]{1,64}\.(collapsed|prof)$')
+
+
+class StackSampler:
+    """
+    Statistical profiler for one thread: counts the stacks it is found in.
+    """
+
+    # Samplers running, to restore the switch interval after the last one
+    active = 0
+    saved_interval = None
+    lock = threading.Lock()
+
+    def __init__(self, thread_id: int, interval_ms: float = DEFAULT_INTERVAL_MS, root=None):
+        self.thread_id = thread_id
+        # Stacks are cut below this frame, the caller that started sampling
+        self.root = root
+        self.interval = interval_ms / 1000.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        with StackSampler.lock:
+            if StackSampler.active == 0:
+                StackSampler.saved_interval = sys.getswitchinterval()
+                sys.setswitchinterval(min(StackSampler.saved_interval, self.interval))
+            StackSampler.active += 1
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+        with StackSampler.lock:
+            StackSampler.active -= 1
+            if StackSampler.active == 0:
+                sys.setswitchinterval(StackSampler.saved_interval)
+
+    def _run(self) -> None:
+        labels: Dict[Any, str] = {}
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = f'{os.path.basename(code.co_filename)}:{code.co_name}'
+                stack.append(label)
+                frame = frame.f_back
+            # Once stopped the thread is past the solve, waiting in stop()
+            if stack and not self.stopped.is_set():
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+    """
+    Decides which solves to profile, runs them under a profiler and keeps
+    the profiles in a directory.
+    """
+
+    def __init__(self, directory: str, sample_rate: float = 0.0, mode: str = DEFAULT_MODE,
+                 interval_ms: float = DEFAULT_INTERVAL_MS, max_profiles: int = DEFAULT_MAX_PROFILES):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError('sample_rate must be between 0 and 1')
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval_ms = interval_ms
+        self.max_profiles = max_profiles
+        self.lock = threading.Lock()
+        # Only one cProfile may be active per process on newer Pythons
+        self.cprofile_lock = threading.Lock()
+        self.random = random.Random()
+        # Profile name -> what the listing shows besides the file itself
+        self.details: Dict[str, Dict[str, Any]] = {}
+
+    def configure(self, sample_rate: Optional[float] = None, mode: Optional[str] = None) -> None:
+        """
+        Admin toggle: change the fraction of solves profiled and the
+        profiler sampled solves use. Raises ValueError.
+        """
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f'mode must be one of {", ".join(PROFILE_MODES)}')
+        if sample_rate is not None and (not isinstance(sample_rate, (int, float)) or isinstance(sample_rate, bool)
+                                        or not 0.0 <= sample_rate <= 1.0):
+            raise ValueError('sample_rate must be a number between 0 and 1')
+        with self.lock:
+            if mode is not None:
+                self.mode = mode
+            if sample_rate is not None:
+                self.sample_rate = float(sample_rate)
+
+    def choose(self, requested: Optional[str]) -> Optional[str]:
+        """
+        Profile mode for a solve, or None to run it unprofiled. requested
+        is the request's X-Solver-Profile header: a mode, or anything else
+        non-empty for the configured one. Raises ValueError.
+        """
+        if requested:
+            if requested in PROFILE_MODES:
+                return requested
+            if requested.lower() in ('1', 'true', 'yes'):
+                return self.mode
+            raise ValueError(f'X-Solver-Profile must be one of {", ".join(PROFILE_MODES)} or 1')
+        if self.sample_rate and self.random.random() < self.sample_rate:
+            return self.mode
+        return None
+
+    def run(self, mode: str, tag: str, solve: Callable[..., Any], *args, **kwargs) -> Tuple[Any, str]:
+        """
+        Call solve(*args, **kwargs) under the given profiler, in this
+        thread. Returns (result, profile name); the profile is saved even
+        if solve raises.
+        """
+        tag = re.sub(r'[^0-9a-zA-Z_-]', '', tag)[:64] or 'solve'
+        name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{tag}{EXTENSIONS[mode]}"
+        path = os.path.join(self.directory, name)
+        started = time.perf_counter()
+        if mode == 'cprofile':
+            with self.cprofile_lock:
+                profile = cProfile.Profile()
+                try:
+                    result = profile.runcall(solve, *args, **kwargs)
+                finally:
+                    profile.dump_stats(path)
+                    self._saved(name, mode, started, None)
+            return result, name
+
+        sampler = StackSampler(threading.get_ident(), self.interval_ms, root=sys._getframe())
+        sampler.start()
+        try:
+            result = solve(*args, **kwargs)
+        finally:
+            sampler.stop()
+            with open(path, 'w') as f:
+                f.write(sampler.collapsed())
+            self._saved(name, mode, started, sampler.samples)
+        return result, name
+
+    def _saved(self, name: str, mode: str, started: float, samples: Optional[int]) -> None:
+        with self.lock:
+            self.details[name] = {'mode': mode, 'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+                                  'samples': samples}
+            names = self._names()
+            for old in names[:max(0, len(names) - self.max_profiles)]:
+                try:
+                    os.remove(os.path.join(self.directory, old))
+                except OSError:
+                    pass
+                self.details.pop(old, None)
+
+    def _names(self) -> List[str]:
+        """
+        Saved profiles, oldest first.
+        """
+        return sorted(name for name in os.listdir(self.directory) if NAME_PATTERN.match(name))
+
+    def path(self, name: str) -> Optional[str]:
+        """
+        File of a saved profile, or None for unknown or unsafe names.
+        """
+        if not NAME_PATTERN.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def profiles(self) -> List[Dict[str, Any]]:
+        """
+        Saved profiles, newest first, with whatever this process knows
+        about them.
+        """
+        listed = []
+        with self.lock:
+            for name in reversed(self._names()):
+                path = os.path.join(self.directory, name)
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                mode = 'cprofile' if name.endswith(EXTENSIONS['cprofile']) else 'sample'
+                listed.append(dict({'name': name, 'mode': mode, 'bytes': size, 'duration_ms': None,
+                                    'samples': None}, **self.details.get(name, {})))
+        return listed
+
+    def stats(self) -> Dict[str, Any]:
+        return {'sample_rate': self.sample_rate, 'mode': self.mode, 'interval_ms': self.interval_ms,
+                'max_profiles': self.max_profiles}
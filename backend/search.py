@@ -0,0 +1,560 @@
+"""
+Bitboard search engine for BlockBlastSolver.
+
+The search runs over (board, remaining shapes) states instead of over the
+six block orderings one at a time:
+
+- Blocks with identical normalized shapes share a shape id, so each
+  distinct ordering of shapes is searched once and the results are copied
+  to every block ordering that produces it.
+- A transposition table keyed by (board, sorted remaining shape ids)
+  memoizes the best continuations from each intermediate position, so
+  positions reached along several move orders are only expanded once.
+- With pruning enabled, placements whose score upper bound cannot reach
+  the current k-th best solution are skipped (branch and bound), and
+  line-clearing placements are tried first so the bound tightens early.
+- With a deadline, the search stops expanding once it passes and keeps
+  the best leaves found so far (anytime mode). A cancel callback stops it
+  the same way and is checked wherever the deadline is. Interrupted states
+  are not memoized.
+
+Scores are split as score = base(initial cells) + value(continuation),
+where a continuation's value only depends on the lines it clears and the
+final board (valued by the search's evaluator, see evaluators.py). That
+lets a memoized continuation be reused under any prefix.
+Each state keeps, per ordering of its remaining shapes, the k best
+continuations by (value desc, placement indices asc). Within a fixed
+prefix that is exactly the order of the final ranking, so the top-k over
+the whole search is unchanged.
+"""
+
+import time
+from itertools import permutations
+from typing import Dict, List, Tuple, Any, Optional, Set, Callable
+
+from bitboard import clear_lines, popcount
+from topk import TopK
+
+# Results of a state: shape ordering -> kept (value, -local_rank) pairs
+Continuations = Dict[Tuple[int, ...], List[Tuple[int, int]]]
+
+NO_CUTOFF = float('-inf')
+
+# Fewer leaf boards than this are scored one at a time: below it the fixed
+# cost of a NumPy pass outweighs the per-board savings of the LeafKernel
+MIN_BATCH_BOARDS = 4
+
+
+class BitboardSearch:
+    """
+    One exhaustive top-k search over a prepared set of blocks.
+    """
+
+    def __init__(self, solver, prepared: List[Tuple[Tuple[int, int], Any]], k: int,
+                 prune: bool = True, kernel=None, deadline: Optional[float] = None, evaluator=None,
+                 cancel: Optional[Callable[[], bool]] = None):
+        self.solver = solver
+        # Values final boards (evaluators.py); the kernel only computes cell counts
+        self.evaluator = evaluator if evaluator is not None else solver.evaluator()
+        if not self.evaluator.counts_only:
+            kernel = None
+        self.k = k
+        self.prune = prune
+        # time.monotonic() value after which the search stops expanding
+        self.deadline = deadline
+        # Returns True once the caller no longer wants the result
+        self.cancel = cancel
+        self.timed_out = False
+        self.cancelled = False
+        # Optional batch.LeafKernel that scores the last level in one NumPy pass
+        self.kernel = kernel
+        self.base = solver.rank_base
+        self.board_size = solver.board_size
+        self.row_masks = solver.row_masks
+        self.col_masks = solver.col_masks
+        self.all_line_masks = solver.all_line_masks
+        # Score contributed by a single cleared line
+        self.line_value = solver.score_from_counts(0, 0, 1)
+
+        # Identical shapes share an id and a placement table
+        shape_ids: Dict[Any, int] = {}
+        self.tables = []
+        self.block_shapes = []
+        for _, table in prepared:
+            shape_id = shape_ids.get(table.cells)
+            if shape_id is None:
+                shape_id = shape_ids[table.cells] = len(self.tables)
+                self.tables.append(table)
+            self.block_shapes.append(shape_id)
+
+        # Most cells each shape can put into a single row / single column
+        self.row_reach = []
+        self.col_reach = []
+        # Cell counts each shape can put into a single row / single column,
+        # including 0, as bitsets (bit n set = n cells)
+        self.row_counts = []
+        self.col_counts = []
+        for table in self.tables:
+            rows = [sum(1 for row, _ in table.cells if row == r) for r in range(table.height)]
+            cols = [sum(1 for _, col in table.cells if col == c) for c in range(table.width)]
+            self.row_reach.append(max(rows))
+            self.col_reach.append(max(cols))
+            self.row_counts.append(sum(1 << count for count in set(rows)) | 1)
+            self.col_counts.append(sum(1 << count for count in set(cols)) | 1)
+
+        # Memoized states: (board, remaining) -> (continuations, subtree_nodes, cutoff)
+        self.transpositions: Dict[Tuple[int, Tuple[int, ...]], Tuple[Continuations, int, float]] = {}
+        # Distinct shape orderings of each remaining multiset grouped by their
+        # first shape, for the pruning floor
+        self._orderings: Dict[Tuple[int, ...], Dict[int, List[Tuple[int, ...]]]] = {}
+        # (cells, spans, row reach, column reach, row sums, column sums) of
+        # each remaining multiset
+        self._remaining_totals: Dict[Tuple[int, ...], Tuple[int, int, int, int, int, int]] = {}
+
+        # Counters reported through stats
+        self.nodes = 0
+        # Placements expanded at each level; the last level holds the leaves
+        self.level_nodes = [0] * len(self.block_shapes)
+        # Placements that overlapped filled cells
+        self.rejected = 0
+        # Lines completed by the placements that were tried
+        self.line_clears = 0
+        self.table_hits = 0
+        self.nodes_saved = 0
+        self.duplicate_orders = 0
+        self.pruned = 0
+
+    def root_moves(self, board: int) -> List[Tuple[int, int]]:
+        """
+        (shape, placement index) of every first-level placement that fits.
+        These are the independent work units for a parallel solve.
+        """
+        moves = []
+        for shape in sorted(set(self.block_shapes)):
+            for index, mask, _ in self.tables[shape].entries:
+                if not board & mask:
+                    moves.append((shape, index))
+        return moves
+
+    def run(self, board: int, top: TopK, only: Optional[Set[Tuple[int, int]]] = None,
+            on_improve: Optional[Callable[[TopK], None]] = None,
+            on_progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """
+        Search every placement sequence from board and push the leaves into top.
+        If only is given, just the first-level (shape, index) moves in it are
+        searched. on_improve is called with top whenever a first-level move
+        improved it, on_progress with (first-level moves done, total) as
+        the search advances.
+        """
+        depth = len(self.block_shapes)
+        remaining = tuple(sorted(self.block_shapes))
+
+        # Block orderings that map to each shape ordering
+        label_orders: Dict[Tuple[int, ...], List[int]] = {}
+        first_order: Dict[int, int] = {}
+        for order_index, perm in enumerate(permutations(range(depth))):
+            shape_order = tuple(self.block_shapes[i] for i in perm)
+            if shape_order in label_orders:
+                self.duplicate_orders += 1
+            label_orders.setdefault(shape_order, []).append(order_index)
+            # Lowest ordering index of any leaf below a first move of each shape
+            first_order.setdefault(shape_order[0], order_index)
+
+        # Lines that are already complete get cleared by the first placement,
+        # so the first level has to check every line in that case
+        _, preexisting_lines = clear_lines(board, self.all_line_masks)
+
+        base_score = self.solver.score_from_counts(popcount(board), 0, 0)
+        order_scale = self.base ** depth
+        scale = self.base ** (depth - 1)
+
+        moves = list(self._children(board, remaining, bool(preexisting_lines)))
+        if self.deadline is not None:
+            # Anytime solves try the most promising first moves across all
+            # shapes first. Exhaustive ones keep shapes together, so the
+            # positions their first moves share are still memoized and
+            # scored in large LeafKernel batches when they come up again
+            moves.sort(key=lambda move: -(move[5] if self.prune else move[4]))
+        if only is not None:
+            moves = [move for move in moves if (move[0], move[2]) in only]
+
+        for done, (shape, rest, index, next_board, lines, bound) in enumerate(moves):
+            if on_progress is not None:
+                on_progress(done, len(moves))
+            if self._expired():
+                break
+            bonus = lines * self.line_value
+            prefix = index * scale
+            cutoff = NO_CUTOFF
+            if self.prune:
+                threshold = top.threshold()
+                if threshold is not None:
+                    cutoff = threshold - base_score
+                    # A leaf that ties the k-th best still loses unless its
+                    # rank is lower, which on sparse boards, where most
+                    # leaves tie, cuts nearly every first move after the first
+                    best_case = (base_score + bound, -(first_order[shape] * order_scale + prefix))
+                    if best_case <= top.heap[0]:
+                        self.pruned += 1
+                        continue
+
+            self.nodes += 1
+            self.level_nodes[0] += 1
+            continuations = self._expand(next_board, rest, cutoff - bonus)[0]
+
+            changes = top.changes
+            for order, kept in continuations.items():
+                order_indices = label_orders[(shape,) + order]
+                for value, neg_rank in kept:
+                    for order_index in order_indices:
+                        top.push(base_score + bonus + value, order_index * order_scale + prefix - neg_rank)
+            if on_improve is not None and top.changes != changes:
+                on_improve(top)
+        if on_progress is not None and not self.timed_out:
+            on_progress(len(moves), len(moves))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            'nodes': self.nodes,
+            'level_nodes': list(self.level_nodes),
+            'leaves': self.level_nodes[-1],
+            'rejected': self.rejected,
+            'line_clears': self.line_clears,
+            'pruned': self.pruned,
+            'table_hits': self.table_hits,
+            'table_entries': len(self.transpositions),
+            'nodes_saved': self.nodes_saved,
+            'duplicate_orders': self.duplicate_orders,
+            'complete': not self.timed_out,
+        }
+        if self.cancel is not None:
+            stats['cancelled'] = self.cancelled
+        return stats
+
+    def _expired(self) -> bool:
+        if not self.timed_out:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.timed_out = True
+            elif self.cancel is not None and self.cancel():
+                self.timed_out = self.cancelled = True
+        return self.timed_out
+
+    def upper_bound(self, board: int, remaining: Tuple[int, ...]) -> float:
+        """
+        Admissible upper bound on the continuation value from board.
+
+        Every placed cell lands in one row and one column, so the rows (and
+        separately the columns) that can be completed are bounded by filling
+        the cheapest lines first out of the remaining cell budget; a cleared
+        line costs a full board_size cells to refill. A line is only
+        completable if the remaining shapes can put that many cells into a
+        single row (column) between them. When no column can be completed,
+        no cell leaves a row before the row itself clears, so a row needs
+        exactly its empty count, which has to be a sum of per-shape row
+        counts (and likewise for columns). A block also only completes lines
+        it touches, at most height + width. Each cleared line removes at most
+        board_size cells, which bounds the final cell count from below.
+        Assumes the leaf value does not grow with the number of filled cells
+        and never exceeds the cell term, which every evaluator guarantees.
+        """
+        size = self.board_size
+        totals = self._remaining_totals.get(remaining)
+        if totals is None:
+            totals = self._remaining_totals[remaining] = (
+                sum(self.tables[shape].size for shape in remaining),
+                sum(self.tables[shape].height + self.tables[shape].width for shape in remaining),
+                sum(self.row_reach[shape] for shape in remaining),
+                sum(self.col_reach[shape] for shape in remaining),
+                self._sums(self.row_counts, remaining),
+                self._sums(self.col_counts, remaining),
+            )
+        cells, spans, row_reach, col_reach, row_sums, col_sums = totals
+
+        row_empties = sorted(size - popcount(board & mask) for mask in self.row_masks)
+        col_empties = sorted(size - popcount(board & mask) for mask in self.col_masks)
+        # Every sum is possible when lines of the other direction may clear first
+        if col_empties[0] <= min(col_reach, cells):
+            row_sums = -1
+        if row_empties[0] <= min(row_reach, cells):
+            col_sums = -1
+
+        max_lines = 0
+        for empties, reach, sums in ((row_empties, row_reach, row_sums), (col_empties, col_reach, col_sums)):
+            budget = cells
+            for empty in empties:
+                if empty > budget or empty > reach:
+                    break
+                if not sums >> empty & 1:
+                    continue
+                budget -= empty
+                max_lines += 1
+            else:
+                if reach >= size and sums >> size & 1:
+                    max_lines += budget // size
+        max_lines = min(max_lines, spans)
+
+        final_cells = max(0, popcount(board) + cells - size * max_lines)
+        return max_lines * self.line_value + self.solver.score_from_counts(0, final_cells, 0)
+
+    @staticmethod
+    def _sums(counts: List[int], remaining: Tuple[int, ...]) -> int:
+        """
+        Bitset of the totals the remaining shapes can put into one line,
+        each shape adding one of its counts.
+        """
+        sums = 1
+        for shape in remaining:
+            options = counts[shape]
+            combined = 0
+            count = 0
+            while options:
+                if options & 1:
+                    combined |= sums << count
+                options >>= 1
+                count += 1
+            sums = combined
+        return sums
+
+    def _children(self, board: int, remaining: Tuple[int, ...], check_all_lines: bool,
+                  bounds: Optional[bool] = None):
+        """
+        Yield (shape, rest, index, next_board, lines, bound) for every
+        placement of each distinct remaining shape. With pruning enabled
+        (or bounds=True), bound is the placement's line bonus plus the upper
+        bound of what can follow it, and placements with the highest bound
+        come first within each shape (otherwise bound is None). Exploring by bound finds the
+        line-clearing sequences early, which on sparse and large boards is
+        what lets the rest be cut.
+        """
+        all_line_masks = self.all_line_masks
+        line_value = self.line_value
+        if bounds is None:
+            bounds = self.prune
+        for position, shape in enumerate(remaining):
+            if position and remaining[position - 1] == shape:
+                continue
+            rest = remaining[:position] + remaining[position + 1:]
+
+            children = []
+            entries = self.tables[shape].entries
+            for index, mask, touched in entries:
+                if board & mask:
+                    continue
+                next_board, lines = clear_lines(board | mask, all_line_masks if check_all_lines else touched)
+                bound = lines * line_value + self.upper_bound(next_board, rest) if bounds else None
+                children.append((lines, index, next_board, bound))
+            self.rejected += len(entries) - len(children)
+            self.line_clears += sum(child[0] for child in children)
+            if bounds:
+                children.sort(key=lambda child: -child[3])
+
+            for lines, index, next_board, bound in children:
+                yield shape, rest, index, next_board, lines, bound
+
+    def _expand(self, board: int, remaining: Tuple[int, ...],
+                cutoff: float = NO_CUTOFF) -> Tuple[Continuations, int, float]:
+        """
+        Best continuations from board placing every shape in remaining.
+        Continuations worth less than cutoff can never make the top-k and
+        may be dropped. Returns (continuations, subtree_nodes, cutoff) where
+        subtree_nodes counts the nodes below this state as if nothing had
+        been memoized or pruned.
+        """
+        key = (board, remaining)
+        entry = self.transpositions.get(key)
+        # An entry searched with a lower cutoff holds everything this one needs
+        if entry is not None and entry[2] <= cutoff:
+            self.table_hits += 1
+            self.nodes_saved += entry[1]
+            return entry
+
+        if not remaining:
+            # Only reached by a single-block search, whose first move is its leaf
+            entry = {(): [(self.evaluator.value(board), 0)]}, 0, cutoff
+        elif len(remaining) == 1:
+            entry = self._expand_last(board, remaining[0], cutoff)
+        else:
+            entry = self._expand_inner(board, remaining, cutoff)
+
+        # A state cut short by the deadline is missing continuations
+        if not self.timed_out:
+            self.transpositions[key] = entry
+        return entry
+
+    def _expand_last(self, board: int, shape: int, cutoff: float) -> Tuple[Continuations, int, float]:
+        """
+        Leaf level: place the last shape everywhere it fits and score it.
+        A single board is always scored here, never by the LeafKernel (see
+        MIN_BATCH_BOARDS).
+        """
+        table = self.tables[shape]
+        line_value = self.line_value
+        best = TopK(self.k)
+        nodes = 0
+        line_clears = 0
+
+        if self.evaluator.counts_only:
+            leaf_value = self.solver.score_from_counts
+            for index, mask, touched in table.entries:
+                if board & mask:
+                    continue
+                nodes += 1
+                final, lines = clear_lines(board | mask, touched)
+                line_clears += lines
+                value = lines * line_value + leaf_value(0, popcount(final), 0)
+                if value >= cutoff:
+                    best.push(value, index)
+        else:
+            evaluator = self.evaluator
+            state = evaluator.prepare(board)
+            for index, mask, touched in table.entries:
+                if board & mask:
+                    continue
+                nodes += 1
+                final, lines = clear_lines(board | mask, touched)
+                line_clears += lines
+                value = lines * line_value + evaluator.leaf_value(state, final, mask, lines)
+                if value >= cutoff:
+                    best.push(value, index)
+
+        self._count_leaves(len(table), nodes, line_clears)
+        return {(shape,): best.heap}, nodes, cutoff
+
+    def _count_leaves(self, placements: int, nodes: int, line_clears: int) -> None:
+        self.nodes += nodes
+        self.level_nodes[-1] += nodes
+        self.rejected += placements - nodes
+        self.line_clears += line_clears
+
+    def _expand_inner(self, board: int, remaining: Tuple[int, ...],
+                      cutoff: float) -> Tuple[Continuations, int, float]:
+        """
+        Place each distinct remaining shape, then merge the continuations of
+        the resulting states into this state's per-ordering top-k lists.
+        """
+        if self.kernel is not None and len(remaining) == 2:
+            return self._expand_batched(board, remaining, cutoff)
+
+        line_value = self.line_value
+        scale = self.base ** (len(remaining) - 1)
+        collected: Dict[Tuple[int, ...], TopK] = {}
+        orders_by_first = self._orders_by_first(remaining)
+        orderings = self._ordering_count(remaining)
+        floor = cutoff
+        nodes = 0
+        level = len(self.block_shapes) - len(remaining)
+
+        for shape, rest, index, next_board, lines, bound in self._children(board, remaining, False):
+            if self._expired():
+                break
+            bonus = lines * line_value
+            if self.prune:
+                # Once every ordering holds k continuations, a child also has
+                # to beat the weakest of them to matter
+                if len(collected) == orderings:
+                    weakest = min(target.heap[0][0] if len(target) == self.k else NO_CUTOFF
+                                  for target in collected.values())
+                    floor = max(cutoff, weakest)
+                # The child's continuations only go to orderings starting
+                # with its shape; once those are full, one that ties the
+                # weakest kept continuation also needs a lower rank
+                starts = orders_by_first[shape]
+                full = all(len(collected.get(order, ())) == self.k for order in starts)
+                best_case = (bound, -index * scale)
+                if bound < floor or (full and all(best_case <= collected[order].heap[0] for order in starts)):
+                    self.pruned += 1
+                    continue
+
+            self.nodes += 1
+            self.level_nodes[level] += 1
+            continuations, sub_nodes, _ = self._expand(next_board, rest, floor - bonus)
+            nodes += 1 + sub_nodes
+
+            prefix = index * scale
+            for order, kept in continuations.items():
+                full_order = (shape,) + order
+                target = collected.get(full_order)
+                if target is None:
+                    target = collected[full_order] = TopK(self.k)
+                for value, neg_rank in kept:
+                    target.push(value + bonus, prefix - neg_rank)
+
+        return {order: target.heap for order, target in collected.items()}, nodes, cutoff
+
+    def _expand_batched(self, board: int, remaining: Tuple[int, ...],
+                        cutoff: float) -> Tuple[Continuations, int, float]:
+        """
+        _expand_inner for the second-to-last level with a LeafKernel: every
+        child position that is not already memoized is scored in one batched
+        pass per final shape instead of one leaf expansion per child, unless
+        there are fewer than MIN_BATCH_BOARDS of them.
+        Children are not bounded here: the kernel applies each child's
+        cutoff to its leaves anyway, and bounding every child costs more
+        than the few batch rows a bound check would skip.
+        """
+        line_value = self.line_value
+        scale = self.base
+        collected: Dict[Tuple[int, ...], TopK] = {}
+        # Final shape -> [(shape, index, bonus, next_board, child_cutoff)]
+        pending: Dict[int, List[Tuple[int, int, int, int, float]]] = {}
+        ready = []
+        nodes = 0
+        level = len(self.block_shapes) - 2
+
+        for shape, rest, index, next_board, lines, _ in self._children(board, remaining, False, bounds=False):
+            if self._expired():
+                break
+            bonus = lines * line_value
+            self.nodes += 1
+            self.level_nodes[level] += 1
+            key = (next_board, rest)
+            entry = self.transpositions.get(key)
+            if entry is not None and entry[2] <= cutoff - bonus:
+                self.table_hits += 1
+                self.nodes_saved += entry[1]
+                ready.append((shape, index, bonus, entry))
+            else:
+                pending.setdefault(rest[0], []).append((shape, index, bonus, next_board, cutoff - bonus))
+
+        for last_shape, children in pending.items():
+            table = self.tables[last_shape]
+            if len(children) < MIN_BATCH_BOARDS:
+                evaluated = None
+            else:
+                evaluated = self.kernel.best_many([child[3] for child in children], table,
+                                                  self.k, [child[4] for child in children])
+            for position, child in enumerate(children):
+                shape, index, bonus, next_board, child_cutoff = child
+                if evaluated is None:
+                    entry = self._expand_last(next_board, last_shape, child_cutoff)
+                else:
+                    best, leaf_nodes, line_clears = evaluated[position]
+                    self._count_leaves(len(table), leaf_nodes, line_clears)
+                    entry = ({(last_shape,): best}, leaf_nodes, child_cutoff)
+                if not self.timed_out:
+                    self.transpositions[(next_board, (last_shape,))] = entry
+                ready.append((shape, index, bonus, entry))
+
+        for shape, index, bonus, (continuations, sub_nodes, _) in ready:
+            nodes += 1 + sub_nodes
+            prefix = index * scale
+            for order, kept in continuations.items():
+                full_order = (shape,) + order
+                target = collected.get(full_order)
+                if target is None:
+                    target = collected[full_order] = TopK(self.k)
+                for value, neg_rank in kept:
+                    target.push(value + bonus, prefix - neg_rank)
+
+        return {order: target.heap for order, target in collected.items()}, nodes, cutoff
+
+    def _orders_by_first(self, remaining: Tuple[int, ...]) -> Dict[int, List[Tuple[int, ...]]]:
+        grouped = self._orderings.get(remaining)
+        if grouped is None:
+            grouped = self._orderings[remaining] = {}
+            for order in sorted(set(permutations(remaining))):
+                grouped.setdefault(order[0], []).append(order)
+        return grouped
+
+    def _ordering_count(self, remaining: Tuple[int, ...]) -> int:
+        return sum(len(orders) for orders in self._orders_by_first(remaining).values())
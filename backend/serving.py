@@ -0,0 +1,136 @@
+"""
+Admission control for production serving.
+
+Solves are CPU-bound, so running more of them at once than there are
+cores only makes every request slower. SolveGate bounds the number of
+solves running at once, lets a bounded number of requests wait for a
+slot, and rejects the rest with Overloaded so the API can answer 429 with
+a Retry-After estimate instead of letting latency grow without limit.
+
+Identical in-flight requests are coalesced by ResultCache, before they
+reach the gate, so they share one slot and one computation.
+
+The gate is per process. Under a WSGI server run one process with several
+threads, e.g.
+
+    gunicorn --workers 1 --threads 16 --bind 0.0.0.0:8000 app:app
+
+and let SOLVER_WORKERS scale the search across cores.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+DEFAULT_MAX_WAIT_MS = 10000
+# Weight of the newest solve in the running average of solve times
+DURATION_SMOOTHING = 0.2
+
+
+class Overloaded(Exception):
+    """
+    Raised when a solve cannot get a slot; retry_after is in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SolveGate:
+    """
+    Bounded concurrency with a bounded, time-limited wait queue.
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, max_queue: Optional[int] = None,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS):
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.max_queue = max_queue if max_queue is not None else 2 * self.max_concurrent
+        self.max_wait_ms = max_wait_ms
+        self.slots = threading.Semaphore(self.max_concurrent)
+        self.lock = threading.Lock()
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        # Running average of how long a slot is held
+        self.average_solve_ms = 0.0
+
+    def retry_after(self) -> int:
+        """
+        Seconds until a slot is likely to be free, at least 1.
+        """
+        backlog = (self.waiting + 1) / self.max_concurrent
+        return max(1, math.ceil(backlog * self.average_solve_ms / 1000.0))
+
+    def acquire(self) -> float:
+        """
+        Take a slot, waiting up to max_wait_ms. Raises Overloaded when the
+        queue is full or the wait times out. Returns a token to hand to
+        release(), which may be called from another thread.
+        """
+        with self.lock:
+            if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+                self.rejected += 1
+                raise Overloaded('Solver is at capacity, try again later', self.retry_after())
+            self.waiting += 1
+
+        started = time.monotonic()
+        try:
+            acquired = self.slots.acquire(timeout=self.max_wait_ms / 1000.0)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+        waited_ms = (time.monotonic() - started) * 1000.0
+
+        with self.lock:
+            if not acquired:
+                self.rejected += 1
+                raise Overloaded('Timed out waiting for a solver slot', self.retry_after())
+            self.active += 1
+            self.admitted += 1
+            self.total_wait_ms += waited_ms
+        return time.monotonic()
+
+    def release(self, token: float) -> None:
+        held_ms = (time.monotonic() - token) * 1000.0
+        with self.lock:
+            self.active -= 1
+            if self.average_solve_ms:
+                self.average_solve_ms += DURATION_SMOOTHING * (held_ms - self.average_solve_ms)
+            else:
+                self.average_solve_ms = held_ms
+        self.slots.release()
+
+    @contextmanager
+    def slot(self):
+        token = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(token)
+
+    def run(self, solve, *args, **kwargs):
+        """
+        Call solve(*args, **kwargs) while holding a slot.
+        """
+        with self.slot():
+            return solve(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'max_wait_ms': self.max_wait_ms,
+                'active': self.active,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'average_wait_ms': round(self.total_wait_ms / self.admitted, 3) if self.admitted else 0.0,
+                'average_solve_ms': round(self.average_solve_ms, 3),
+            }
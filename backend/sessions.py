@@ -0,0 +1,155 @@
+"""
+Server-side game sessions.
+
+A session holds the board of one game, so clients only send each new deal
+of three pieces and pick a solution by index; the server advances the
+board itself. The solutions of the current deal stay on the session, so
+accepting one needs no re-solve and no board round trip.
+
+Sessions live in memory, ordered by last use, and expire after ttl
+seconds without a request. Expired sessions are dropped lazily whenever
+the manager is touched, and the least recently used session is dropped
+when max_sessions is reached. Each session has its own lock, so
+concurrent requests for one game are applied one at a time.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+DEFAULT_TTL_S = 1800
+DEFAULT_MAX_SESSIONS = 10000
+
+
+class SessionError(Exception):
+    """
+    Raised for a request that does not fit the session's state, such as
+    accepting a solution before any deal was solved.
+    """
+
+
+class GameSession:
+    """
+    One game: its board, the current deal and its solutions, and totals.
+    """
+
+    def __init__(self, session_id: str, board: List[List[int]]):
+        self.id = session_id
+        self.board = board
+        self.blocks: Optional[List[List[List[int]]]] = None
+        self.solutions: List[Dict[str, Any]] = []
+        self.turn = 0
+        self.score = 0
+        self.lines_cleared = 0
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.lock = threading.Lock()
+
+    def deal(self, blocks: List[List[List[int]]], solutions: List[Dict[str, Any]]) -> None:
+        """
+        Record a new deal and its solutions, replacing any unaccepted one.
+        """
+        self.blocks = blocks
+        self.solutions = solutions
+
+    def accept(self, index: int) -> Dict[str, Any]:
+        """
+        Play solution `index` of the current deal and return it.
+        """
+        if self.blocks is None:
+            raise SessionError('No deal to accept, post the next pieces first')
+        if not 0 <= index < len(self.solutions):
+            raise SessionError(f'Solution index must be between 0 and {len(self.solutions) - 1}'
+                               if self.solutions else 'The current deal has no solutions, the game is over')
+        solution = self.solutions[index]
+        self.board = solution['final_board']
+        self.turn += 1
+        self.score += solution['score']
+        self.lines_cleared += solution['lines_cleared']
+        self.blocks = None
+        self.solutions = []
+        return solution
+
+    def state(self, ttl: float) -> Dict[str, Any]:
+        return {
+            'session_id': self.id,
+            'board': self.board,
+            'turn': self.turn,
+            'score': self.score,
+            'lines_cleared': self.lines_cleared,
+            'pending_solutions': len(self.solutions) if self.blocks is not None else None,
+            'expires_in': max(0, round(self.last_used + ttl - time.monotonic())),
+        }
+
+
+class SessionManager:
+    """
+    In-memory sessions with an idle TTL and a size bound.
+    """
+
+    def __init__(self, board_size: int = 8, ttl: float = DEFAULT_TTL_S,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.board_size = board_size
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+        # session id -> session, least recently used first
+        self.sessions: 'OrderedDict[str, GameSession]' = OrderedDict()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def _expire(self, now: float) -> None:
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if now - oldest.last_used < self.ttl:
+                break
+            self.sessions.popitem(last=False)
+            self.expired += 1
+
+    def create(self, board: Optional[List[List[int]]] = None) -> GameSession:
+        """
+        Start a game on board (an empty board by default).
+        """
+        if board is None:
+            board = [[0] * self.board_size for _ in range(self.board_size)]
+        session = GameSession(uuid.uuid4().hex, board)
+        with self.lock:
+            self._expire(session.created)
+            while self.sessions and len(self.sessions) >= self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+            self.sessions[session.id] = session
+            self.created += 1
+        return session
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        """
+        The live session with this id, marked as used, or None.
+        """
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            self._expire(time.monotonic())
+            return {
+                'active': len(self.sessions),
+                'max_sessions': self.max_sessions,
+                'ttl_s': self.ttl,
+                'created': self.created,
+                'expired': self.expired,
+                'evicted': self.evicted,
+            }
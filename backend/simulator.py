@@ -0,0 +1,204 @@
+"""
+Headless self-play simulator.
+
+Plays full games against a seeded piece generator: every turn deals three
+pieces (or --deal-size), asks BlockBlastSolver for the best move and applies it with the
+solver's own place_block and clear_complete_lines, until a deal cannot be
+placed or the turn limit is reached. Games run across worker processes
+and the summary reports games per second, score, survival length and the
+solve latency distribution.
+
+Game g of a run with seed s always uses the seed s + g, and a policy only
+depends on its inputs, so the per-game results (and their fingerprint) are
+identical for a given seed no matter how many workers play them. Only the
+timings vary between runs.
+
+    python simulator.py --games 1000 --workers 4 --seed 0
+    python simulator.py --games 200 --policy lookahead --save results.json
+    python simulator.py --games 100 --board-size 10 --deal-size 4
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+from lookahead import LookaheadPlanner
+from pieces import STANDARD_PIECES, to_grid, piece_weights
+from solver import BlockBlastSolver
+
+POLICIES = ('greedy', 'lookahead')
+DEFAULT_MAX_TURNS = 1000
+DEFAULT_DEAL_SIZE = 3
+# Game points per cleared line, on top of one point per placed cell
+LINE_POINTS = 10
+# Node budget per lookahead move; a time budget would make games depend on machine speed
+LOOKAHEAD_NODE_BUDGET = 20000
+
+_worker_solver: Optional[BlockBlastSolver] = None
+
+
+def _init_worker(engine: str, batch_leaves: bool, board_size: int = 8) -> None:
+    global _worker_solver
+    _worker_solver = BlockBlastSolver(board_size=board_size, engine=engine, batch_leaves=batch_leaves)
+    if _worker_solver.jit_kernel is not None:
+        _worker_solver.jit_kernel.warm_up()
+
+
+def play_game(solver: BlockBlastSolver, seed: int, policy: str = 'greedy',
+              max_turns: int = DEFAULT_MAX_TURNS, pieces: Optional[List[str]] = None,
+              weights: Optional[Dict[str, float]] = None,
+              deal_size: int = DEFAULT_DEAL_SIZE) -> Dict[str, Any]:
+    """
+    Play one game from an empty board of the solver's board_size, dealing
+    deal_size pieces per turn. Returns its points, turns survived,
+    lines cleared, whether it ended by running out of moves, and the
+    latency of every solve in milliseconds.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy '{policy}', expected one of {POLICIES}")
+    rng = random.Random(seed)
+    distribution = piece_weights(pieces or sorted(STANDARD_PIECES), weights)
+    shapes = [shape for shape, _ in distribution]
+    shape_weights = [weight for _, weight in distribution]
+
+    board = np.zeros((solver.board_size, solver.board_size), dtype=int)
+    points = 0
+    lines = 0
+    turns = 0
+    latencies = []
+    while turns < max_turns:
+        blocks = [to_grid(shape) for shape in rng.choices(shapes, weights=shape_weights, k=deal_size)]
+        started = time.perf_counter()
+        if policy == 'lookahead':
+            planner = LookaheadPlanner(solver, pieces=pieces, weights=weights, seed=rng.getrandbits(32),
+                                       node_budget=LOOKAHEAD_NODE_BUDGET, deal_size=deal_size)
+            solutions, _ = planner.plan(board.tolist(), blocks, 1)
+        else:
+            solutions = solver.solve_iteration(board.tolist(), blocks, top_k=1)
+        latencies.append((time.perf_counter() - started) * 1000.0)
+        if not solutions:
+            break
+
+        block_coords = [solver.extract_block_coordinates(block) for block in blocks]
+        for placement in solutions[0]['placements']:
+            coords = block_coords[placement['block_index']]
+            board = solver.place_block(board, coords, placement['top_left_row'], placement['top_left_col'])
+            board, cleared = solver.clear_complete_lines(board)
+            points += len(coords) + cleared * LINE_POINTS
+            lines += cleared
+        if board.tolist() != solutions[0]['final_board']:
+            raise RuntimeError(f'Game {seed} turn {turns}: replayed board differs from the solver\'s final board')
+        turns += 1
+
+    return {
+        'seed': seed,
+        'points': points,
+        'turns': turns,
+        'lines': lines,
+        'died': turns < max_turns,
+        'latencies_ms': latencies,
+    }
+
+
+def _play(seed: int, policy: str, max_turns: int, deal_size: int = DEFAULT_DEAL_SIZE) -> Dict[str, Any]:
+    return play_game(_worker_solver, seed, policy, max_turns, deal_size=deal_size)
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def summarize(games: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    """
+    Aggregate per-game results (in game order) into the run summary.
+    """
+    points = [game['points'] for game in games]
+    turns = [game['turns'] for game in games]
+    latencies = [ms for game in games for ms in game['latencies_ms']]
+    outcomes = [(game['seed'], game['points'], game['turns'], game['lines']) for game in games]
+    return {
+        'games': len(games),
+        'seconds': round(seconds, 3),
+        'games_per_sec': round(len(games) / seconds, 2) if seconds else None,
+        'solves_per_sec': round(len(latencies) / seconds, 1) if seconds else None,
+        'points_mean': round(sum(points) / len(points), 2) if points else 0,
+        'points_median': _percentile(points, 0.5),
+        'points_max': max(points, default=0),
+        'turns_mean': round(sum(turns) / len(turns), 2) if turns else 0,
+        'turns_median': _percentile(turns, 0.5),
+        'survival_rate': round(sum(not game['died'] for game in games) / len(games), 4) if games else 0,
+        'solve_ms': {
+            'p50': round(_percentile(latencies, 0.5), 3),
+            'p90': round(_percentile(latencies, 0.9), 3),
+            'p99': round(_percentile(latencies, 0.99), 3),
+            'max': round(max(latencies, default=0.0), 3),
+        },
+        # Depends only on the seed and the solver's choices, not on timing
+        'fingerprint': hashlib.blake2b(json.dumps(outcomes).encode(), digest_size=8).hexdigest(),
+    }
+
+
+def simulate(games: int, seed: int = 0, workers: Optional[int] = None, policy: str = 'greedy',
+             max_turns: int = DEFAULT_MAX_TURNS, engine: str = 'bitboard',
+             batch_leaves: bool = True, board_size: int = 8,
+             deal_size: int = DEFAULT_DEAL_SIZE) -> Dict[str, Any]:
+    """
+    Play `games` games seeded seed, seed + 1, ... and summarize them.
+    workers=1 plays in this process; None uses every CPU.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy '{policy}', expected one of {POLICIES}")
+    workers = workers or os.cpu_count() or 1
+    seeds = range(seed, seed + games)
+    started = time.perf_counter()
+    if workers == 1:
+        _init_worker(engine, batch_leaves, board_size)
+        results = [_play(game_seed, policy, max_turns, deal_size) for game_seed in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(engine, batch_leaves, board_size)) as executor:
+            # map keeps game order, so the summary does not depend on scheduling
+            chunksize = max(1, games // (workers * 4))
+            results = list(executor.map(_play, seeds, [policy] * games, [max_turns] * games,
+                                        [deal_size] * games, chunksize=chunksize))
+    summary = summarize(results, time.perf_counter() - started)
+    summary.update({'seed': seed, 'workers': workers, 'policy': policy, 'engine': engine,
+                    'max_turns': max_turns, 'board_size': board_size, 'deal_size': deal_size})
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Play seeded self-play games with BlockBlastSolver.')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, help='worker processes, default one per CPU')
+    parser.add_argument('--policy', default='greedy', choices=POLICIES)
+    parser.add_argument('--max-turns', type=int, default=DEFAULT_MAX_TURNS)
+    parser.add_argument('--engine', default='bitboard', choices=('bitboard', 'numpy', 'jit'))
+    parser.add_argument('--no-batch', action='store_true', help='disable batched leaf scoring')
+    parser.add_argument('--board-size', type=int, default=8)
+    parser.add_argument('--deal-size', type=int, default=DEFAULT_DEAL_SIZE, help='pieces dealt per turn')
+    parser.add_argument('--save', help='write the summary as JSON to this path')
+    args = parser.parse_args(argv)
+
+    summary = simulate(args.games, args.seed, args.workers, args.policy, args.max_turns,
+                       args.engine, batch_leaves=not args.no_batch, board_size=args.board_size,
+                       deal_size=args.deal_size)
+    print(json.dumps(summary, indent=2))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(summary, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,30 +2,79 @@
 Block Blast Solver Algorithm
 
 This module implements the core algorithm for solving Block Blast puzzles.
-The solver tries all permutations of the three blocks and all possible positions
-to find the best placement strategies.
+The solver tries all permutations of the blocks (three in the game, any
+number here) and all possible positions on an NxN board to find the best
+placement strategies.
 """
 
 import numpy as np
-from itertools import permutations
-from typing import List, Tuple, Optional, Dict, Any
+from itertools import permutations, combinations
+from typing import List, Tuple, Optional, Dict, Any, Callable
 import copy
+import time
+
+from bitboard import (board_to_bits, bits_to_board, line_masks, clear_lines,
+                      normalize_shape, PlacementTable, Shape)
+from topk import TopK, encode_rank, decode_rank
+from search import BitboardSearch
+from batch import LeafKernel, supports as batch_supports
+from feasibility import find_sequence
+from evaluators import EVALUATORS, DEFAULT_EVALUATOR
+import jit
+
+ENGINES = ('bitboard', 'numpy', 'jit')
+DEFAULT_TOP_K = 3
 
 
 class BlockBlastSolver:
-    def __init__(self, board_size: int = 8):
+    def __init__(self, board_size: int = 8, engine: str = 'bitboard', batch_leaves: bool = True):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
         self.board_size = board_size
+        self.engine = engine
+        self.row_masks, self.col_masks = line_masks(board_size)
+        self.all_line_masks = self.row_masks + self.col_masks
+        # Every placement index is below board_size ** 2, so it can serve as
+        # the digit base when packing a leaf's placements into one rank
+        self.rank_base = board_size * board_size
+        # Placement tables keyed by normalized shape, shared by every request
+        # this solver instance handles
+        self.placement_tables: Dict[Shape, PlacementTable] = {}
+        # Vectorized last-level scoring for the bitboard engine
+        self.leaf_kernel = LeafKernel(self) if batch_leaves and batch_supports(board_size) else None
+        # Compiled search; without Numba the solver uses the bitboard engine
+        self.jit_kernel = None
+        if engine == 'jit':
+            if jit.available() and jit.supports(board_size):
+                self.jit_kernel = jit.JitKernel(self)
+            else:
+                self.engine = 'bitboard'
+        # Leaf evaluators by name, built on first use
+        self.evaluators: Dict[str, Any] = {}
         
+    def evaluator(self, name: Optional[str] = None):
+        """
+        Return the named leaf evaluator (see evaluators.py), building it on first use.
+        """
+        name = name or DEFAULT_EVALUATOR
+        evaluator = self.evaluators.get(name)
+        if evaluator is None:
+            if name not in EVALUATORS:
+                raise ValueError(f"Unknown evaluator '{name}', expected one of {tuple(EVALUATORS)}")
+            evaluator = self.evaluators[name] = EVALUATORS[name](self)
+        return evaluator
+    
     def extract_block_coordinates(self, block_grid: List[List[int]]) -> List[Tuple[int, int]]:
         """
-        Extract coordinates of filled cells from a 5x5 block grid.
-        Returns list of (row, col) coordinates as they appear in the 5x5 canvas.
-        The 5x5 grid is just a canvas - we keep the original positions.
+        Extract coordinates of filled cells from a block grid (5x5 on the
+        standard board, any size works).
+        Returns list of (row, col) coordinates as they appear in the canvas.
+        The grid is just a canvas - we keep the original positions.
         """
         coordinates = []
-        for row in range(5):
-            for col in range(5):
-                if block_grid[row][col] == 1:
+        for row, cells in enumerate(block_grid):
+            for col, cell in enumerate(cells):
+                if cell == 1:
                     coordinates.append((row, col))
         return coordinates
     
@@ -105,12 +154,17 @@ class BlockBlastSolver:
         Calculate a score for a solution based on various factors.
         Higher score is better.
         """
+        return self.score_from_counts(np.sum(initial_board), np.sum(final_board), lines_cleared)
+    
+    def score_from_counts(self, initial_blocks: int, final_blocks: int, lines_cleared: int) -> int:
+        """
+        Same score as calculate_score, computed from filled-cell counts.
+        Used by the bitboard engine, which never materializes the boards.
+        """
         # Base score from lines cleared
         score = lines_cleared * 10
         
         # Bonus for clearing more blocks
-        initial_blocks = np.sum(initial_board)
-        final_blocks = np.sum(final_board)
         blocks_cleared = initial_blocks - final_blocks
         score += blocks_cleared * 2
         
@@ -119,85 +173,310 @@ class BlockBlastSolver:
         
         return score
     
+    def placement_table(self, cells: Shape) -> PlacementTable:
+        """
+        Return the placement table for a normalized shape, building it on first use.
+        """
+        table = self.placement_tables.get(cells)
+        if table is None:
+            table = PlacementTable(cells, self.board_size, self.all_line_masks)
+            self.placement_tables[cells] = table
+        return table
+    
+    def prepare_blocks(self, blocks: List[List[List[int]]]) -> Optional[List[Tuple[Tuple[int, int], PlacementTable]]]:
+        """
+        Normalize each block and look up its placement table.
+        Returns a list of (canvas_offset, table) per block, or None if any
+        block is empty.
+        """
+        prepared = []
+        for block in blocks:
+            coords = self.extract_block_coordinates(block)
+            if not coords:
+                return None
+            offset, cells = normalize_shape(coords)
+            prepared.append((offset, self.placement_table(cells)))
+        return prepared
+    
+    def canvas_top_left(self, offset: Tuple[int, int], table: PlacementTable, index: int) -> Tuple[int, int]:
+        """
+        Convert a placement table entry back to the canvas top-left position
+        used in solution placements.
+        """
+        anchor_row, anchor_col = table.anchors[index]
+        return anchor_row - offset[0], anchor_col - offset[1]
+    
     def solve_iteration(self, initial_board: List[List[int]], 
-                       blocks: List[List[List[int]]]) -> List[Dict[str, Any]]:
+                       blocks: List[List[List[int]]],
+                       top_k: int = DEFAULT_TOP_K,
+                       stats: Optional[Dict[str, Any]] = None,
+                       prune: bool = True,
+                       time_budget_ms: Optional[float] = None,
+                       on_improve: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                       evaluator: Optional[str] = None,
+                       cancel: Optional[Callable[[], bool]] = None,
+                       on_progress: Optional[Callable[[int, int], None]] = None) -> List[Dict[str, Any]]:
         """
-        Solve one iteration of Block Blast with the given board and three blocks.
+        Solve one iteration of Block Blast with the given board and blocks.
         
         Args:
-            initial_board: 8x8 grid representing the current board state
-            blocks: List of three 5x5 grids representing the blocks to place
+            initial_board: board_size x board_size grid representing the current board state
+            blocks: List of block grids (usually three 5x5) representing the blocks to place
+            top_k: Number of solutions to return
+            stats: Optional dict that receives search counters (nodes
+                expanded per level, rejected placements, line clears,
+                transposition table hits, nodes saved) and the time spent
+                in each phase, in stats['phase_ms']. stats['feasible'] is
+                False when no ordering fits every block; the search is then
+                skipped and no solutions are returned (see best_partial)
+            prune: Skip placements whose score upper bound cannot reach the
+                current top-k (bitboard engine only, results are unchanged)
+            time_budget_ms: Stop searching after this long and return the best
+                solutions found so far; stats['complete'] tells whether the
+                search finished. Runs the bitboard search, which checks the
+                deadline between placements (ignored by the numpy engine)
+            on_improve: Called with the current best solutions each time a
+                first-level placement improves them (bitboard search only)
+            evaluator: Name of the leaf evaluator that values final boards,
+                'cells' (the default) or 'quality' (see evaluators.py).
+                Only 'cells' runs on the JIT kernel and batched leaves
+            cancel: Checked between placements like the deadline; once it
+                returns True the search stops with the solutions found so
+                far and stats['cancelled'] is True (bitboard search only)
+            on_progress: Called with (first-level placements searched,
+                total) as the search advances (bitboard search only)
             
         Returns:
             List of top solutions, each containing placement info and score
         """
+        started = time.perf_counter()
+        tables_before = len(self.placement_tables)
+        prepared = self.prepare_blocks(blocks)
+        
+        # If any block is empty, return empty solution
+        if prepared is None:
+            if stats is not None:
+                stats['feasible'] = False
+            return []
+        
+        prepared_at = time.perf_counter()
+        top = TopK(top_k)
+        leaf_evaluator = self.evaluator(evaluator)
+        anytime = (time_budget_ms is not None or on_improve is not None
+                   or cancel is not None or on_progress is not None)
+        # When the blocks cannot all be placed there are no solutions, and
+        # the feasibility check proves that much faster than the full search
+        feasible = find_sequence(board_to_bits(initial_board, self.board_size),
+                                 [table for _, table in prepared], self.all_line_masks, stats) is not None
+        if stats is not None:
+            stats['feasible'] = feasible
+        if feasible:
+            if self.engine == 'jit' and len(prepared) == 3 and not anytime and leaf_evaluator.counts_only:
+                self._search_jit(initial_board, prepared, top, stats)
+            elif self.engine in ('bitboard', 'jit'):
+                deadline = None
+                if time_budget_ms is not None:
+                    deadline = time.monotonic() + time_budget_ms / 1000.0
+                progress = None
+                if on_improve is not None:
+                    progress = lambda current: on_improve(self.build_solutions(initial_board, prepared, current))
+                self._search_bitboard(initial_board, prepared, top, stats, prune, deadline, progress,
+                                      leaf_evaluator, cancel, on_progress)
+            else:
+                self._search_numpy(initial_board, blocks, prepared, top, leaf_evaluator)
+        
+        searched_at = time.perf_counter()
+        solutions = self.build_solutions(initial_board, prepared, top)
+        if stats is not None:
+            stats['tables_built'] = len(self.placement_tables) - tables_before
+            stats['phase_ms'] = {
+                'prepare': round((prepared_at - started) * 1000.0, 3),
+                'search': round((searched_at - prepared_at) * 1000.0, 3),
+                'build': round((time.perf_counter() - searched_at) * 1000.0, 3),
+            }
+        return solutions
+    
+    def find_sequence(self, initial_board: List[List[int]], blocks: List[List[List[int]]],
+                      stats: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Placements of the first sequence found that places every block, in
+        play order, or None if no ordering fits them all. Stops at the first
+        complete sequence; see feasibility.py.
+        """
+        prepared = self.prepare_blocks(blocks)
+        if prepared is None:
+            return None
+        sequence = find_sequence(board_to_bits(initial_board, self.board_size),
+                                 [table for _, table in prepared], self.all_line_masks, stats)
+        if sequence is None:
+            return None
+        placements = []
+        for block_index, index in sequence:
+            offset, table = prepared[block_index]
+            top_left_row, top_left_col = self.canvas_top_left(offset, table, index)
+            placements.append({'block_index': block_index, 'top_left_row': int(top_left_row),
+                               'top_left_col': int(top_left_col)})
+        return placements
+    
+    def best_partial(self, initial_board: List[List[int]], blocks: List[List[List[int]]],
+                     top_k: int = DEFAULT_TOP_K, evaluator: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Best sequences that place as many of the blocks as possible, for
+        positions where not all of them fit. Every subset of the largest
+        placeable size is searched like a full solve; the solutions of all
+        subsets are merged by score. Each solution lists the blocks it
+        leaves out in 'unplaced'.
+        """
+        prepared = self.prepare_blocks(blocks)
+        if prepared is None:
+            return []
+        board = board_to_bits(initial_board, self.board_size)
+        leaf_evaluator = self.evaluator(evaluator)
+        
+        for size in range(len(prepared) - 1, 0, -1):
+            solutions = []
+            searched = set()
+            for subset in combinations(range(len(prepared)), size):
+                # Subsets with the same shapes give the same sequences
+                shapes = tuple(sorted(prepared[i][1].cells for i in subset))
+                if shapes in searched:
+                    continue
+                searched.add(shapes)
+                
+                subset_prepared = [prepared[i] for i in subset]
+                top = TopK(top_k)
+                search = BitboardSearch(self, subset_prepared, top_k, kernel=self.leaf_kernel,
+                                        evaluator=leaf_evaluator)
+                search.run(board, top)
+                for solution in self.build_solutions(initial_board, subset_prepared, top):
+                    solution['block_order'] = [subset[i] for i in solution['block_order']]
+                    for placement in solution['placements']:
+                        placement['block_index'] = subset[placement['block_index']]
+                    solution['unplaced'] = [i for i in range(len(prepared)) if i not in subset]
+                    solutions.append(solution)
+            if solutions:
+                # Stable sort keeps each subset's own tie order
+                solutions.sort(key=lambda solution: -solution['score'])
+                return solutions[:top_k]
+        return []
+    
+    def build_solutions(self, initial_board: List[List[int]], 
+                        prepared: List[Tuple[Tuple[int, int], PlacementTable]],
+                        top: TopK) -> List[Dict[str, Any]]:
+        """
+        Expand the kept (score, rank) leaves into solution dicts, best first.
+        Each winner is replayed on a bitboard to recover its final board and
+        line count, so nothing but the rank is stored during the search.
+        """
+        board = board_to_bits(initial_board, self.board_size)
+        orders = list(permutations(range(len(prepared))))
+        
+        solutions = []
+        for score, rank in top.results():
+            order_index, indices = decode_rank(rank, len(prepared), self.rank_base)
+            perm = orders[order_index]
+            
+            current = board
+            total_lines_cleared = 0
+            placements = []
+            for block_index, index in zip(perm, indices):
+                offset, table = prepared[block_index]
+                current, lines = clear_lines(current | table.masks[index], self.all_line_masks)
+                total_lines_cleared += lines
+                top_left_row, top_left_col = self.canvas_top_left(offset, table, index)
+                placements.append({'block_index': int(block_index), 'top_left_row': int(top_left_row),
+                                   'top_left_col': int(top_left_col)})
+            
+            solutions.append({
+                'block_order': list(perm),
+                'placements': placements,
+                'final_board': bits_to_board(current, self.board_size),
+                'lines_cleared': int(total_lines_cleared),
+                'score': int(score)
+            })
+        return solutions
+    
+    def _search_numpy(self, initial_board: List[List[int]], blocks: List[List[List[int]]],
+                      prepared: List[Tuple[Tuple[int, int], PlacementTable]], top: TopK,
+                      evaluator=None) -> None:
+        """
+        Reference search on numpy boards, one cell at a time.
+        Candidate positions come from the placement tables, so only offsets
+        that keep the block on the board are tried. Final boards are valued
+        from scratch by evaluator unless it only counts cells.
+        """
         # Convert to numpy arrays for easier manipulation
         board = np.array(initial_board, dtype=int)
         
         # Extract coordinates for each block
         block_coords_list = [self.extract_block_coordinates(block) for block in blocks]
         
-        # If any block is empty, return empty solution
-        if any(len(coords) == 0 for coords in block_coords_list):
-            return []
+        # Canvas top-left positions for every in-bounds placement of each block
+        positions_list = [[self.canvas_top_left(offset, table, index) for index in range(len(table))]
+                          for offset, table in prepared]
+        base = self.rank_base
         
-        solutions = []
+        def place_rest(current: np.ndarray, block_order: List[List[Tuple[int, int]]],
+                       positions: List[List[Tuple[int, int]]], lines_so_far: int,
+                       order_index: int, indices: List[int]) -> None:
+            # Try all possible positions for the next block, then recurse
+            level = len(indices)
+            for index, (top_left_row, top_left_col) in enumerate(positions[level]):
+                if not self.can_place_block(current, block_order[level], top_left_row, top_left_col):
+                    continue
+                
+                next_board = self.place_block(current, block_order[level], top_left_row, top_left_col)
+                next_board, lines_cleared = self.clear_complete_lines(next_board)
+                
+                if level + 1 < len(block_order):
+                    place_rest(next_board, block_order, positions, lines_so_far + lines_cleared,
+                               order_index, indices + [index])
+                else:
+                    if evaluator is None or evaluator.counts_only:
+                        score = self.calculate_score(board, next_board, lines_so_far + lines_cleared)
+                    else:
+                        score = (self.score_from_counts(np.sum(board), 0, lines_so_far + lines_cleared)
+                                 + evaluator.value(board_to_bits(next_board, self.board_size)))
+                    top.push(int(score), encode_rank(order_index, indices + [index], base))
         
-        # Try all permutations of the three blocks
-        for perm in permutations(range(3)):
+        # Try all permutations of the blocks
+        for order_index, perm in enumerate(permutations(range(len(blocks)))):
             block_order = [block_coords_list[i] for i in perm]
-            
-            # Try all possible positions for the first block
-            for top_left_row in range(-4, self.board_size - 4):  # Try negative coordinates too
-                for top_left_col in range(-4, self.board_size - 4):  # Try negative coordinates too
-                    if not self.can_place_block(board, block_order[0], top_left_row, top_left_col):
-                        continue
-                    
-                    # Place first block
-                    board_after_first = self.place_block(board, block_order[0], top_left_row, top_left_col)
-                    board_after_first, lines_cleared_first = self.clear_complete_lines(board_after_first)
-                    
-                    # Try all possible positions for the second block
-                    for top_left_row2 in range(-4, self.board_size - 4):
-                        for top_left_col2 in range(-4, self.board_size - 4):
-                            if not self.can_place_block(board_after_first, block_order[1], top_left_row2, top_left_col2):
-                                continue
-                            
-                            # Place second block
-                            board_after_second = self.place_block(board_after_first, block_order[1], top_left_row2, top_left_col2)
-                            board_after_second, lines_cleared_second = self.clear_complete_lines(board_after_second)
-                            
-                            # Try all possible positions for the third block
-                            for top_left_row3 in range(-4, self.board_size - 4):
-                                for top_left_col3 in range(-4, self.board_size - 4):
-                                    if not self.can_place_block(board_after_second, block_order[2], top_left_row3, top_left_col3):
-                                        continue
-                                    
-                                    # Place third block
-                                    board_after_third = self.place_block(board_after_second, block_order[2], top_left_row3, top_left_col3)
-                                    board_after_third, lines_cleared_third = self.clear_complete_lines(board_after_third)
-                                    
-                                    # Calculate total score
-                                    total_lines_cleared = lines_cleared_first + lines_cleared_second + lines_cleared_third
-                                    score = self.calculate_score(board, board_after_third, total_lines_cleared)
-                                    
-                                    # Store solution
-                                    solution = {
-                                        'block_order': list(perm),
-                                        'placements': [
-                                            {'block_index': int(perm[0]), 'top_left_row': int(top_left_row), 'top_left_col': int(top_left_col)},
-                                            {'block_index': int(perm[1]), 'top_left_row': int(top_left_row2), 'top_left_col': int(top_left_col2)},
-                                            {'block_index': int(perm[2]), 'top_left_row': int(top_left_row3), 'top_left_col': int(top_left_col3)}
-                                        ],
-                                        'final_board': board_after_third.tolist(),
-                                        'lines_cleared': int(total_lines_cleared),
-                                        'score': int(score)
-                                    }
-                                    solutions.append(solution)
-        
-        # Sort solutions by score (descending) and return top 3
-        solutions.sort(key=lambda x: x['score'], reverse=True)
-        return solutions[:3]
+            positions = [positions_list[i] for i in perm]
+            place_rest(board, block_order, positions, 0, order_index, [])
+    
+    def _search_bitboard(self, initial_board: List[List[int]], 
+                         prepared: List[Tuple[Tuple[int, int], PlacementTable]], top: TopK,
+                         stats: Optional[Dict[str, Any]] = None, prune: bool = True,
+                         deadline: Optional[float] = None,
+                         on_improve: Optional[Callable[[TopK], None]] = None, evaluator=None,
+                         cancel: Optional[Callable[[], bool]] = None,
+                         on_progress: Optional[Callable[[int, int], None]] = None) -> None:
+        """
+        Same search as _search_numpy on an integer bitboard, with identical
+        shapes searched once, a transposition table over intermediate
+        positions, optional branch-and-bound pruning and an optional
+        deadline or cancel check. See search.py.
+        """
+        search = BitboardSearch(self, prepared, top.k, prune=prune, kernel=self.leaf_kernel,
+                                deadline=deadline, evaluator=evaluator, cancel=cancel)
+        search.run(board_to_bits(initial_board, self.board_size), top, on_improve=on_improve,
+                   on_progress=on_progress)
+        if stats is not None:
+            stats.update(search.stats())
+    
+    def _search_jit(self, initial_board: List[List[int]], 
+                    prepared: List[Tuple[Tuple[int, int], PlacementTable]], top: TopK,
+                    stats: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Same search as _search_numpy, compiled with Numba. See jit.py.
+        """
+        leaves, nodes = self.jit_kernel.search(board_to_bits(initial_board, self.board_size),
+                                               [table for _, table in prepared], top.k, stats)
+        for score, rank in leaves:
+            top.push(score, rank)
+        if stats is not None:
+            stats['nodes'] = nodes
     
     def apply_solution(self, initial_board: List[List[int]], 
                       blocks: List[List[List[int]]], 
@@ -210,10 +489,10 @@ class BlockBlastSolver:
         
         for placement in solution['placements']:
             block_index = placement['block_index']
-            center_row = placement['center_row']
-            center_col = placement['center_col']
+            top_left_row = placement['top_left_row']
+            top_left_col = placement['top_left_col']
             
-            board = self.place_block(board, block_coords_list[block_index], center_row, center_col)
+            board = self.place_block(board, block_coords_list[block_index], top_left_row, top_left_col)
             board, _ = self.clear_complete_lines(board)
         
         return board.tolist()
@@ -0,0 +1,192 @@
+"""
+Persistent on-disk store of solved positions.
+
+A single SQLite file holding the canonical solutions of ResultCache keys,
+so solved positions survive restarts. ResultCache consults the store on
+a memory miss and writes complete results through to it.
+
+Run as a script to pre-populate a store offline:
+
+    python store.py solutions.db                    # empty board, every standard triple
+    python store.py solutions.db --corpus positions.jsonl --top-k 10
+
+A corpus file has one {"board": [...], "blocks": [...]} object per line.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+from itertools import combinations_with_replacement
+from typing import Dict, List, Tuple, Any, Optional, Iterator
+
+from bitboard import Shape
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solutions (
+    board_size INTEGER NOT NULL,
+    board TEXT NOT NULL,
+    shapes TEXT NOT NULL,
+    top_k INTEGER NOT NULL,
+    solutions TEXT NOT NULL,
+    PRIMARY KEY (board_size, board, shapes)
+)
+"""
+
+
+def encode_key(key: Tuple[int, Tuple[Shape, ...]]) -> Tuple[str, str]:
+    """
+    Text form of a canonical key: the board as hex and the shapes as
+    'r,c;r,c|...'.
+    """
+    board, shapes = key
+    return format(board, 'x'), '|'.join(';'.join(f'{row},{col}' for row, col in shape) for shape in shapes)
+
+
+class SolutionStore:
+    """
+    SQLite table of (canonical key) -> (top_k, canonical solutions).
+    One connection is shared behind a lock, so it is safe to use from
+    several request threads.
+    """
+
+    def __init__(self, path: str, board_size: int = 8):
+        self.path = path
+        self.board_size = board_size
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def get(self, key) -> Optional[Tuple[int, List[Dict[str, Any]]]]:
+        board, shapes = encode_key(key)
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT top_k, solutions FROM solutions WHERE board_size = ? AND board = ? AND shapes = ?',
+                (self.board_size, board, shapes)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0], json.loads(row[1])
+
+    def put(self, key, top_k: int, solutions: List[Dict[str, Any]]) -> None:
+        """
+        Store solutions unless an entry with at least this top_k exists.
+        """
+        board, shapes = encode_key(key)
+        with self.lock:
+            self.connection.execute(
+                'INSERT INTO solutions (board_size, board, shapes, top_k, solutions) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (board_size, board, shapes) DO UPDATE SET '
+                'top_k = excluded.top_k, solutions = excluded.solutions WHERE excluded.top_k > top_k',
+                (self.board_size, board, shapes, top_k, json.dumps(solutions, separators=(',', ':'))))
+            self.connection.commit()
+            self.writes += 1
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.connection.execute('SELECT COUNT(*) FROM solutions WHERE board_size = ?',
+                                           (self.board_size,)).fetchone()[0]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'path': self.path,
+            'entries': len(self),
+            'hits': self.hits,
+            'misses': self.misses,
+            'writes': self.writes,
+        }
+
+
+def standard_openings(board_size: int = 8) -> Iterator[Tuple[List[List[int]], List[List[List[int]]]]]:
+    """
+    The empty board with every multiset of three standard pieces.
+    """
+    from pieces import STANDARD_PIECES, to_grid
+
+    empty = [[0] * board_size for _ in range(board_size)]
+    for names in combinations_with_replacement(sorted(STANDARD_PIECES), 3):
+        yield empty, [to_grid(STANDARD_PIECES[name]) for name in names]
+
+
+def read_corpus(path: str) -> Iterator[Tuple[List[List[int]], List[List[List[int]]]]]:
+    with open(path) as corpus:
+        for line in corpus:
+            if line.strip():
+                position = json.loads(line)
+                yield position['board'], position['blocks']
+
+
+def prepopulate(path: str, positions, top_k: int, workers: Optional[int] = None,
+                limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Solve every position not already in the store at path and write the
+    results through. Equivalent positions (up to symmetry and block order)
+    are solved once.
+    """
+    from cache import ResultCache
+    from parallel import SolverPool
+    from solver import BlockBlastSolver
+
+    solver = BlockBlastSolver()
+    store = SolutionStore(path, solver.board_size)
+    # No memory entries: every lookup goes straight to the store
+    cache = ResultCache(solver, max_entries=0, store=store)
+    pool = SolverPool(solver, workers=workers)
+
+    seen = set()
+    counts = {'positions': 0, 'solved': 0, 'skipped': 0}
+    try:
+        for board, blocks in positions:
+            if limit is not None and counts['solved'] >= limit:
+                break
+            counts['positions'] += 1
+            canonical = cache.canonicalize(board, blocks)
+            if canonical is None or canonical.key in seen:
+                counts['skipped'] += 1
+                continue
+            seen.add(canonical.key)
+
+            stats = {}
+            cache.solve_iteration(board, blocks, top_k, pool.solve_iteration, stats=stats)
+            if stats['cached']:
+                counts['skipped'] += 1
+            else:
+                counts['solved'] += 1
+    finally:
+        pool.shutdown()
+        store.close()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Pre-populate a Block Blast solution store.')
+    parser.add_argument('path', help='SQLite file to create or extend')
+    parser.add_argument('--corpus', help='JSON lines of {"board", "blocks"}; default: empty board openings')
+    parser.add_argument('--top-k', type=int, default=10, help='solutions to keep per position')
+    parser.add_argument('--workers', type=int, default=None, help='solver processes, default every core')
+    parser.add_argument('--limit', type=int, default=None, help='stop after solving this many positions')
+    args = parser.parse_args(argv)
+
+    positions = read_corpus(args.corpus) if args.corpus else standard_openings()
+    started = time.perf_counter()
+    counts = prepopulate(args.path, positions, args.top_k, workers=args.workers, limit=args.limit)
+    print(f"Solved {counts['solved']} of {counts['positions']} positions "
+          f"({counts['skipped']} already stored or equivalent) in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
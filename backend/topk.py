@@ -0,0 +1,85 @@
+"""
+Bounded top-k collection of search leaves.
+
+The search never materializes solution dicts while it runs. Each complete
+placement sequence is reduced to a (score, rank) pair, where the rank
+packs the block ordering and the placement table indices into a single
+integer. Only the k best pairs are kept in a min-heap; solution dicts are
+built afterwards for the winners only.
+
+Ties on score go to the lower rank, which is the order the exhaustive
+search visits leaves in, so results match a stable sort of every leaf.
+"""
+
+import heapq
+from typing import List, Tuple, Sequence, Optional
+
+
+def encode_rank(order_index: int, indices: Sequence[int], base: int) -> int:
+    """
+    Pack an ordering index and per-level placement indices into one integer.
+    base must exceed every placement index (board_size ** 2 is enough).
+    """
+    rank = order_index
+    for index in indices:
+        rank = rank * base + index
+    return rank
+
+
+def decode_rank(rank: int, depth: int, base: int) -> Tuple[int, List[int]]:
+    """
+    Inverse of encode_rank. Returns (order_index, indices).
+    """
+    indices = []
+    for _ in range(depth):
+        rank, index = divmod(rank, base)
+        indices.append(index)
+    indices.reverse()
+    return rank, indices
+
+
+class TopK:
+    """
+    Keep the k best (score, rank) leaves: higher score first, lower rank on ties.
+    """
+
+    __slots__ = ('k', 'heap', 'changes')
+
+    def __init__(self, k: int):
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        self.k = k
+        # Min-heap of (score, -rank); heap[0] is the worst kept leaf
+        self.heap: List[Tuple[int, int]] = []
+        # Number of pushes that changed the kept set
+        self.changes = 0
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def push(self, score: int, rank: int) -> None:
+        entry = (score, -rank)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+            self.changes += 1
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+            self.changes += 1
+
+    def threshold(self) -> Optional[int]:
+        """
+        Score of the k-th best leaf, or None while fewer than k are kept.
+        """
+        if len(self.heap) < self.k:
+            return None
+        return self.heap[0][0]
+
+    def merge(self, other: 'TopK') -> None:
+        for score, neg_rank in other.heap:
+            self.push(score, -neg_rank)
+
+    def results(self) -> List[Tuple[int, int]]:
+        """
+        Kept leaves as (score, rank), best first.
+        """
+        return [(score, -neg_rank) for score, neg_rank in sorted(self.heap, reverse=True)]
@@ -29,6 +29,7 @@ export interface Solution {
 export interface SolverResponse {
   solutions: Solution[];
   totalSolutions: number;
+  complete?: boolean;
 }
 
 export interface GameState {
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+# Small pools so importing the app stays cheap
+os.environ.setdefault('SOLVER_WORKERS', '1')
+os.environ.setdefault('SOLVER_ENGINE', 'bitboard')
+
+import json
+import tempfile
+import app as api
+from profiling import Profiler
+from serving import SolveGate
+from jobs import JobManager
+
+EMPTY = [[0] * 8 for _ in range(8)]
+SINGLE = [[1]]
+
+
+def client():
+    api.result_cache.clear()
+    return api.app.test_client()
+
+
+def wide_block(width):
+    # A block wider than the game's 5x5 canvas, drawn on a board-sized one
+    block = [[0] * 8 for _ in range(8)]
+    block[0][:width] = [1] * width
+    return block
+
+
+def test_solve_blocks_wider_than_five_cells():
+    c = client()
+    payload = {'board': EMPTY, 'blocks': [wide_block(6), SINGLE, SINGLE]}
+    first = c.post('/api/solve', json=payload)
+    assert first.status_code == 200, first.get_json()
+    assert first.get_json()['solutions'] and not first.get_json()['cached']
+    # The cached copy is restored through the same canvas
+    again = c.post('/api/solve', json=payload)
+    assert again.get_json()['cached'] and again.get_json()['solutions'] == first.get_json()['solutions']
+
+    session = c.post('/api/sessions', json={}).get_json()['session_id']
+    deal = c.post(f'/api/sessions/{session}/deal', json={'blocks': [wide_block(7), SINGLE, SINGLE]})
+    assert deal.status_code == 200, deal.get_json()
+    assert deal.get_json()['total_solutions'] > 0
+
+
+def test_compact_blocks_wider_than_five_cells():
+    c = client()
+    for blocks in (['3f', '1', '1'], ['40201008040201', '1', '3']):
+        response = c.post('/api/solve', json={'board': '0', 'blocks': blocks, 'format': 'compact'})
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert body['total_solutions'] > 0
+        placements = body['solutions'][0]['placements']
+        assert sorted(block for block, _, _ in placements) == [0, 1, 2]
+
+
+def test_profiling_controls_need_the_admin_token():
+    c = client()
+    saved = api.profiler, api.ADMIN_TOKEN
+    with tempfile.TemporaryDirectory() as directory:
+        api.profiler = Profiler(directory)
+        try:
+            payload = {'board': EMPTY, 'blocks': [SINGLE, SINGLE, SINGLE]}
+            admin = {'Authorization': 'Bearer secret'}
+            for token in (None, 'secret'):
+                api.ADMIN_TOKEN = token
+                # Anyone may send the header; only an admin's is honored
+                response = c.post('/api/solve', json=payload, headers={'X-Solver-Profile': 'sample'})
+                assert response.status_code == 200 and 'X-Solver-Profile' not in response.headers
+                for headers in ({}, {'Authorization': 'Bearer wrong'}, {'Authorization': 'Bearer '}):
+                    assert c.put('/api/profiles/config', json={'sample_rate': 1.0},
+                                 headers=headers).status_code == 403
+                    assert c.get('/api/profiles', headers=headers).status_code == 403
+                assert api.profiler.sample_rate == 0.0
+
+            response = c.post('/api/solve', json=payload, headers=dict(admin, **{'X-Solver-Profile': 'sample'}))
+            assert response.status_code == 200
+            url = response.headers['X-Solver-Profile']
+            assert c.get(url).status_code == 403
+            assert c.get(url, headers=admin).status_code == 200
+            configured = c.put('/api/profiles/config', json={'sample_rate': 0.5}, headers=admin)
+            assert configured.status_code == 200 and configured.get_json()['sample_rate'] == 0.5
+            assert len(c.get('/api/profiles', headers=admin).get_json()['profiles']) == 1
+        finally:
+            api.profiler, api.ADMIN_TOKEN = saved
+
+
+def test_solve_batch_streams_results_and_item_errors():
+    c = client()
+    response = c.post('/api/solve-batch', json={'top_k': 2, 'items': [
+        {'id': 'ok', 'board': EMPTY, 'blocks': [SINGLE, SINGLE, SINGLE]},
+        {'id': 'small', 'board': [[0] * 7], 'blocks': [SINGLE, SINGLE, SINGLE]},
+        'not an object']})
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    lines = {line['id']: line for line in map(json.loads, response.get_data(as_text=True).splitlines())}
+    assert lines['ok']['total_solutions'] == 2 == len(lines['ok']['solutions'])
+    assert 'error' in lines['small'] and lines[2]['error'] == 'Item must be an object'
+
+    upload = json.dumps({'board': EMPTY, 'blocks': [SINGLE, SINGLE, SINGLE]}) + '\n{broken\n'
+    response = c.post('/api/solve-batch', data=upload, content_type='application/x-ndjson')
+    lines = {line['id']: line for line in map(json.loads, response.get_data(as_text=True).splitlines())}
+    assert lines[0]['total_solutions'] > 0 and lines[1]['error'].startswith('Invalid JSON')
+
+    assert c.post('/api/solve-batch', json={'board': EMPTY}).status_code == 400
+    too_many = {'items': [{}] * (api.MAX_BATCH_ITEMS + 1)}
+    assert c.post('/api/solve-batch', json=too_many).status_code == 400
+
+
+def test_full_gate_answers_429_with_retry_after():
+    c = client()
+    cached = {'board': EMPTY, 'blocks': [SINGLE, SINGLE, SINGLE]}
+    assert c.post('/api/solve', json=cached).status_code == 200
+    saved = api.solve_gate
+    api.solve_gate = SolveGate(max_concurrent=1, max_queue=0)
+    token = api.solve_gate.acquire()
+    try:
+        payload = {'board': EMPTY, 'blocks': [SINGLE, [[1, 1], [0, 0]], SINGLE]}
+        for route in ('/api/solve', '/api/solve-stream'):
+            response = c.post(route, json=payload)
+            assert response.status_code == 429
+            assert int(response.headers['Retry-After']) == response.get_json()['retry_after'] >= 1
+        # Cached answers need no slot
+        assert c.post('/api/solve', json=cached).status_code == 200
+        api.solve_gate.release(token)
+        token = None
+        assert c.post('/api/solve', json=payload).status_code == 200
+        assert api.solve_gate.stats()['rejected'] == 2
+    finally:
+        if token is not None:
+            api.solve_gate.release(token)
+        api.solve_gate = saved
+
+
+def test_session_lifecycle_and_errors():
+    c = client()
+    assert c.post('/api/sessions', json={'board': [[0] * 7]}).status_code == 400
+    created = c.post('/api/sessions', json={})
+    assert created.status_code == 201
+    state = created.get_json()
+    assert state['turn'] == 0 and state['board'] == EMPTY and state['pending_solutions'] is None
+    url = f"/api/sessions/{state['session_id']}"
+
+    assert c.post(f'{url}/accept', json={}).status_code == 409
+    assert c.post(f'{url}/deal', json={'pieces': ['no_such_piece']}).status_code == 400
+    assert c.post(f'{url}/deal', json={}).status_code == 400
+    deal = c.post(f'{url}/deal', json={'pieces': ['line5_h', 'line5_h', 'single'], 'top_k': 2})
+    assert deal.status_code == 200 and deal.get_json()['total_solutions'] == 2
+    assert c.get(url).get_json()['pending_solutions'] == 2
+
+    assert c.post(f'{url}/accept', json={'index': 'first'}).status_code == 400
+    assert c.post(f'{url}/accept', json={'index': 2}).status_code == 409
+    accepted = c.post(f'{url}/accept', json={'index': 0})
+    assert accepted.status_code == 200
+    played = accepted.get_json()
+    assert played['turn'] == 1 and played['pending_solutions'] is None
+    assert played['score'] == played['points'] == deal.get_json()['solutions'][0]['score']
+    assert c.get(url).get_json()['board'] == deal.get_json()['solutions'][0]['final_board']
+
+    assert c.delete(url).status_code == 204
+    for response in (c.get(url), c.delete(url), c.post(f'{url}/deal', json={'pieces': ['single']}),
+                     c.post(f'{url}/accept', json={})):
+        assert response.status_code == 404
+
+
+def test_feasible_and_partial_solutions():
+    c = client()
+    # One gap per row and column, so only the single fits at first, and
+    # the row and column it clears leave no room for a 3x3 square
+    board = [[int(row != col) for col in range(8)] for row in range(8)]
+    square = [[1] * 3 for _ in range(3)]
+    payload = {'board': board, 'blocks': [square, SINGLE, square]}
+
+    checked = c.post('/api/feasible', json=payload).get_json()
+    assert checked == {'feasible': False, 'placements': None, 'placeable': [False, True, False]}
+    checked = c.post('/api/feasible', json={'board': EMPTY, 'blocks': [square, SINGLE, square], 'format': 'compact'})
+    assert checked.get_json()['feasible'] and all(len(placement) == 3 for placement in checked.get_json()['placements'])
+    assert c.post('/api/feasible', json={'board': EMPTY}).status_code == 400
+    assert c.post('/api/feasible', data='not json', content_type='application/json').status_code == 400
+    # Unexpected failures still answer in JSON
+    api.solver.find_sequence = lambda *args: 1 / 0
+    try:
+        failed = c.post('/api/feasible', json=payload)
+    finally:
+        del api.solver.find_sequence
+    assert failed.status_code == 500 and failed.get_json()['error'] == 'division by zero'
+
+    first = c.post('/api/solve', json=payload).get_json()
+    assert first['solutions'] == [] and not first['cached']
+    partial = first['partial_solutions']
+    assert partial and all(solution['unplaced'] == [0, 2] for solution in partial)
+    assert [placement['block_index'] for placement in partial[0]['placements']] == [1]
+    # The cached empty result carries the same partials
+    again = c.post('/api/solve', json=payload).get_json()
+    assert again['cached'] and again['partial_solutions'] == partial
+    assert 'partial_solutions' not in c.post('/api/solve', json={'board': EMPTY, 'blocks': payload['blocks']}).get_json()
+
+
+def test_job_submit_poll_and_cancel():
+    c = client()
+    saved = api.job_manager
+    api.job_manager = JobManager(workers=1, max_queue=1)
+    try:
+        payload = {'board': EMPTY, 'blocks': [SINGLE, SINGLE, SINGLE], 'top_k': 2}
+        submitted = c.post('/api/jobs', json=payload)
+        assert submitted.status_code == 202
+        url = submitted.headers['Location']
+        assert url == f"/api/jobs/{submitted.get_json()['job_id']}"
+        done = c.get(f'{url}?wait=30').get_json()
+        assert done['status'] == 'done'
+        assert done['solutions'] == c.post('/api/solve', json=payload).get_json()['solutions']
+        assert c.delete(url).get_json()['status'] == 'done'
+
+        assert c.get(f'{url}?wait=soon').status_code == 400
+        for bad in ({}, dict(payload, lookahead={'depth': 1}), dict(payload, client_id='x' * 129),
+                    dict(payload, board=[[0] * 7])):
+            assert c.post('/api/jobs', json=bad).status_code == 400
+        for response in (c.get('/api/jobs/missing'), c.delete('/api/jobs/missing')):
+            assert response.status_code == 404
+
+        # With the worker held back, jobs wait in the one-place queue
+        api.job_manager.free_slots.clear()
+        first = c.post('/api/jobs', json=dict(payload, client_id='tab')).get_json()
+        second = c.post('/api/jobs', json=dict(payload, client_id='tab')).get_json()
+        replaced = c.get(f"/api/jobs/{first['job_id']}").get_json()
+        assert replaced['status'] == 'cancelled' and replaced['reason'] == 'superseded'
+        full = c.post('/api/jobs', json=payload)
+        assert full.status_code == 429 and int(full.headers['Retry-After']) >= 1
+        cancelled = c.delete(f"/api/jobs/{second['job_id']}").get_json()
+        assert cancelled['status'] == 'cancelled' and cancelled['reason'] == 'cancelled'
+        assert c.post('/api/jobs', json=payload).status_code == 202
+    finally:
+        api.job_manager.shutdown()
+        api.job_manager = saved
+
+
+def test_malformed_boards_and_blocks_are_rejected():
+    c = client()
+    blocks = [SINGLE, SINGLE, SINGLE]
+    bad_payloads = [
+        {'board': EMPTY, 'blocks': [[1, 1], [[1]], [[1]]]},
+        {'board': EMPTY, 'blocks': [[None], [[1]], [[1]]]},
+        {'board': EMPTY, 'blocks': [[['x']], [[1]], [[1]]]},
+        {'board': EMPTY, 'blocks': [[[2]], [[1]], [[1]]]},
+        {'board': EMPTY, 'blocks': {'a': [[1]]}},
+        {'board': [None] * 8, 'blocks': blocks},
+        {'board': [0] * 8, 'blocks': blocks},
+        {'board': [['x'] * 8] + EMPTY[1:], 'blocks': blocks},
+        {'board': [[0.5] * 8] + EMPTY[1:], 'blocks': blocks},
+    ]
+    for payload in bad_payloads:
+        for route in ('/api/solve', '/api/feasible', '/api/jobs'):
+            response = c.post(route, json=payload)
+            assert response.status_code == 400, (route, payload, response.get_data(as_text=True))
+            assert 'error' in response.get_json()
+        lines = c.post('/api/solve-batch', json={'items': [payload]}).get_data(as_text=True).splitlines()
+        assert 'error' in json.loads(lines[0])
+
+
+if __name__ == "__main__":
+    test_solve_blocks_wider_than_five_cells()
+    test_compact_blocks_wider_than_five_cells()
+    test_profiling_controls_need_the_admin_token()
+    test_solve_batch_streams_results_and_item_errors()
+    test_full_gate_answers_429_with_retry_after()
+    test_session_lifecycle_and_errors()
+    test_feasible_and_partial_solutions()
+    test_job_submit_poll_and_cancel()
+    test_malformed_boards_and_blocks_are_rejected()
+    print("✅ API endpoints answer as documented")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import copy
+from benchmark import corpus, run, compare, pruning
+
+
+def test_corpus_is_fixed_and_covers_existing_scripts():
+    first = corpus()
+    assert first == corpus()
+    names = [name for name, _, _ in first]
+    assert len(names) == len(set(names))
+    for required in ('backend_case', 'identical_blocks', 'empty_singles', 'near_death_singles',
+                     'sparse_0', 'dense_0'):
+        assert required in names
+    for _, board, blocks in first:
+        assert len(board) == 8 and all(len(row) == 8 for row in board)
+        assert len(blocks) == 3 and all(len(block) == 5 and all(len(row) == 5 for row in block)
+                                        for block in blocks)
+
+
+def test_regression_gate_flags_slowdowns_and_changed_results():
+    baseline = run(repeats=1, only='backend_case')
+    result = baseline['cases']['backend_case']
+    assert result['nodes'] > 0 and result['nodes_per_sec'] > 0 and result['peak_kb'] > 0
+    assert compare(baseline, baseline) == []
+
+    slower = copy.deepcopy(baseline)
+    slower['cases']['backend_case']['p50_ms'] = result['p50_ms'] * 2 + 5
+    assert len(compare(baseline, slower)) == 1
+    # Within the threshold, or below the absolute floor, is noise
+    assert compare(baseline, slower, threshold=1000.0) == []
+    assert compare(baseline, slower, min_delta_ms=1000) == []
+
+    changed = copy.deepcopy(baseline)
+    changed['cases']['backend_case']['fingerprint'] = '0' * 16
+    assert compare(baseline, changed) == ['backend_case: results changed']
+
+
+def test_pruning_is_never_a_net_loss():
+    rows = {row['case']: row for row in pruning(repeats=5)}
+    assert all(row['same_results'] for row in rows.values())
+    # Three large blocks on an empty board cut few subtrees, which is where
+    # bounding used to cost more than it saved
+    large = rows['empty_large']
+    assert large['pruned_ms'] <= large['full_ms']
+    assert sum(row['pruned_ms'] for row in rows.values()) <= sum(row['full_ms'] for row in rows.values())
+
+
+if __name__ == "__main__":
+    test_corpus_is_fixed_and_covers_existing_scripts()
+    test_regression_gate_flags_slowdowns_and_changed_results()
+    test_pruning_is_never_a_net_loss()
+    print("✅ Benchmark corpus and regression gate work")
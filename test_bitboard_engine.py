@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import random
+import time
+import pytest
+import jit
+from solver import BlockBlastSolver
+from parallel import SolverPool
+from lookahead import LookaheadPlanner
+from pieces import STANDARD_PIECES, to_grid
+
+# 4x6 rectangle in the middle, same board as test_backend_case.py
+RECTANGLE_BOARD = [
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 1, 1, 1, 1, 1, 1, 0],
+    [0, 1, 1, 1, 1, 1, 1, 0],
+    [0, 1, 1, 1, 1, 1, 1, 0],
+    [0, 1, 1, 1, 1, 1, 1, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 0, 0, 0, 0, 0, 0]
+]
+
+SQUARE = [[1, 1, 1, 0, 0], [1, 1, 1, 0, 0], [1, 1, 1, 0, 0], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]]
+LEFT_LINE = [[1, 0, 0, 0, 0], [1, 0, 0, 0, 0], [1, 0, 0, 0, 0], [1, 0, 0, 0, 0], [0, 0, 0, 0, 0]]
+RIGHT_LINE = [[0, 0, 0, 0, 1], [0, 0, 0, 0, 1], [0, 0, 0, 0, 1], [0, 0, 0, 0, 1], [0, 0, 0, 0, 0]]
+
+
+def random_block(rng):
+    """A random connected-ish shape of 1-5 cells drawn somewhere on the canvas."""
+    block = [[0] * 5 for _ in range(5)]
+    row, col = rng.randrange(5), rng.randrange(5)
+    for _ in range(rng.randint(1, 5)):
+        block[row][col] = 1
+        row = min(4, max(0, row + rng.choice((-1, 0, 1))))
+        col = min(4, max(0, col + rng.choice((-1, 0, 1))))
+    return block
+
+
+def random_dense_board(rng, fill=0.8):
+    return [[1 if rng.random() < fill else 0 for _ in range(8)] for _ in range(8)]
+
+
+def test_engines_agree_on_backend_case():
+    blocks = [SQUARE, LEFT_LINE, RIGHT_LINE]
+    numpy_solutions = BlockBlastSolver(engine='numpy').solve_iteration(RECTANGLE_BOARD, blocks)
+    bitboard_solutions = BlockBlastSolver(engine='bitboard').solve_iteration(RECTANGLE_BOARD, blocks)
+
+    assert bitboard_solutions == numpy_solutions
+    assert bitboard_solutions[0]['lines_cleared'] >= 4
+
+
+def test_engines_agree_on_random_dense_boards():
+    rng = random.Random(1234)
+    numpy_solver = BlockBlastSolver(engine='numpy')
+    bitboard_solver = BlockBlastSolver(engine='bitboard')
+
+    for _ in range(10):
+        board = random_dense_board(rng)
+        blocks = [random_block(rng) for _ in range(3)]
+        assert bitboard_solver.solve_iteration(board, blocks) == numpy_solver.solve_iteration(board, blocks)
+
+
+def test_preexisting_full_line_is_cleared_by_first_placement():
+    # Row 0 is already complete and the only free cells form a 3x3 hole
+    board = [[1] * 8 for _ in range(8)]
+    for row in range(5, 8):
+        board[row][5:8] = [0, 0, 0]
+    blocks = [SQUARE, SQUARE, SQUARE]
+
+    numpy_solutions = BlockBlastSolver(engine='numpy').solve_iteration(board, blocks)
+    bitboard_solutions = BlockBlastSolver(engine='bitboard').solve_iteration(board, blocks)
+    assert bitboard_solutions == numpy_solutions
+
+
+def test_placements_reach_bottom_right_corner():
+    # Only the bottom-right cell is free; a block drawn at the canvas origin
+    # could never reach it with the old -4..3 offset range
+    board = [[1] * 8 for _ in range(8)]
+    board[7][7] = 0
+    single = [[1, 0, 0, 0, 0]] + [[0] * 5 for _ in range(4)]
+    blocks = [single, single, single]
+
+    solver = BlockBlastSolver()
+    offset, table = solver.prepare_blocks([single])[0]
+    assert len(table) == 64
+    assert solver.canvas_top_left(offset, table, len(table) - 1) == (7, 7)
+
+    solutions = solver.solve_iteration(board, blocks)
+    assert solutions and solutions[0]['placements'][0]['top_left_row'] == 7
+
+
+def test_placement_tables_are_shared_across_requests():
+    solver = BlockBlastSolver()
+    solver.solve_iteration(RECTANGLE_BOARD, [SQUARE, LEFT_LINE, RIGHT_LINE])
+    # Both vertical lines normalize to the same shape
+    assert len(solver.placement_tables) == 2
+    table = solver.placement_tables[((0, 0), (1, 0), (2, 0), (3, 0))]
+    solver.solve_iteration(RECTANGLE_BOARD, [LEFT_LINE, SQUARE, RIGHT_LINE])
+    assert solver.placement_tables[((0, 0), (1, 0), (2, 0), (3, 0))] is table
+
+
+def test_top_k_is_configurable_and_stable():
+    solver = BlockBlastSolver()
+    blocks = [SQUARE, LEFT_LINE, RIGHT_LINE]
+    top_three = solver.solve_iteration(RECTANGLE_BOARD, blocks)
+    top_ten = solver.solve_iteration(RECTANGLE_BOARD, blocks, top_k=10)
+
+    assert len(top_ten) == 10
+    assert top_ten[:3] == top_three
+    scores = [solution['score'] for solution in top_ten]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_identical_blocks_match_reference_and_report_savings():
+    rng = random.Random(7)
+    numpy_solver = BlockBlastSolver(engine='numpy')
+    bitboard_solver = BlockBlastSolver(engine='bitboard')
+
+    searched = 0
+    while searched < 3:
+        board = random_dense_board(rng)
+        shape = random_block(rng)
+        blocks = [shape, random_block(rng), shape]
+        stats = {}
+        solutions = bitboard_solver.solve_iteration(board, blocks, top_k=6, stats=stats)
+        assert solutions == numpy_solver.solve_iteration(board, blocks, top_k=6)
+        # Infeasible positions skip the search, so there is nothing to count
+        if stats['feasible']:
+            assert stats['duplicate_orders'] >= 3
+            searched += 1
+
+    # Pruning cuts most of the empty board's search before states repeat
+    stats = {}
+    empty = [[0] * 8 for _ in range(8)]
+    bitboard_solver.solve_iteration(empty, [SQUARE, LEFT_LINE, RIGHT_LINE], stats=stats, prune=False)
+    assert stats['table_hits'] > 0
+    assert stats['nodes_saved'] > 0
+
+
+def test_pruning_keeps_exact_top_k():
+    rng = random.Random(5)
+    solver = BlockBlastSolver()
+
+    for _ in range(10):
+        board = random_dense_board(rng, fill=0.3)
+        blocks = [random_block(rng) for _ in range(3)]
+        for top_k in (1, 3, 7):
+            assert (solver.solve_iteration(board, blocks, top_k=top_k, prune=True)
+                    == solver.solve_iteration(board, blocks, top_k=top_k, prune=False))
+
+    stats = {}
+    empty = [[0] * 8 for _ in range(8)]
+    solver.solve_iteration(empty, [SQUARE, LEFT_LINE, RIGHT_LINE], stats=stats)
+    assert stats['pruned'] > 0
+
+
+def test_parallel_pool_matches_serial_solve():
+    solver = BlockBlastSolver()
+    pool = SolverPool(solver, workers=2, min_parallel_leaves=0)
+    try:
+        empty = [[0] * 8 for _ in range(8)]
+        blocks = [SQUARE, LEFT_LINE, RIGHT_LINE]
+        stats = {}
+        assert pool.solve_iteration(empty, blocks, top_k=5, stats=stats) == solver.solve_iteration(empty, blocks, top_k=5)
+        assert stats['parallel_chunks'] > 1
+        assert pool.solve_iteration(RECTANGLE_BOARD, blocks) == solver.solve_iteration(RECTANGLE_BOARD, blocks)
+    finally:
+        pool.shutdown()
+
+
+def test_pool_solves_batches_in_completion_order():
+    rng = random.Random(13)
+    solver = BlockBlastSolver()
+    items = [(random_dense_board(rng), [random_block(rng) for _ in range(3)], 2) for _ in range(12)]
+    # An empty blocks list fails inside the worker
+    items[4] = (items[4][0], None, 2)
+    expected = {}
+    for position, (board, blocks, top_k) in enumerate(items):
+        if blocks is not None:
+            expected[position] = solver.solve_iteration(board, blocks, top_k=top_k)
+
+    for workers in (1, 2):
+        pool = SolverPool(solver, workers=workers)
+        try:
+            results = {position: (solutions, error) for position, solutions, error in pool.solve_many(items)}
+        finally:
+            pool.shutdown()
+        assert sorted(results) == list(range(len(items)))
+        assert results[4][0] is None and results[4][1]
+        assert {position: solutions for position, (solutions, _) in results.items() if position != 4} == expected
+
+
+def test_batched_leaves_match_scalar_path():
+    rng = random.Random(2024)
+    batched = BlockBlastSolver(batch_leaves=True)
+    scalar = BlockBlastSolver(batch_leaves=False)
+    assert batched.leaf_kernel is not None and scalar.leaf_kernel is None
+
+    for fill in (0.2, 0.4, 0.6):
+        for _ in range(3):
+            board = random_dense_board(rng, fill=fill)
+            blocks = [random_block(rng) for _ in range(3)]
+            for prune in (True, False):
+                assert (batched.solve_iteration(board, blocks, top_k=4, prune=prune)
+                        == scalar.solve_iteration(board, blocks, top_k=4, prune=prune))
+
+
+def test_jit_engine_falls_back_without_numba():
+    available = jit.available
+    jit.available = lambda: False
+    try:
+        solver = BlockBlastSolver(engine='jit')
+    finally:
+        jit.available = available
+    assert solver.engine == 'bitboard' and solver.jit_kernel is None
+    # Boards over 64 cells do not fit the kernel's bitboards either
+    assert BlockBlastSolver(board_size=10, engine='jit').engine == 'bitboard'
+
+
+def test_jit_engine_matches_bitboard_engine():
+    pytest.importorskip('numba')
+    jit_solver = BlockBlastSolver(engine='jit')
+    assert jit_solver.jit_kernel is not None
+
+    rng = random.Random(3)
+    bitboard_solver = BlockBlastSolver()
+    for _ in range(10):
+        board = random_dense_board(rng, fill=rng.random() * 0.7)
+        blocks = [random_block(rng) for _ in range(3)]
+        assert (jit_solver.solve_iteration(board, blocks, top_k=4)
+                == bitboard_solver.solve_iteration(board, blocks, top_k=4))
+
+    # Large searches still go to the pool's workers
+    pool = SolverPool(jit_solver, workers=2, min_parallel_leaves=0)
+    try:
+        empty = [[0] * 8 for _ in range(8)]
+        stats = {}
+        assert (pool.solve_iteration(empty, [SQUARE, LEFT_LINE, RIGHT_LINE], stats=stats)
+                == bitboard_solver.solve_iteration(empty, [SQUARE, LEFT_LINE, RIGHT_LINE]))
+        assert stats['parallel_chunks'] > 1
+    finally:
+        pool.shutdown()
+
+
+def test_time_budget_returns_partial_results():
+    solver = BlockBlastSolver()
+    empty = [[0] * 8 for _ in range(8)]
+    single = [[1, 0, 0, 0, 0]] + [[0] * 5 for _ in range(4)]
+    domino = [[1, 1, 0, 0, 0]] + [[0] * 5 for _ in range(4)]
+    blocks = [domino, domino, single]
+
+    stats = {}
+    improvements = []
+    # Without pruning the search takes well over the budget
+    solutions = solver.solve_iteration(empty, blocks, stats=stats, time_budget_ms=5, prune=False,
+                                       on_improve=improvements.append)
+    assert stats['complete'] is False
+    assert improvements and improvements[-1] == solutions
+
+    stats = {}
+    assert solver.solve_iteration(empty, blocks, stats=stats, time_budget_ms=60000) == solver.solve_iteration(empty, blocks)
+    assert stats['complete'] is True
+
+
+def test_lookahead_is_seeded_and_reranks_candidates():
+    solver = BlockBlastSolver()
+    board = [[0] * 8 for _ in range(3)] + [[1, 1, 1, 1, 1, 0, 1, 1] for _ in range(5)]
+    single = [[1, 0, 0, 0, 0]] + [[0] * 5 for _ in range(4)]
+    square = [[1, 1, 0, 0, 0], [1, 1, 0, 0, 0]] + [[0] * 5 for _ in range(3)]
+    blocks = [square, single, single]
+
+    def plan(seed):
+        return LookaheadPlanner(solver, depth=2, samples=3, candidates=6, seed=seed).plan(board, blocks, 4)
+
+    solutions, stats = plan(7)
+    assert (solutions, stats) == plan(7)
+    assert stats['complete'] is True and stats['samples'] == 3
+    assert len(solutions) == 4
+    combined = [solution['lookahead']['combined_score'] for solution in solutions]
+    assert combined == sorted(combined, reverse=True)
+    assert all(0 <= solution['lookahead']['survival'] <= 1 for solution in solutions)
+
+    # A node budget stops the plan before the next search; the round it
+    # interrupts is dropped
+    _, one_round = LookaheadPlanner(solver, samples=1).plan(board, blocks, 4)
+    _, stats = LookaheadPlanner(solver, samples=3, node_budget=one_round['nodes']).plan(board, blocks, 4)
+    assert stats['samples'] == 1 and stats['complete'] is False
+    _, stats = LookaheadPlanner(solver, samples=3, node_budget=1).plan(board, blocks, 4)
+    assert stats['samples'] == 0 and stats['complete'] is False
+
+
+def test_lookahead_time_budget_bounds_wall_time():
+    solver = BlockBlastSolver()
+    board = [[0] * 8 for _ in range(8)]
+    blocks = [to_grid(STANDARD_PIECES[name]) for name in ('square2', 'l4_0', 'single')]
+    # At the API limits one sample round takes seconds
+    for budget_ms in (50, 200):
+        planner = LookaheadPlanner(solver, depth=3, samples=32, candidates=50, time_budget_ms=budget_ms)
+        started = time.monotonic()
+        solutions, stats = planner.plan(board, blocks, 50)
+        elapsed_ms = (time.monotonic() - started) * 1000.0
+        assert elapsed_ms < budget_ms + 100, elapsed_ms
+        assert stats['complete'] is False and stats['samples'] < 32
+        assert all(solution['lookahead']['survival'] is None for solution in solutions) == (stats['samples'] == 0)
+
+
+if __name__ == "__main__":
+    test_engines_agree_on_backend_case()
+    test_engines_agree_on_random_dense_boards()
+    test_preexisting_full_line_is_cleared_by_first_placement()
+    test_placements_reach_bottom_right_corner()
+    test_placement_tables_are_shared_across_requests()
+    test_top_k_is_configurable_and_stable()
+    test_identical_blocks_match_reference_and_report_savings()
+    test_pruning_keeps_exact_top_k()
+    test_parallel_pool_matches_serial_solve()
+    test_pool_solves_batches_in_completion_order()
+    test_batched_leaves_match_scalar_path()
+    test_jit_engine_falls_back_without_numba()
+    test_jit_engine_matches_bitboard_engine()
+    test_time_budget_returns_partial_results()
+    test_lookahead_is_seeded_and_reranks_candidates()
+    test_lookahead_time_budget_bounds_wall_time()
+    print("✅ Bitboard engine matches the numpy engine")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import random
+from solver import BlockBlastSolver
+from bitboard import board_to_bits, clear_lines, normalize_shape
+from cache import transform_cell
+from pieces import STANDARD_PIECES, to_grid
+
+
+def random_positions(count, fill, seed=0):
+    rng = random.Random(seed)
+    names = sorted(STANDARD_PIECES)
+    for _ in range(count):
+        board = [[int(rng.random() < fill) for _ in range(8)] for _ in range(8)]
+        yield board, [to_grid(STANDARD_PIECES[rng.choice(names)]) for _ in range(3)]
+
+
+def ranking(solutions):
+    return [(s['score'], [(p['block_index'], p['top_left_row'], p['top_left_col']) for p in s['placements']])
+            for s in solutions]
+
+
+def test_incremental_leaf_value_matches_scratch():
+    solver = BlockBlastSolver()
+    evaluator = solver.evaluator('quality')
+    checked = 0
+    for board, blocks in random_positions(40, 0.45, seed=1):
+        bits = board_to_bits(board, 8)
+        state = evaluator.prepare(bits)
+        _, cells = normalize_shape(solver.extract_block_coordinates(blocks[0]))
+        table = solver.placement_table(cells)
+        for _, mask, _ in table.entries:
+            if bits & mask:
+                continue
+            final, lines = clear_lines(bits | mask, solver.all_line_masks)
+            assert evaluator.leaf_value(state, final, mask, lines) == evaluator.value(final)
+            checked += 1
+    assert checked > 50
+
+
+def test_quality_engines_agree():
+    numpy_solver = BlockBlastSolver(engine='numpy')
+    solver = BlockBlastSolver()
+    for board, blocks in random_positions(10, 0.4, seed=2):
+        expected = ranking(numpy_solver.solve_iteration(board, blocks, top_k=5, evaluator='quality'))
+        assert ranking(solver.solve_iteration(board, blocks, top_k=5, evaluator='quality')) == expected
+        assert ranking(solver.solve_iteration(board, blocks, top_k=5, evaluator='quality',
+                                              prune=False)) == expected
+
+
+def test_quality_is_symmetric_and_penalizes():
+    solver = BlockBlastSolver()
+    evaluator = solver.evaluator('quality')
+    cells = solver.evaluator()
+    for board, _ in random_positions(20, 0.5, seed=3):
+        bits = board_to_bits(board, 8)
+        assert evaluator.value(bits) <= cells.value(bits)
+        for transform in range(8):
+            moved = [[0] * 8 for _ in range(8)]
+            for row in range(8):
+                for col in range(8):
+                    r, c = transform_cell(row, col, 8, transform)
+                    moved[r][c] = board[row][col]
+            assert evaluator.value(board_to_bits(moved, 8)) == evaluator.value(bits)
+
+    # A lone hole in a full corner is counted
+    board = [[1] * 8 for _ in range(8)]
+    board[0][0] = 0
+    assert evaluator.holes(board_to_bits(board, 8)) == 1
+
+
+def test_unknown_evaluator_is_rejected():
+    solver = BlockBlastSolver()
+    board = [[0] * 8 for _ in range(8)]
+    try:
+        solver.solve_iteration(board, [to_grid(STANDARD_PIECES['single'])], evaluator='nope')
+    except ValueError:
+        pass
+    else:
+        assert False, 'expected ValueError'
+
+
+if __name__ == "__main__":
+    test_incremental_leaf_value_matches_scratch()
+    test_quality_engines_agree()
+    test_quality_is_symmetric_and_penalizes()
+    test_unknown_evaluator_is_rejected()
+    print("✅ Evaluators agree across engines and update incrementally")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import random
+import numpy as np
+from solver import BlockBlastSolver
+from pieces import STANDARD_PIECES, to_grid
+
+
+def random_positions(count, fill, seed=0):
+    rng = random.Random(seed)
+    names = sorted(STANDARD_PIECES)
+    for _ in range(count):
+        board = [[int(rng.random() < fill) for _ in range(8)] for _ in range(8)]
+        yield board, [to_grid(STANDARD_PIECES[rng.choice(names)]) for _ in range(3)]
+
+
+def replay(solver, board, blocks, placements):
+    """Play placements with the reference numpy logic, checking each one fits."""
+    board = np.array(board, dtype=int)
+    for placement in placements:
+        coords = solver.extract_block_coordinates(blocks[placement['block_index']])
+        assert solver.can_place_block(board, coords, placement['top_left_row'], placement['top_left_col'])
+        board = solver.place_block(board, coords, placement['top_left_row'], placement['top_left_col'])
+        board, _ = solver.clear_complete_lines(board)
+    return board.tolist()
+
+
+def test_feasibility_matches_full_search():
+    solver = BlockBlastSolver()
+    infeasible = 0
+    for board, blocks in random_positions(150, 0.4):
+        stats = {}
+        solutions = solver.solve_iteration(board, blocks, top_k=1, stats=stats)
+        placements = solver.find_sequence(board, blocks)
+        assert (placements is not None) == bool(solutions) == stats['feasible']
+        if placements is None:
+            infeasible += 1
+        else:
+            assert sorted(p['block_index'] for p in placements) == [0, 1, 2]
+            replay(solver, board, blocks, placements)
+    assert infeasible > 0
+
+    # An empty block can never be placed either
+    stats = {}
+    empty_block = [[0] * 5 for _ in range(5)]
+    assert solver.solve_iteration(board, [empty_block, blocks[1], blocks[2]], stats=stats) == []
+    assert stats['feasible'] is False
+
+
+def test_best_partial_places_as_many_blocks_as_possible():
+    solver = BlockBlastSolver()
+    checked = 0
+    for board, blocks in random_positions(150, 0.5, seed=1):
+        if solver.find_sequence(board, blocks) is not None:
+            continue
+        partial = solver.best_partial(board, blocks, top_k=3)
+        placeable = [solver.find_sequence(board, [block]) is not None for block in blocks]
+        if not any(placeable):
+            assert partial == []
+            continue
+        checked += 1
+        placed = len(partial[0]['placements'])
+        assert all(len(solution['placements']) == placed for solution in partial)
+        assert [solution['score'] for solution in partial] == sorted((s['score'] for s in partial), reverse=True)
+        for solution in partial:
+            assert sorted(solution['block_order'] + solution['unplaced']) == [0, 1, 2]
+            assert replay(solver, board, blocks, solution['placements']) == solution['final_board']
+        # The best partial scores like a full solve of the blocks it places
+        best = partial[0]
+        subset = [blocks[i] for i in sorted(best['block_order'])]
+        assert solver.solve_iteration(board, subset, top_k=1)[0]['score'] == best['score']
+    assert checked > 0
+
+
+if __name__ == "__main__":
+    test_feasibility_matches_full_search()
+    test_best_partial_places_as_many_blocks_as_possible()
+    print("✅ Feasibility check and partial solutions work")
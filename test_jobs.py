@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import random
+import time
+from concurrent.futures import Future
+from jobs import JobManager, DONE, CANCELLED, RUNNING, FAILED, DEFAULT_WORKERS
+from solver import BlockBlastSolver
+from search import BitboardSearch
+from topk import TopK
+from bitboard import board_to_bits
+from pieces import STANDARD_PIECES, to_grid
+
+BLOCKS = [to_grid(STANDARD_PIECES[name]) for name in ('single', 'line2_h', 'corner3_0')]
+
+
+def slow_position():
+    # Searching four blocks on a sparse 12x12 board takes seconds
+    rng = random.Random(3)
+    board = [[int(rng.random() < 0.2) for _ in range(12)] for _ in range(12)]
+    blocks = [to_grid(STANDARD_PIECES[name]) for name in ('single', 'line2_h', 'corner3_0', 'square2')]
+    return board, blocks
+
+
+def test_cancel_check_stops_the_search():
+    solver = BlockBlastSolver()
+    board = [[0] * 8 for _ in range(8)]
+    prepared = solver.prepare_blocks(BLOCKS)
+    checks = []
+    reported = []
+
+    def cancel():
+        checks.append(1)
+        return len(checks) > 3
+
+    top = TopK(3)
+    search = BitboardSearch(solver, prepared, 3, prune=False, cancel=cancel)
+    search.run(board_to_bits(board, 8), top, on_progress=lambda done, total: reported.append((done, total)))
+    assert search.stats()['cancelled'] and not search.stats()['complete']
+    assert not search.transpositions or all(key[1] for key in search.transpositions)
+    done, total = reported[-1]
+    assert 0 < done < total and len(top) > 0
+
+    reported.clear()
+    stats = {}
+    solver.solve_iteration(board, BLOCKS, stats=stats, cancel=lambda: False,
+                           on_progress=lambda done, total: reported.append((done, total)))
+    assert stats['complete'] and not stats['cancelled']
+    assert reported[-1][0] == reported[-1][1] > 0
+
+
+def test_job_runs_to_the_serial_result():
+    solver = BlockBlastSolver()
+    board = [[0] * 8 for _ in range(8)]
+    board[0] = [1] * 7 + [0]
+    manager = JobManager(workers=1)
+    try:
+        job = manager.submit(board, BLOCKS, top_k=5)
+        assert manager.wait(job, 30).status == DONE
+        assert job.solutions == solver.solve_iteration(board, BLOCKS, top_k=5)
+        assert job.state()['progress']['done'] == job.state()['progress']['total'] > 0
+        assert manager.get(job.id) is job and manager.get('missing') is None
+    finally:
+        manager.shutdown()
+
+
+def test_superseded_and_cancelled_jobs_free_their_worker():
+    board, blocks = slow_position()
+    manager = JobManager(board_size=12, workers=1)
+    try:
+        first = manager.submit(board, blocks, client_id='tab-1')
+        queued = manager.submit(board, blocks)
+        # Replacing tab-1's job cancels it while it runs
+        second = manager.submit(board, blocks, client_id='tab-1')
+        assert first.status == CANCELLED and first.reason == 'superseded'
+
+        assert manager.cancel(queued.id).reason == 'cancelled'
+        started = time.monotonic()
+        manager.cancel(second.id)
+        small = manager.submit([[0] * 12 for _ in range(12)], [to_grid(STANDARD_PIECES['single'])])
+        assert manager.wait(small, 30).status == DONE
+        # The interrupted searches gave their worker back early
+        assert time.monotonic() - started < 3
+        assert manager.stats()['cancelled'] == {'cancelled': 2, 'superseded': 1, 'abandoned': 0}
+    finally:
+        manager.shutdown()
+
+
+def test_unpolled_jobs_are_abandoned():
+    board, blocks = slow_position()
+    manager = JobManager(board_size=12, workers=1, abandon_after=0.2)
+    try:
+        job = manager.submit(board, blocks)
+        assert job.finished.wait(5)
+        assert job.status == CANCELLED and job.reason == 'abandoned'
+    finally:
+        manager.shutdown()
+
+
+def test_jobs_cut_short_by_pool_shutdown_count_as_failed():
+    manager = JobManager()
+    assert manager.workers == DEFAULT_WORKERS
+    try:
+        # Hold the job back from the pool and finish it with a future that
+        # the pool cancelled, as shutting it down does to calls not yet sent
+        manager.free_slots.clear()
+        job = manager.submit([[0] * 8 for _ in range(8)], BLOCKS)
+        manager.queue.remove(job)
+        job.status, job.slot, job.started = RUNNING, 0, time.monotonic()
+        future = Future()
+        future.cancel()
+        manager._finished(job, future)
+        assert job.status == FAILED and job.error == 'Job pool shut down'
+        assert manager.stats()['failed'] == 1
+    finally:
+        manager.shutdown()
+
+
+if __name__ == "__main__":
+    test_cancel_check_stops_the_search()
+    test_job_runs_to_the_serial_result()
+    test_superseded_and_cancelled_jobs_free_their_worker()
+    test_unpolled_jobs_are_abandoned()
+    test_jobs_cut_short_by_pool_shutdown_count_as_failed()
+    print("✅ Solve jobs run, report progress and stop when cancelled")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import json
+import logging
+import jit
+import logs
+from solver import BlockBlastSolver
+from parallel import SolverPool
+from metrics import Metrics, PREFIX
+
+BOARD = [[0] * 8 for _ in range(4)] + [[1, 1, 1, 1, 1, 1, 1, 0] for _ in range(4)]
+SINGLE = [[1, 0, 0, 0, 0]] + [[0] * 5 for _ in range(4)]
+DOMINO = [[1, 1, 0, 0, 0]] + [[0] * 5 for _ in range(4)]
+
+
+def test_solve_stats_count_levels_and_phases():
+    engines = [BlockBlastSolver(batch_leaves=True), BlockBlastSolver(batch_leaves=False)]
+    if jit.available():
+        engines.append(BlockBlastSolver(engine='jit'))
+
+    for solver in engines:
+        stats = {}
+        solver.solve_iteration(BOARD, [SINGLE, DOMINO, DOMINO], stats=stats)
+        assert len(stats['level_nodes']) == 3
+        assert sum(stats['level_nodes']) == stats['nodes']
+        assert stats['leaves'] == stats['level_nodes'][-1] > 0
+        assert stats['rejected'] > 0 and stats['line_clears'] > 0
+        assert set(stats['phase_ms']) == {'prepare', 'search', 'build'}
+
+    # Without pruning or repeated states every leaf is scored exactly once,
+    # so both bitboard paths count the same work
+    counts = []
+    for batch_leaves in (True, False):
+        stats = {}
+        BlockBlastSolver(batch_leaves=batch_leaves).solve_iteration(BOARD, [SINGLE, DOMINO, DOMINO],
+                                                                    stats=stats, prune=False)
+        counts.append((stats['level_nodes'], stats['rejected'], stats['line_clears']))
+    assert counts[0] == counts[1]
+
+
+def test_parallel_stats_merge_counters():
+    solver = BlockBlastSolver()
+    pool = SolverPool(solver, workers=2, min_parallel_leaves=0)
+    try:
+        stats = {}
+        pool.solve_iteration(BOARD, [SINGLE, DOMINO, DOMINO], stats=stats)
+    finally:
+        pool.shutdown()
+    assert stats['complete'] is True
+    assert len(stats['level_nodes']) == 3 and sum(stats['level_nodes']) == stats['nodes']
+
+
+def test_metrics_render_prometheus_text():
+    metrics = Metrics()
+    stats = {}
+    BlockBlastSolver().solve_iteration(BOARD, [SINGLE, DOMINO, DOMINO], stats=stats)
+    metrics.record_solve(stats)
+    metrics.record_solve({'cached': True, 'complete': True})
+    metrics.record_request('solve', 200, 0.003)
+    metrics.record_request('solve', 429, 20.0)
+    metrics.gauge(f'{PREFIX}_solves_active', lambda: {(): 2}, text='Active solves')
+
+    text = metrics.render()
+    assert f'# TYPE {PREFIX}_request_duration_seconds histogram' in text
+    assert f'{PREFIX}_request_duration_seconds_bucket{{endpoint="solve",le="0.005"}} 1' in text
+    assert f'{PREFIX}_request_duration_seconds_bucket{{endpoint="solve",le="+Inf"}} 2' in text
+    assert f'{PREFIX}_requests_total{{endpoint="solve",status="429"}} 1' in text
+    assert f'{PREFIX}_search_nodes_total{{level="3"}} {stats["level_nodes"][2]}' in text
+    assert f'{PREFIX}_leaves_scored_total {stats["leaves"]}' in text
+    assert f'{PREFIX}_result_cache_total{{result="hit"}} 1' in text
+    assert f'{PREFIX}_solves_active 2' in text
+
+
+def test_logs_are_queued_json_lines():
+    class Collect(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.lines = []
+
+        def emit(self, record):
+            self.lines.append(self.format(record))
+
+    collect = Collect()
+    logger = logs.configure('INFO', handler=collect)
+    try:
+        logger.debug('request payload', extra={'board': [[0] * 8] * 8})
+        logger.info('solve', extra={'request_id': 'r1', 'board_hash': 'abc', 'duration_ms': 1.5, 'solutions': 3})
+    finally:
+        # Stopping the listener flushes the queue
+        logs.shutdown()
+
+    assert len(collect.lines) == 1
+    entry = json.loads(collect.lines[0])
+    assert entry['msg'] == 'solve' and entry['level'] == 'info'
+    assert entry['request_id'] == 'r1' and entry['solutions'] == 3 and 'board' not in entry
+
+
+if __name__ == "__main__":
+    test_solve_stats_count_levels_and_phases()
+    test_parallel_stats_merge_counters()
+    test_metrics_render_prometheus_text()
+    test_logs_are_queued_json_lines()
+    print("✅ Solve instrumentation and metrics export work")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import pstats
+import random
+import tempfile
+from profiling import Profiler
+from solver import BlockBlastSolver
+from pieces import STANDARD_PIECES, to_grid
+
+
+def slow_position():
+    rng = random.Random(7)
+    board = [[int(rng.random() < 0.4) for _ in range(8)] for _ in range(8)]
+    return board, [to_grid(STANDARD_PIECES[name]) for name in ('single', 'line2_h', 'corner3_0')]
+
+
+def test_sampled_profile_is_rooted_at_the_solve():
+    solver = BlockBlastSolver(engine='numpy')
+    board, blocks = slow_position()
+    switch_interval = sys.getswitchinterval()
+    with tempfile.TemporaryDirectory() as directory:
+        profiler = Profiler(directory, interval_ms=0.5)
+        solutions, name = profiler.run('sample', 'req-1', solver.solve_iteration, board, blocks)
+        assert solutions == solver.solve_iteration(board, blocks)
+        assert sys.getswitchinterval() == switch_interval
+
+        with open(profiler.path(name)) as f:
+            lines = f.read().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            assert stack.startswith('solver.py:solve_iteration') and int(count) > 0
+        assert any('solver.py:place_rest' in line for line in lines)
+
+        listed = profiler.profiles()
+        assert [profile['name'] for profile in listed] == [name]
+        assert listed[0]['samples'] == sum(int(line.rsplit(' ', 1)[1]) for line in lines)
+
+
+def test_cprofile_writes_pstats():
+    solver = BlockBlastSolver(engine='numpy')
+    board, blocks = slow_position()
+    with tempfile.TemporaryDirectory() as directory:
+        profiler = Profiler(directory)
+        _, name = profiler.run('cprofile', 'req-2', solver.solve_iteration, board, blocks)
+        assert name.endswith('.prof')
+        functions = {function for _, _, function in pstats.Stats(profiler.path(name)).stats}
+        assert 'clear_complete_lines' in functions and 'can_place_block' in functions
+
+
+def test_choosing_and_keeping_profiles():
+    with tempfile.TemporaryDirectory() as directory:
+        profiler = Profiler(directory, max_profiles=2)
+        assert profiler.choose(None) is None
+        assert profiler.choose('cprofile') == 'cprofile' and profiler.choose('1') == 'sample'
+        for bad in ('flame', ):
+            try:
+                profiler.choose(bad)
+            except ValueError:
+                pass
+            else:
+                assert False, 'expected ValueError'
+
+        profiler.configure(sample_rate=1.0, mode='cprofile')
+        assert profiler.choose(None) == 'cprofile'
+        try:
+            profiler.configure(sample_rate=1.5)
+        except ValueError:
+            pass
+        else:
+            assert False, 'expected ValueError'
+
+        names = [profiler.run('sample', f'req-{i}', sum, [i])[1] for i in range(3)]
+        assert [profile['name'] for profile in profiler.profiles()] == sorted(names)[:0:-1]
+        assert profiler.path('../' + names[-1]) is None and profiler.path('notes.txt') is None
+
+
+if __name__ == "__main__":
+    test_sampled_profile_is_rooted_at_the_solve()
+    test_cprofile_writes_pstats()
+    test_choosing_and_keeping_profiles()
+    print("✅ Profiles of single solves are captured, listed and pruned")
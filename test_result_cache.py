@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import random
+import tempfile
+import threading
+import numpy as np
+from solver import BlockBlastSolver
+from cache import ResultCache, SYMMETRIES, transform_cell
+from store import SolutionStore, prepopulate, standard_openings
+
+
+def random_block(rng):
+    block = [[0] * 5 for _ in range(5)]
+    row, col = rng.randrange(3), rng.randrange(3)
+    for _ in range(rng.randint(1, 4)):
+        block[row][col] = 1
+        row = min(4, max(0, row + rng.choice((-1, 0, 1))))
+        col = min(4, max(0, col + rng.choice((-1, 0, 1))))
+    return block
+
+
+def transformed(board, transform):
+    size = len(board)
+    moved = [[0] * size for _ in range(size)]
+    for row in range(size):
+        for col in range(size):
+            new_row, new_col = transform_cell(row, col, size, transform)
+            moved[new_row][new_col] = board[row][col]
+    return moved
+
+
+def replay(solver, board, blocks, solution):
+    """Play a solution with the original numpy helpers, checking every move."""
+    current = np.array(board, dtype=int)
+    lines = 0
+    for placement in solution['placements']:
+        coords = solver.extract_block_coordinates(blocks[placement['block_index']])
+        assert solver.can_place_block(current, coords, placement['top_left_row'], placement['top_left_col'])
+        current = solver.place_block(current, coords, placement['top_left_row'], placement['top_left_col'])
+        current, cleared = solver.clear_complete_lines(current)
+        lines += cleared
+    return current.tolist(), lines
+
+
+def test_symmetric_requests_share_one_entry():
+    solver = BlockBlastSolver()
+    cache = ResultCache(solver)
+    rng = random.Random(11)
+    board = [[int(rng.random() < 0.5) for _ in range(8)] for _ in range(8)]
+    blocks = [random_block(rng) for _ in range(3)]
+    expected = [solution['score'] for solution in solver.solve_iteration(board, blocks, top_k=5)]
+
+    for transform in range(SYMMETRIES):
+        moved_board = transformed(board, transform)
+        # Block shapes move with the board; the order of the blocks is shuffled too
+        moved_blocks = [transformed(block, transform) for block in reversed(blocks)]
+        stats = {}
+        solutions = cache.solve_iteration(moved_board, moved_blocks, 5, solver.solve_iteration, stats=stats)
+        assert stats['cached'] is (transform > 0)
+        assert [solution['score'] for solution in solutions] == expected
+        for solution in solutions:
+            final_board, lines = replay(solver, moved_board, moved_blocks, solution)
+            assert final_board == solution['final_board']
+            assert lines == solution['lines_cleared']
+            assert solution['block_order'] == [placement['block_index'] for placement in solution['placements']]
+
+    assert cache.stats()['hits'] == SYMMETRIES - 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_smaller_top_k_is_a_prefix_and_lru_evicts():
+    solver = BlockBlastSolver()
+    cache = ResultCache(solver, max_entries=2)
+    rng = random.Random(5)
+    requests = [([[int(rng.random() < 0.4) for _ in range(8)] for _ in range(8)],
+                 [random_block(rng) for _ in range(3)]) for _ in range(3)]
+
+    board, blocks = requests[0]
+    full = cache.solve_iteration(board, blocks, 6, solver.solve_iteration)
+    assert cache.solve_iteration(board, blocks, 2, solver.solve_iteration) == full[:2]
+    assert cache.stats()['hits'] == 1
+
+    for board, blocks in requests[1:]:
+        cache.solve_iteration(board, blocks, 3, solver.solve_iteration)
+    stats = cache.stats()
+    assert stats['entries'] == 2 and stats['evictions'] == 1
+
+    # The first request was least recently used, so it is solved again
+    board, blocks = requests[0]
+    cache.solve_iteration(board, blocks, 2, solver.solve_iteration)
+    assert cache.stats()['misses'] == 4
+
+
+def test_partial_solutions_are_kept_with_the_empty_result():
+    solver = BlockBlastSolver()
+    cache = ResultCache(solver)
+    rng = random.Random(2)
+    while True:
+        board = [[int(rng.random() < 0.6) for _ in range(8)] for _ in range(8)]
+        blocks = [random_block(rng) for _ in range(3)]
+        if not solver.solve_iteration(board, blocks) and solver.best_partial(board, blocks, top_k=1):
+            break
+    expected = [solution['score'] for solution in solver.best_partial(board, blocks, top_k=4)]
+    calls = []
+
+    def best_partial(*args, **kwargs):
+        calls.append(1)
+        return solver.best_partial(*args, **kwargs)
+
+    for transform in range(SYMMETRIES):
+        moved_board = transformed(board, transform)
+        moved_blocks = [transformed(block, transform) for block in reversed(blocks)]
+        assert cache.solve_iteration(moved_board, moved_blocks, 4, solver.solve_iteration) == []
+        partial = cache.best_partial(moved_board, moved_blocks, 4 - transform % 2, best_partial)
+        assert [solution['score'] for solution in partial] == expected[:4 - transform % 2]
+        for solution in partial:
+            final_board, _ = replay(solver, moved_board, moved_blocks, solution)
+            assert final_board == solution['final_board']
+            assert sorted(solution['block_order'] + solution['unplaced']) == [0, 1, 2]
+    # Only the first request searched; the others read the cache entry
+    assert len(calls) == 1
+
+
+def test_concurrent_lookups_agree():
+    solver = BlockBlastSolver()
+    cache = ResultCache(solver)
+    rng = random.Random(3)
+    board = [[int(rng.random() < 0.5) for _ in range(8)] for _ in range(8)]
+    blocks = [random_block(rng) for _ in range(3)]
+    expected = cache.solve_iteration(board, blocks, 3, solver.solve_iteration)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.solve_iteration(board, blocks, 3, solver.solve_iteration))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [expected] * 8
+    assert cache.stats()['hits'] == 8
+
+
+def test_store_survives_restart_and_prepopulates():
+    solver = BlockBlastSolver()
+    rng = random.Random(8)
+    board = [[int(rng.random() < 0.5) for _ in range(8)] for _ in range(8)]
+    blocks = [random_block(rng) for _ in range(3)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'solutions.db')
+        store = SolutionStore(path)
+        expected = ResultCache(solver, store=store).solve_iteration(board, blocks, 4, solver.solve_iteration)
+        store.close()
+
+        # A fresh process: empty memory tier, same file
+        store = SolutionStore(path)
+        stats = {}
+        cache = ResultCache(solver, store=store)
+        assert cache.solve_iteration(board, blocks, 4, solver.solve_iteration, stats=stats) == expected
+        assert stats['cached'] is True
+        assert cache.stats()['store']['hits'] == 1
+        # Served from memory after the first store hit
+        assert cache.solve_iteration(board, blocks, 2, solver.solve_iteration) == expected[:2]
+        assert cache.stats()['store']['hits'] == 1
+        store.close()
+
+        openings = list(standard_openings())[:4]
+        assert prepopulate(path, openings, 3, workers=1)['solved'] > 0
+        assert prepopulate(path, openings, 3, workers=1)['solved'] == 0
+        store = SolutionStore(path)
+        stats = {}
+        ResultCache(solver, store=store).solve_iteration(*openings[0], 3, solver.solve_iteration, stats=stats)
+        assert stats['cached'] is True
+        store.close()
+
+
+if __name__ == "__main__":
+    test_symmetric_requests_share_one_entry()
+    test_smaller_top_k_is_a_prefix_and_lru_evicts()
+    test_partial_solutions_are_kept_with_the_empty_result()
+    test_concurrent_lookups_agree()
+    test_store_survives_restart_and_prepopulates()
+    print("✅ Result cache maps symmetric requests to one entry")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import random
+from solver import BlockBlastSolver
+from pieces import STANDARD_PIECES, to_grid
+
+SMALL_PIECES = ['single', 'line2_h', 'line2_v', 'corner3_0', 'corner3_2', 'square2', 'line3_v']
+
+
+def random_positions(board_size, count, blocks, fill, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        board = [[int(rng.random() < fill) for _ in range(board_size)] for _ in range(board_size)]
+        yield board, [to_grid(STANDARD_PIECES[rng.choice(SMALL_PIECES)]) for _ in range(blocks)]
+
+
+def ranking(solutions):
+    return [(s['score'], [(p['block_index'], p['top_left_row'], p['top_left_col']) for p in s['placements']])
+            for s in solutions]
+
+
+def test_engines_agree_on_10x10_with_four_blocks():
+    numpy_solver = BlockBlastSolver(board_size=10, engine='numpy')
+    batched = BlockBlastSolver(board_size=10)
+    scalar = BlockBlastSolver(board_size=10, batch_leaves=False)
+    assert batched.leaf_kernel is not None and batched.leaf_kernel.words == 2
+    solved = 0
+    for board, blocks in random_positions(10, 3, 4, 0.7):
+        expected = ranking(numpy_solver.solve_iteration(board, blocks, top_k=5))
+        solved += bool(expected)
+        for solver in (batched, scalar):
+            assert ranking(solver.solve_iteration(board, blocks, top_k=5)) == expected
+            assert ranking(solver.solve_iteration(board, blocks, top_k=5, prune=False)) == expected
+    assert solved > 0
+
+
+def test_pruning_is_exact_across_sizes():
+    for board_size, blocks in ((8, 4), (9, 3), (11, 3)):
+        solver = BlockBlastSolver(board_size=board_size)
+        for board, deal in random_positions(board_size, 5, blocks, 0.35, seed=board_size):
+            stats = {}
+            pruned = solver.solve_iteration(board, deal, top_k=5, stats=stats)
+            assert ranking(pruned) == ranking(solver.solve_iteration(board, deal, top_k=5, prune=False))
+            if pruned:
+                assert solver.apply_solution(board, deal, pruned[0]) == pruned[0]['final_board']
+
+
+def test_single_and_large_deals():
+    solver = BlockBlastSolver(board_size=10)
+    empty = [[0] * 10 for _ in range(10)]
+    line = to_grid(STANDARD_PIECES['line5_h'])
+    solutions = solver.solve_iteration(empty, [line], top_k=3)
+    assert len(solutions) == 3 and all(len(s['placements']) == 1 for s in solutions)
+
+    # A block as wide as the board clears its row wherever it goes
+    full_row = [[1] * 10] + [[0] * 10 for _ in range(9)]
+    stats = {}
+    solutions = solver.solve_iteration(empty, [full_row] * 2, top_k=1, stats=stats)
+    assert stats['feasible'] and solutions[0]['lines_cleared'] == 2
+
+
+if __name__ == "__main__":
+    test_engines_agree_on_10x10_with_four_blocks()
+    test_pruning_is_exact_across_sizes()
+    test_single_and_large_deals()
+    print("✅ Search scales to larger boards and block counts")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import threading
+import time
+from solver import BlockBlastSolver
+from cache import ResultCache
+from serving import SolveGate, Overloaded
+
+BOARD = [[0] * 8 for _ in range(4)] + [[1, 1, 1, 1, 1, 1, 1, 0] for _ in range(4)]
+SINGLE = [[1, 0, 0, 0, 0]] + [[0] * 5 for _ in range(4)]
+
+
+def test_gate_sheds_load_beyond_queue():
+    gate = SolveGate(max_concurrent=1, max_queue=0, max_wait_ms=50)
+    token = gate.acquire()
+    try:
+        gate.acquire()
+        assert False, 'second solve should have been rejected'
+    except Overloaded as e:
+        assert e.retry_after >= 1
+    gate.release(token)
+
+    # With room to queue, a waiter times out if the slot is never freed
+    gate = SolveGate(max_concurrent=1, max_queue=1, max_wait_ms=50)
+    token = gate.acquire()
+    started = time.monotonic()
+    try:
+        gate.acquire()
+        assert False, 'waiter should have timed out'
+    except Overloaded:
+        assert time.monotonic() - started >= 0.04
+    gate.release(token)
+    with gate.slot():
+        assert gate.stats()['active'] == 1
+    stats = gate.stats()
+    assert stats['active'] == 0 and stats['rejected'] == 1 and stats['admitted'] == 2
+
+
+def test_identical_requests_are_coalesced():
+    solver = BlockBlastSolver()
+    cache = ResultCache(solver, max_entries=0)
+    calls = []
+    release = threading.Event()
+
+    def slow_solve(board, blocks, **options):
+        calls.append(1)
+        release.wait()
+        return solver.solve_iteration(board, blocks, **options)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.solve_iteration(BOARD, [SINGLE] * 3, 3, slow_solve))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['coalesced'] < 5:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [ResultCache(solver).solve_iteration(BOARD, [SINGLE] * 3, 3, solver.solve_iteration)] * 6
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_coalesced_requests_share_errors():
+    cache = ResultCache(BlockBlastSolver())
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing_solve(board, blocks, **options):
+        started.set()
+        release.wait()
+        raise Overloaded('busy', 3)
+
+    errors = []
+
+    def request():
+        try:
+            cache.solve_iteration(BOARD, [SINGLE] * 3, 3, failing_solve)
+        except Overloaded as e:
+            errors.append(e.retry_after)
+
+    leader = threading.Thread(target=request)
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=request)
+    follower.start()
+    while cache.stats()['coalesced'] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+    assert errors == [3, 3]
+    assert cache.stats()['entries'] == 0
+
+
+if __name__ == "__main__":
+    test_gate_sheds_load_beyond_queue()
+    test_identical_requests_are_coalesced()
+    test_coalesced_requests_share_errors()
+    print("✅ Serving gate and request coalescing work")
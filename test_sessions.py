@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import time
+from solver import BlockBlastSolver
+from pieces import STANDARD_PIECES, to_grid
+from sessions import SessionManager, SessionError
+
+BLOCKS = [to_grid(STANDARD_PIECES[name]) for name in ('square3', 'line5_h', 'single')]
+
+
+def test_session_advances_its_own_board():
+    solver = BlockBlastSolver()
+    manager = SessionManager()
+    session = manager.create()
+    try:
+        session.accept(0)
+        assert False, 'accepting without a deal should fail'
+    except SessionError:
+        pass
+
+    solutions = solver.solve_iteration(session.board, BLOCKS, top_k=3)
+    session.deal(BLOCKS, solutions)
+    played = session.accept(2)
+    assert session.board == played['final_board'] == solutions[2]['final_board']
+    assert session.turn == 1 and session.score == played['score']
+    assert manager.get(session.id) is session and manager.get('missing') is None
+
+
+def test_apply_solution_replays_solver_placements():
+    solver = BlockBlastSolver()
+    board = [[0] * 8 for _ in range(8)]
+    board[0] = [1] * 7 + [0]
+    for solution in solver.solve_iteration(board, BLOCKS, top_k=5):
+        assert solver.apply_solution(board, BLOCKS, solution) == solution['final_board']
+
+
+def test_idle_sessions_expire_and_size_is_bounded():
+    manager = SessionManager(ttl=0.05, max_sessions=2)
+    first = manager.create()
+    time.sleep(0.06)
+    assert manager.get(first.id) is None
+    assert manager.stats()['expired'] == 1
+
+    manager.ttl = 60
+    second, third = manager.create(), manager.create()
+    manager.get(second.id)
+    fourth = manager.create()
+    # third was the least recently used
+    assert manager.get(third.id) is None
+    assert manager.get(second.id) is second and manager.get(fourth.id) is fourth
+    assert manager.stats()['evicted'] == 1
+
+
+if __name__ == "__main__":
+    test_session_advances_its_own_board()
+    test_apply_solution_replays_solver_placements()
+    test_idle_sessions_expire_and_size_is_bounded()
+    print("✅ Game sessions keep and advance their boards")
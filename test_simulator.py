@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from solver import BlockBlastSolver
+from simulator import play_game, simulate
+
+
+def test_games_are_deterministic_per_seed():
+    solver = BlockBlastSolver()
+    first = play_game(solver, seed=7, max_turns=15)
+    second = play_game(BlockBlastSolver(batch_leaves=False), seed=7, max_turns=15)
+    for key in ('points', 'turns', 'lines', 'died'):
+        assert first[key] == second[key]
+    assert len(first['latencies_ms']) == first['turns'] + first['died']
+    assert first['points'] > 0
+
+
+def test_games_end_when_a_deal_cannot_be_placed():
+    # Dealing nothing but five-cell corners fills the board quickly
+    game = play_game(BlockBlastSolver(), seed=0, pieces=['corner5_0'], max_turns=100)
+    assert game['died'] and game['turns'] < 100
+
+
+def test_summary_does_not_depend_on_workers():
+    serial = simulate(4, seed=3, workers=1, max_turns=5)
+    parallel = simulate(4, seed=3, workers=2, max_turns=5)
+    assert serial['fingerprint'] == parallel['fingerprint']
+    assert serial['points_mean'] == parallel['points_mean'] and serial['games'] == 4
+    assert serial['games_per_sec'] > 0 and serial['solve_ms']['p50'] > 0
+
+
+if __name__ == "__main__":
+    test_games_are_deterministic_per_seed()
+    test_games_end_when_a_deal_cannot_be_placed()
+    test_summary_does_not_depend_on_workers()
+    print("✅ Self-play simulator is deterministic per seed")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+import json
+import random
+import wire
+from solver import BlockBlastSolver
+from bitboard import board_to_bits, bits_to_board
+from pieces import STANDARD_PIECES, to_grid
+
+
+def random_positions(count, fill, board_size=8, seed=0):
+    rng = random.Random(seed)
+    names = sorted(STANDARD_PIECES)
+    for _ in range(count):
+        board = [[int(rng.random() < fill) for _ in range(board_size)] for _ in range(board_size)]
+        yield board, [to_grid(STANDARD_PIECES[rng.choice(names)]) for _ in range(3)]
+
+
+def block_bits(block, board_size):
+    return sum(1 << (row * board_size + col) for row, cells in enumerate(block)
+               for col, cell in enumerate(cells) if cell)
+
+
+def test_bitmask_requests_decode_to_the_same_solve():
+    solver = BlockBlastSolver()
+    for board, blocks in random_positions(10, 0.35):
+        compact = wire.decode_request({
+            'board': format(board_to_bits(board), 'x'),
+            'blocks': [block_bits(blocks[0], 8), format(block_bits(blocks[1], 8), 'x'), blocks[2]],
+        }, 8)
+        assert compact['board'] == board
+        assert solver.solve_iteration(compact['board'], compact['blocks']) == solver.solve_iteration(board, blocks)
+
+
+def test_bad_bitmasks_are_rejected():
+    for value in ('xyz', 1 << 64, -1, True, 1.5):
+        try:
+            wire.decode_request({'board': value, 'blocks': []}, 8)
+        except ValueError:
+            pass
+        else:
+            assert False, f'expected ValueError for {value!r}'
+    # 10x10 boards need more than 64 bits
+    assert wire.decode_request({'board': format(1 << 99, 'x')}, 10)['board'][9][9] == 1
+
+
+def test_compact_solutions_replay_each_step():
+    for board_size in (8, 10):
+        solver = BlockBlastSolver(board_size=board_size)
+        for board, blocks in random_positions(10, 0.4, board_size, seed=board_size):
+            solutions = solver.solve_iteration(board, blocks, top_k=5)
+            for solution, compact in zip(solutions, wire.compact_solutions(solver, board, blocks, solutions)):
+                assert [list(p) for p in compact['placements']] == [
+                    [p['block_index'], p['top_left_row'], p['top_left_col']] for p in solution['placements']]
+                assert bits_to_board(int(compact['final_board'], 16), board_size) == solution['final_board']
+                assert compact['boards'][-1] == compact['final_board']
+
+                # Each step is the previous board plus the placed cells, less cleared lines
+                previous = board_to_bits(board, board_size)
+                for step, (after, placed) in enumerate(zip(compact['boards'], compact['placed'])):
+                    after, placed = int(after, 16), int(placed, 16)
+                    assert not previous & placed and after & ~(previous | placed) == 0
+                    partial = dict(solution, placements=solution['placements'][:step + 1])
+                    assert board_to_bits(solver.apply_solution(board, blocks, partial), board_size) == after
+                    previous = after
+
+            # Compact placements are accepted back
+            if solutions:
+                placements = wire.compact_solutions(solver, board, blocks, solutions[:1])[0]['placements']
+                decoded = wire.decode_request({'solution': {'placements': [list(p) for p in placements]}},
+                                              board_size)
+                assert decoded['solution']['placements'] == solutions[0]['placements']
+
+
+def test_compact_response_is_smaller():
+    solver = BlockBlastSolver()
+    board, blocks = next(random_positions(1, 0.3))
+    solutions = solver.solve_iteration(board, blocks, top_k=10)
+    compact = wire.dumps({'solutions': wire.compact_solutions(solver, board, blocks, solutions)})
+    assert len(compact) < len(json.dumps({'solutions': solutions}, separators=(',', ':')))
+    assert json.loads(compact)['solutions'][0]['score'] == solutions[0]['score']
+
+
+if __name__ == "__main__":
+    test_bitmask_requests_decode_to_the_same_solve()
+    test_bad_bitmasks_are_rejected()
+    test_compact_solutions_replay_each_step()
+    test_compact_response_is_smaller()
+    print("✅ Compact wire format round-trips boards, blocks and solutions")